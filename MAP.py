@@ -1,13 +1,40 @@
 import streamlit as st
 import pandas as pd
-import json
-from io import BytesIO
+import numpy as np
+import importlib.machinery
 import os
-import uuid
+import time
+
+from map_engine import (
+    STATUS_CODES, STATUS_NAMES, PENDING, TBD, DELETED, UNASSIGNED, EXPORT_BUCKETS, EXPORT_FORMATS, LEASE_BATCH,
+    Clusters, ContentCache, HistoryIndex, Journal, MetricsSink, OptionsBank, QualificationSession, RerunProfiler, RuleBank,
+    Prefetcher, SearchIndex, SessionStore, WorkQueue, DEFAULT_RULES,
+    PARSE_WORKERS, PROFILE_ENV, PROFILE_FILE_ENV, article_keys, batch_digest, batch_name, file_digest, import_export,
+    is_batch, is_cached, load_batch, load_upload, parse_pool, read_export,
+)
+
+# Streamlit runs this script as a __main__ module without a spec, so a spawned worker
+# (the batch parse pool) would re-run the whole app to rebuild its main module. A spec
+# named "__main__" tells multiprocessing there is nothing to re-import.
+__spec__ = importlib.machinery.ModuleSpec("__main__", None)
 
 # ---------- helper: Streamlit ≥1.27 / pre‑1.27 -------------------------------
 def safe_rerun(): (st.rerun if hasattr(st, "rerun") else st.experimental_rerun)()
 
+# ---------- helper: st.fragment (Streamlit ≥1.37) ----------------------------
+def fragment(func=None, **kw):
+    # Panels rerun on their own where fragments exist; older versions rerun the whole script
+    impl = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if impl is None:
+        return func if func else (lambda f: f)
+    return impl(func, **kw) if func else impl(**kw)
+
+def rerun_fragment():
+    try:
+        st.rerun(scope="fragment")
+    except (TypeError, st.errors.StreamlitAPIException):
+        safe_rerun()
+
 # ---------- constants --------------------------------------------------------
 OPTIONS_FILE = "qual_options.json"
 FIRST_RUN_FLAG = "first_run_flag.txt"
@@ -21,46 +48,68 @@ DEFAULT_OPTIONS = {
                  "M&A", "Business Growth", "Products & Services", "Vision", "Work Environment"],
     "SavedUserCategories": []
 }
+# Keyword rules behind the suggestions (defaults in map_engine.rules); edit qual_rules.json to tune them
+RULES_FILE = "qual_rules.json"
 MANDATORY = ["Dominance", "Prominence", "Spokesperson", "Page", "Tonality", "Category"]
+BULK_PAGE_SIZE = 50
+BULK_MAX_CHOICES = 500  # most frequent values offered in the bulk column filter
+SEARCH_JUMP_LIMIT = 200  # hits offered in the jump-to list
+PREFETCH_AHEAD = 5  # upcoming rows whose articles are fetched in the background
+PREVIEW_CHARS = 4_000  # of article text shown inline
+ANALYTICS_TOP = 15  # spokespeople and publications listed in the analytics panel
+EXPORT_FORMAT_LABELS = {"xlsx": "Excel", "csv": "CSV", "jsonl": "JSON Lines", "parquet": "Parquet"}
 
 # ---------- option bank helpers ---------------------------------------------
-def initialize_bank():
-    is_first_run = not os.path.exists(FIRST_RUN_FLAG)
-    if is_first_run:
-        json.dump(DEFAULT_OPTIONS, open(OPTIONS_FILE, "w"), indent=2)
-        with open(FIRST_RUN_FLAG, "w") as f:
-            f.write("First run completed")
-        return DEFAULT_OPTIONS.copy()
-    else:
-        try:
-            loaded = json.load(open(OPTIONS_FILE))
-            for key in DEFAULT_OPTIONS:
-                if key not in loaded:
-                    loaded[key] = DEFAULT_OPTIONS[key]
-                if key == "Category":
-                    loaded[key] = DEFAULT_OPTIONS[key]
-                else:
-                    if not isinstance(loaded[key], list):
-                        loaded[key] = DEFAULT_OPTIONS[key]
-            return loaded
-        except Exception as e:
-            st.error(f"Error loading {OPTIONS_FILE}: {e}. Using default options. Please fix the JSON file.")
-            return DEFAULT_OPTIONS.copy()
+@st.cache_resource(show_spinner=False)
+def get_options() -> OptionsBank:
+    # One parsed copy per process, revalidated by mtime; writes are locked and atomic
+    return OptionsBank(OPTIONS_FILE, DEFAULT_OPTIONS, FIRST_RUN_FLAG)
+
+@st.cache_resource(show_spinner=False)
+def get_rules() -> RuleBank:
+    return RuleBank(RULES_FILE, DEFAULT_RULES)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def suggest_upload(digest: str, rules_version, _df: pd.DataFrame):
+    # One vectorised pass over the whole file per upload and version of the rule bank
+    return get_rules().suggest(_df)
 
-def save_bank(b):
-    json.dump(b, open(OPTIONS_FILE, "w"), indent=2)
+# ---------- profiling (opt-in: MAP_PROFILE=1 or ?profile=1) -------------------
+@st.cache_resource(show_spinner=False)
+def get_profile_sink() -> MetricsSink | None:
+    path = os.environ.get(PROFILE_FILE_ENV)
+    return MetricsSink(path) if path else None
+
+if os.environ.get(PROFILE_ENV) or st.query_params.get("profile") == "1":
+    if "profiler" not in st.session_state:
+        st.session_state.profiler = RerunProfiler(sink=get_profile_sink())
+    prof = st.session_state.profiler
+else:
+    prof = RerunProfiler(enabled=False)
+prof.begin()
 
 # Initialize the options bank
-bank = initialize_bank()
+with prof.phase("options_bank"):
+    options = get_options()
+    bank = options.get()
+    if options.error:
+        st.error(options.error)
+    rules = get_rules()
+    rules.get()
+    if rules.error:
+        st.error(rules.error)
+    if rules.invalid:
+        st.warning(f"Skipped invalid patterns in {RULES_FILE}: {'; '.join(rules.invalid)}")
 
 # ---------- session-state bootstrap -----------------------------------------
 init_vals = {
-    "df_raw": pd.DataFrame(),
-    "df_work": pd.DataFrame(),
-    "qualified": pd.DataFrame(),
-    "partial": pd.DataFrame(),
-    "deleted": pd.DataFrame(),
-    "to_be_decided": pd.DataFrame(),
+    "upload_file_id": None,
+    "upload_digest": None,
+    "upload_name": None,
+    "session_id": None,
+    "resume_candidates": None,
+    "team_mode": False,
+    "team_notice": None,
     "row_ptr": 0,
     "bucket_row_ptr": 0,
     "total": 0,
@@ -69,172 +118,834 @@ init_vals = {
     "selected_categories": [],
     "category_qualifications": [],
     "qualification_started": False,
-    "saved_user_categories": bank.get("SavedUserCategories", []),
     "category_selection_order": [],
-    "qualifications_by_category": {},
-    "qualified_categories_by_row": {},
     "show_caution_message": False,
     "confirm_categories": False,
     "preview_bucket": None,
     "no_more_records_message": None,
+    "draft_qualification": None,
+    "bulk_mode": False,
+    "bulk_page": 1,
+    "bulk_excluded": set(),
+    "bulk_filter_cache": None,
+    "bulk_editor_gen": 0,
+    "bulk_notice": None,
+    "use_history": True,
+    "history_notice": None,
+    "suggested_row": None,
+    "search_query": "",
+    "search_only": False,
+    "search_hits": None,
+    "undo_notice": None,
+    "reimport_notice": None,
+    "show_analytics": False,
 }
 for k, v in init_vals.items():
     st.session_state.setdefault(k, v)
+# Custom categories saved by other sessions show up on the next rerun
+st.session_state.saved_user_categories = list(bank.get("SavedUserCategories", []))
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def parse_upload(digest: str, _data: bytes, file_name: str) -> pd.DataFrame:
+    # Shared by every session that uploads the same bytes; df_work is never mutated
+    # _data is None when resuming from the on-disk cache alone
+    return load_upload(_data, file_name, digest)
+
+@st.cache_resource(show_spinner=False)
+def get_parse_pool():
+    # Worker processes for batch uploads, started on first use and kept for the next batch
+    return parse_pool() if PARSE_WORKERS > 1 else None
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def parse_batch(digest: str, _files: list) -> pd.DataFrame:
+    # Every sheet of every file, parsed in parallel and concatenated once; cached on disk like single uploads
+    return load_batch(_files, digest, pool=get_parse_pool())
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def cluster_upload(digest: str, _df: pd.DataFrame) -> Clusters:
+    # Near-duplicate (syndicated) groups, computed once per upload and shared across sessions
+    return Clusters.from_frame(_df)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def search_index(digest: str, _df: pd.DataFrame) -> SearchIndex:
+    # Inverted index over headline/text/publication; queries never scan df_work
+    return SearchIndex.from_frame(_df)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def upload_keys(digest: str, _df: pd.DataFrame) -> pd.DataFrame:
+    return article_keys(_df)
+
+@st.cache_resource(show_spinner=False)
+def get_history() -> HistoryIndex:
+    return HistoryIndex()
+
+def remember_rows(row_ids):
+    # Keep the cross-upload history in step with rows as they are filed
+    qs = held()["qsession"]
+    get_history().remember(upload_keys(qs.digest, qs.df), qs, row_ids)
+
+@st.cache_resource(show_spinner=False)
+def get_journal() -> Journal:
+    return Journal()
+
+@st.cache_resource(show_spinner=False)
+def get_queue() -> WorkQueue:
+    return WorkQueue()
+
+@st.cache_resource(show_spinner=False)
+def get_prefetcher() -> Prefetcher:
+    # One fetch pool and on-disk page cache per process, shared by every tab
+    return Prefetcher(ContentCache())
+
+@fragment
+def article_preview(row_id: int, url: str):
+    # Text of the linked page from the prefetch cache; a click fetches it now if it isn't there yet
+    prefetcher = get_prefetcher()
+    page = prefetcher.get(url)
+    with st.expander("📄 Article preview", expanded=page is not None and page.ok):
+        if page is None:
+            if prefetcher.offline:
+                st.caption("Article previews are paused: the network looks unreachable.")
+            elif prefetcher.loading(url):
+                st.caption("Loading in the background...")
+            if st.button("Load preview", key=f"load_preview_{row_id}"):
+                with st.spinner("Fetching article..."):
+                    page = prefetcher.get(url, wait=prefetcher.timeout)
+                if page is None:
+                    st.caption("Still loading; try again in a moment.")
+        if page is not None and not page.ok:
+            st.caption(f"No preview available ({page.error}); use Open Article instead.")
+        elif page is not None:
+            if page.title:
+                st.text(page.title)
+            st.text(page.text[:PREVIEW_CHARS] + ("..." if len(page.text) > PREVIEW_CHARS else ""))
+
+def cached_upload(name: tuple) -> pd.DataFrame:
+    # The parse cache's frame for a spilled tab's upload (read back from the Parquet cache if it was evicted)
+    kind, digest, file_name = name
+    return parse_batch(digest, None) if kind == "batch" else parse_upload(digest, None, file_name)
+
+@st.cache_resource(show_spinner=False)
+def get_store() -> SessionStore:
+    # Idle tabs' frames and sessions go to disk instead of sitting in RAM overnight; an upload
+    # frame is the parse cache's, so a spill keeps only its name and reloads re-bind to it
+    return SessionStore(shared={"journal": get_journal()}, loader=cached_upload)
+
+def held() -> dict:
+    # This tab's large objects (df_work, qsession, clusters, export_cache) live in the store,
+    # not in session_state; a spilled tab is reloaded here on its next interaction
+    return get_store().get(st.session_state.session_id) or {}
+
+def resumable(sessions: pd.DataFrame) -> list:
+    # Journalled sessions no tab is working in: a second tab resuming a live one would
+    # share its mutable session and undo stack
+    store = get_store()
+    return [c for c in sessions.to_dict("records") if not store.active(c["session_id"])]
+
+def begin_work(df: pd.DataFrame, digest: str, file_name: str, session_id: str | None = None,
+               batch: bool = False):
+    # Start annotating df (from parse_upload, or parse_batch if batch), either fresh or by
+    # replaying a journalled session in bulk
+    # Every action is journalled (on a background thread) for crash/refresh resume
+    st.session_state.history_notice = None
+    if session_id is None:
+        qs = QualificationSession(df, digest, file_name, journal=get_journal())
+        if st.session_state.use_history:
+            # Articles qualified or deleted in earlier uploads are filed straight away
+            with st.spinner("Checking earlier uploads..."):
+                reused = get_history().apply(upload_keys(digest, df), qs)
+            if any(reused.values()):
+                st.session_state.history_notice = (
+                    f"From earlier uploads: {reused['qualified']} row(s) filed as qualified, "
+                    f"{reused['deleted']} deleted and {reused['prefilled']} prefilled for review."
+                )
+    else:
+        qs = QualificationSession.resume(df, digest, file_name, session_id, get_journal())
+    with st.spinner("Finding syndicated duplicates..."):
+        clusters = cluster_upload(digest, df)
+    with st.spinner("Indexing articles for search..."):
+        search_index(digest, df)
+    if st.session_state.session_id != qs.session_id:
+        get_store().discard(st.session_state.session_id)
+    get_store().share(("batch" if batch else "upload", digest, file_name), df)
+    get_store().put(qs.session_id, df_work=df, qsession=qs, clusters=clusters, export_cache=None)
+    st.session_state.upload_digest = digest
+    st.session_state.upload_name = file_name
+    st.session_state.session_id = qs.session_id
+    st.session_state.total = len(df)
+    st.session_state.row_ptr = qs.next_row() or 0
+    st.session_state.bucket_row_ptr = 0
+    st.session_state.file_uploaded = True
+    st.session_state.current_category_index = 0
+    st.session_state.selected_categories = []
+    st.session_state.category_qualifications = []
+    st.session_state.qualification_started = False
+    st.session_state.category_selection_order = []
+    st.session_state.show_caution_message = False
+    st.session_state.confirm_categories = False
+    st.session_state.preview_bucket = None
+    st.session_state.no_more_records_message = None
+    st.session_state.team_mode = False
+    st.session_state.team_notice = None
+    st.session_state.bulk_excluded = set()
+    st.session_state.bulk_filter_cache = None
+    st.session_state.suggested_row = None
+    st.session_state.search_query = ""
+    st.session_state.search_hits = None
+    st.session_state.undo_notice = None
+    st.session_state.reimport_notice = None
+
+def go_to_row(row_id: int):
+    # Point the main view at row_id and start its qualification afresh
+    qualified = held()["qsession"].categories(row_id)
+    st.session_state.row_ptr = row_id
+    st.session_state.selected_categories = qualified.copy()
+    st.session_state.category_selection_order = qualified.copy()
+    st.session_state.show_caution_message = False
+    st.session_state.confirm_categories = False
+    st.session_state.current_category_index = 0
+    st.session_state.no_more_records_message = None
+
+def search_next(row_id: int, inclusive: bool = False) -> int | None:
+    # With "only matching rows" on: the next pending search hit after row_id (wrapping), else None
+    hits = st.session_state.search_hits
+    if hits is None or not st.session_state.search_only:
+        return None
+    codes = held()["qsession"].status.codes
+    pending = hits[codes[hits] == PENDING]
+    if not len(pending):
+        return None
+    at = int(np.searchsorted(pending, row_id, side="left" if inclusive else "right"))
+    return int(pending[at % len(pending)])
+
+def sync_queue(done=()):
+    # Report finished rows to the shared queue, renew our leases and top up when we run dry
+    rs = held()["qsession"].status
+    leased, lost = get_queue().sync(
+        st.session_state.upload_digest, st.session_state.session_id,
+        done=done, want=LEASE_BATCH if rs.pending == 0 else 0
+    )
+    rs.assign(leased)
+    st.session_state.team_notice = (
+        f"Your lease on row(s) {', '.join(str(r + 1) for r in lost)} had expired and another annotator "
+        "took them over; the later annotation wins in the merged results."
+    ) if lost else None
+
+def set_team_mode(on: bool):
+    # In team mode this session only sees the rows it has leased from the shared queue
+    rs = held()["qsession"].status
+    if on:
+        get_queue().register(st.session_state.upload_digest, st.session_state.upload_name, len(rs))
+        rs.unassign_pending()
+        sync_queue(done=rs.processed())
+    else:
+        get_queue().release(st.session_state.upload_digest, st.session_state.session_id)
+        rs.assign(rs.members(UNASSIGNED))
+        st.session_state.team_notice = None
+    st.session_state.team_mode = on
+    st.session_state.row_ptr = rs.first_pending() or 0
+    st.session_state.selected_categories = []
+    st.session_state.category_selection_order = []
+    st.session_state.confirm_categories = False
+    st.session_state.show_caution_message = False
+    st.session_state.current_category_index = 0
+
+def bucket_count(bucket: str) -> int:
+    qs = held().get("qsession")
+    return 0 if qs is None else qs.entries(bucket)
+
+def rows_left(bucket=None):
+    # Pending rows for the main view, or the size of a preview bucket
+    qs = held().get("qsession")
+    return 0 if qs is None else qs.rows(bucket)
+
+# ---------- idle-session spill ----------------------------------------------
+with prof.phase("session_store"):
+    # Touch this tab's objects first, then spill whichever tabs sat idle (or the least
+    # recently used ones while over the memory budget)
+    held()
+    get_store().sweep()
+    if st.session_state.file_uploaded and st.session_state.session_id not in get_store():
+        # Spilled so long ago that it was cleared: pick the journalled session back up
+        try:
+            begin_work(parse_upload(st.session_state.upload_digest, None, st.session_state.upload_name),
+                       st.session_state.upload_digest, st.session_state.upload_name, st.session_state.session_id)
+        except Exception as e:
+            st.session_state.file_uploaded = False
+            st.error(f"This tab's work could not be reloaded ({e}); please upload the file again.")
 
 # ---------- title / upload ---------------------------------------------------
 st.title("📰 News Qualification App")
 
-up = st.file_uploader(
-    "Upload an **Excel** file (.xlsx / .xls)",
+ups = st.file_uploader(
+    "Upload **Excel** files (.xlsx / .xls)",
     type=["xlsx", "xls"],
-    accept_multiple_files=False
+    accept_multiple_files=True,
+    help="Several files, or workbooks with a sheet per region, are combined into one list; "
+         "each row keeps its source file and sheet."
+)
+st.checkbox(
+    "Reuse qualifications from earlier uploads",
+    key="use_history",
+    help="Articles already qualified or deleted in a previous file (same URL or same text) are filed automatically."
 )
 
-# Process as soon as a file is chosen
-if up and not st.session_state.file_uploaded:
+# Process as soon as a file is chosen (or a different one replaces it)
+upload_id = tuple(u.file_id for u in ups) if ups else None
+if ups and (not st.session_state.file_uploaded or upload_id != st.session_state.upload_file_id):
     try:
-        st.session_state.df_raw = pd.read_excel(up)
-        st.session_state.df_work = st.session_state.df_raw.copy().reset_index(drop=True)
-        st.session_state.total = len(st.session_state.df_work)
-        st.session_state.row_ptr = 0
-        st.session_state.bucket_row_ptr = 0
-        st.session_state.file_uploaded = True
-        st.session_state.current_category_index = 0
-        st.session_state.selected_categories = []
-        st.session_state.category_qualifications = []
-        st.session_state.qualification_started = False
-        st.session_state.category_selection_order = []
-        st.session_state.qualifications_by_category = {}
-        st.session_state.qualified_categories_by_row = {}
-        st.session_state.show_caution_message = False
-        st.session_state.confirm_categories = False
-        st.session_state.preview_bucket = None
-        st.session_state.no_more_records_message = None
+        with prof.phase("upload"):
+            files = [(u.name, u.getvalue()) for u in ups]
+            if is_batch(files):
+                digest, file_name = batch_digest(files), batch_name(files)
+                with st.spinner(f"Loading {len(files)} file(s), every sheet..."):
+                    df = parse_batch(digest, files)
+            else:
+                file_name, data = files[0]
+                digest = file_digest(data)
+                with st.spinner("Loading Excel..."):
+                    df = parse_upload(digest, data, file_name)
+            st.session_state.upload_file_id = upload_id
+            begin_work(df, digest, file_name, batch=is_batch(files))
+        # Earlier sessions on the same file can be picked up where they left off
+        st.session_state.resume_candidates = resumable(get_journal().sessions(digest))[:5]
         st.success("Excel loaded — start qualifying!")
         safe_rerun()
     except Exception as e:
         st.error(f"Error loading file: {e}")
 
+if st.session_state.file_uploaded and st.session_state.history_notice:
+    st.info(st.session_state.history_notice)
+
+# On a fresh page (refresh, dropped connection, restart) offer recent sessions whose upload is still cached
+if st.session_state.resume_candidates is None and not st.session_state.file_uploaded:
+    recent = resumable(get_journal().sessions().head(20))
+    st.session_state.resume_candidates = [c for c in recent if is_cached(c["upload_digest"])][:5]
+
+# ---------- resume from journal ----------------------------------------------
+if st.session_state.resume_candidates:
+    with st.container(border=True):
+        st.markdown("#### Resume previous work?")
+        for c in st.session_state.resume_candidates:
+            col_info, col_btn = st.columns([3, 1])
+            last_saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(c["updated"]))
+            col_info.markdown(f"**{c['file_name']}** — {c['actions']} actions, last saved {last_saved}")
+            if col_btn.button("Resume ⏯", key=f"resume_{c['session_id']}", use_container_width=True):
+                if get_store().active(c["session_id"]):
+                    st.error("This session is open in another tab; carry on there or start fresh.")
+                    continue
+                try:
+                    with st.spinner("Replaying journal..."):
+                        df = parse_upload(c["upload_digest"], None, c["file_name"])
+                        begin_work(df, c["upload_digest"], c["file_name"], c["session_id"])
+                    st.session_state.resume_candidates = []
+                    safe_rerun()
+                except Exception as e:
+                    st.error(f"Error resuming session: {e}")
+        if st.button("Start fresh", key="resume_dismiss"):
+            st.session_state.resume_candidates = []
+            safe_rerun()
+
+# ---------- re-import an earlier export --------------------------------------
+if st.session_state.file_uploaded and held().get("qsession") is not None:
+    with st.expander("📥 Continue from an earlier export"):
+        st.caption(
+            "Upload a previous export of this file (the .xlsx workbook or the .zip of CSV/JSONL/Parquet). "
+            "Its rows are matched to this upload by URL and text; matched rows are filed with their "
+            "categories and only the unmatched ones stay pending."
+        )
+        prior = st.file_uploader("Earlier export", type=["xlsx", "zip"], key="reimport_upload")
+        if prior is not None and st.button("Restore from export", key="reimport_apply"):
+            qs = held()["qsession"]
+            try:
+                with prof.phase("reimport"), st.spinner("Matching the export to this upload..."):
+                    frames = read_export(prior.getvalue(), prior.name)
+                    if not frames:
+                        raise ValueError("no Qualified / Partial / To Be Decided / Deleted sheets found")
+                    restored = import_export(qs, frames, upload_keys(qs.digest, qs.df))
+                go_to_row(qs.next_row() or 0)
+                st.session_state.reimport_notice = (
+                    f"Restored {restored['matched']} row(s) from {prior.name}: {restored['qualified']} qualified, "
+                    f"{restored['partial']} partial, {restored['to_be_decided']} to be decided and "
+                    f"{restored['deleted']} deleted ({restored['already_filed']} already filed here were kept). "
+                    f"{restored['unmatched']} exported row(s) matched nothing in this upload; "
+                    f"{qs.pending} row(s) left to qualify."
+                )
+                safe_rerun()
+            except Exception as e:
+                st.error(f"Error restoring from export: {e}")
+        if st.session_state.reimport_notice:
+            st.success(st.session_state.reimport_notice)
+
 # ---------- sidebar buckets --------------------------------------------------
-st.sidebar.header("👁 Preview Buckets")
-bucket_options = [
-    "None",
-    f"Deleted Records 🗑️ ({len(st.session_state.deleted)})",
-    f"To Be Decided ⏳ ({len(st.session_state.to_be_decided)})"
-]
-selected_bucket_display = st.sidebar.radio(
-    "Select a bucket to preview",
-    bucket_options,
-    index=0,
-    key="bucket_selector"
-)
-# Map display name to internal bucket name
-bucket_mapping = {
-    "None": None,
-    f"Deleted Records 🗑️ ({len(st.session_state.deleted)})": "deleted",
-    f"To Be Decided ⏳ ({len(st.session_state.to_be_decided)})": "to_be_decided"
-}
-st.session_state.preview_bucket = bucket_mapping[selected_bucket_display]
+with prof.phase("sidebar_buckets"):
+    st.sidebar.header("👁 Preview Buckets")
+    bucket_options = [
+        "None",
+        f"Deleted Records 🗑️ ({bucket_count('deleted')})",
+        f"To Be Decided ⏳ ({bucket_count('to_be_decided')})"
+    ]
+    selected_bucket_display = st.sidebar.radio(
+        "Select a bucket to preview",
+        bucket_options,
+        index=0,
+        key="bucket_selector"
+    )
+    # Map display name to internal bucket name
+    bucket_mapping = {
+        "None": None,
+        f"Deleted Records 🗑️ ({bucket_count('deleted')})": "deleted",
+        f"To Be Decided ⏳ ({bucket_count('to_be_decided')})": "to_be_decided"
+    }
+    st.session_state.preview_bucket = bucket_mapping[selected_bucket_display]
+    clusters = held().get("clusters")
+    if st.session_state.file_uploaded and clusters is not None and clusters.n_duplicates:
+        st.sidebar.caption(
+            f"🔁 {clusters.n_duplicates} syndicated copies in {clusters.n_clusters} clusters "
+            "are qualified together with their first occurrence."
+        )
+
+# ---------- sidebar undo / redo ----------------------------------------------
+def undo_redo(redo: bool):
+    # A callback, so the bucket selector can still be reset before it is drawn
+    qs = held()["qsession"]
+    step = qs.redo() if redo else qs.undo()
+    if step is None:
+        return
+    remember_rows(step.rows)
+    if st.session_state.team_mode:
+        sync_queue(done=step.rows)
+    row = step.rows[0]
+    # The bulk table stays where it is (get: widget state is dropped while the checkbox is hidden)
+    if not st.session_state.get("bulk_mode"):
+        if qs.status.status(row) == PENDING:
+            # Back in the queue: show it in the main view
+            st.session_state.bucket_selector = "None"
+            st.session_state.preview_bucket = None
+            go_to_row(row)
+        else:
+            # Filed again: the main view moves on from it
+            go_to_row(qs.status.seek(st.session_state.row_ptr) or 0)
+    st.session_state.undo_notice = f"{'Redone' if redo else 'Undone'}: {step.label}"
+
+if held().get("qsession") is not None:
+    history = held()["qsession"].history
+    col_undo, col_redo = st.sidebar.columns(2)
+    col_undo.button("↩️ Undo", key="undo", on_click=undo_redo, args=(False,), use_container_width=True,
+                    disabled=history.next_undo() is None, help=history.next_undo())
+    col_redo.button("↪️ Redo", key="redo", on_click=undo_redo, args=(True,), use_container_width=True,
+                    disabled=history.next_redo() is None, help=history.next_redo())
+    if st.session_state.undo_notice:
+        st.sidebar.caption(st.session_state.undo_notice)
+        st.session_state.undo_notice = None
+
+# ---------- sidebar team queue -----------------------------------------------
+if st.session_state.file_uploaded:
+    st.sidebar.header("👥 Team")
+    team_on = st.sidebar.checkbox(
+        "Share this file with other annotators",
+        value=st.session_state.team_mode,
+        key="team_toggle",
+        help="Rows are handed out in leased batches so nobody qualifies the same article twice."
+    )
+    if team_on != st.session_state.team_mode:
+        set_team_mode(team_on)
+        safe_rerun()
+    @fragment(run_every=30)
+    def team_progress():
+        # Polls the queue on its own so other annotators' progress shows without a page rerun
+        progress = get_queue().progress(st.session_state.upload_digest)
+        st.progress(progress["done"] / max(1, st.session_state.total))
+        st.caption(
+            f"{progress['done']} done · {progress['leased']} leased · {progress['open']} open · "
+            f"{progress['annotators']} annotator(s) active"
+        )
+
+    if st.session_state.team_mode:
+        with st.sidebar:
+            team_progress()
+        if st.session_state.team_notice:
+            st.sidebar.warning(st.session_state.team_notice)
+
+# ---------- live analytics ---------------------------------------------------
+def tonality_columns(table: pd.DataFrame) -> pd.DataFrame:
+    # Tonalities in option-bank order, unset last
+    order = [t for t in bank["Tonality"] if t in table.columns]
+    return table[order + [c for c in table.columns if c not in order]]
+
+@fragment
+def analytics_panel():
+    # Drawn from the session's running tallies (updated on every save), never by grouping the exports
+    qs = held().get("qsession")
+    if qs is None:
+        return
+    tallies = qs.tallies
+    with st.container(border=True):
+        st.markdown("#### 📊 Live analytics")
+        cols = st.columns(4)
+        cols[0].metric("Qualified rows", qs.rows("qualified"))
+        cols[1].metric("Partial rows", qs.rows("partial"))
+        cols[2].metric("Category entries", qs.entries("qualified") + qs.entries("partial"))
+        cols[3].metric("Rows left", qs.pending)
+        by_category = tonality_columns(tallies.by_category())
+        if by_category.empty:
+            st.caption("Nothing qualified yet.")
+            return
+        st.markdown("**Share of voice by category and tonality**")
+        st.bar_chart(by_category, horizontal=True)
+        col_dom, col_spk = st.columns(2)
+        with col_dom:
+            st.markdown("**Dominance**")
+            st.bar_chart(tallies.dominance_counts())
+        with col_spk:
+            st.markdown("**Spokesperson**")
+            st.bar_chart(tallies.spokesperson_counts())
+        names = tallies.spokesperson_names()
+        if not names.empty:
+            st.markdown("**Most quoted spokespeople**")
+            st.dataframe(names.head(ANALYTICS_TOP).to_frame(), use_container_width=True)
+        by_publication = tonality_columns(tallies.by_publication())
+        if not by_publication.empty:
+            st.markdown("**Publications**")
+            st.dataframe(by_publication.assign(Total=by_publication.sum(axis=1)).head(ANALYTICS_TOP),
+                         use_container_width=True)
+
+if st.session_state.file_uploaded:
+    st.sidebar.header("📊 Analytics")
+    st.sidebar.checkbox(
+        "Show live analytics",
+        key="show_analytics",
+        help="Category, tonality, dominance, spokesperson and publication counts so far, updated as you save."
+    )
+    if st.session_state.get("show_analytics"):
+        with prof.phase("analytics"):
+            analytics_panel()
+
+# ---------- bulk qualification -----------------------------------------------
+if st.session_state.file_uploaded:
+    st.sidebar.header("📋 Bulk")
+    st.sidebar.checkbox(
+        "Bulk qualification mode",
+        key="bulk_mode",
+        help="Filter the file and qualify every matching row in one go."
+    )
+
+def bulk_filter(df: pd.DataFrame, column: str | None, values: list, query: str) -> np.ndarray:
+    # Boolean mask over df_work; cached until the filter changes (statuses are applied on top)
+    key = (st.session_state.upload_digest, column, tuple(values), query)
+    cached = st.session_state.bulk_filter_cache
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    mask = np.ones(len(df), dtype=bool)
+    if column and values:
+        mask &= df[column].astype(str).isin(values).to_numpy()
+    if query:
+        hit = np.zeros(len(df), dtype=bool)
+        hit[search_index(st.session_state.upload_digest, df).search(query)] = True
+        mask &= hit
+    st.session_state.bulk_filter_cache = (key, mask)
+    st.session_state.bulk_excluded = set()
+    st.session_state.bulk_editor_gen += 1
+    return mask
+
+@fragment
+@prof.timed("bulk_panel")
+def bulk_panel():
+    # Filter, pick rows page by page, then write one qualification to all of them
+    qs, df = held()["qsession"], held()["df_work"]
+    st.header("Bulk Qualification")
+    if st.session_state.bulk_notice:
+        st.success(st.session_state.bulk_notice)
+        st.session_state.bulk_notice = None
+
+    col_f, col_v, col_q = st.columns([1, 2, 2])
+    with col_f:
+        column = st.selectbox("Filter column", list(df.columns), index=None, key="bulk_filter_column",
+                              placeholder="Any column")
+    values = []
+    if column:
+        with col_v:
+            choices = df[column].dropna().astype(str).value_counts().index[:BULK_MAX_CHOICES].tolist()
+            values = st.multiselect("Values", choices, key=f"bulk_filter_values_{column}")
+    with col_q:
+        query = st.text_input("Search headline / text / publication", key="bulk_query").strip()
+    include_done = st.checkbox("Include rows already qualified, parked or deleted", key="bulk_include_done")
+
+    codes = qs.status.codes
+    # In team mode rows leased to others stay UNASSIGNED here and are never offered
+    scope = (codes != UNASSIGNED) if include_done else (codes == PENDING)
+    ids = np.flatnonzero(bulk_filter(df, column, values, query) & scope)
+    excluded = st.session_state.bulk_excluded
+    if not len(ids):
+        st.info("No rows match the current filter.")
+        return
+
+    pages = (len(ids) - 1) // BULK_PAGE_SIZE + 1
+    st.session_state.bulk_page = min(st.session_state.bulk_page, pages)
+    col_pg, col_all, col_none = st.columns([2, 1, 1])
+    with col_pg:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="bulk_page")
+    with col_all:
+        if st.button("Select all matches", key="bulk_select_all", use_container_width=True):
+            excluded.clear()
+            st.session_state.bulk_editor_gen += 1
+            rerun_fragment()
+    with col_none:
+        if st.button("Clear selection", key="bulk_select_none", use_container_width=True):
+            excluded.update(ids.tolist())
+            st.session_state.bulk_editor_gen += 1
+            rerun_fragment()
+
+    page_ids = ids[(page - 1) * BULK_PAGE_SIZE:page * BULK_PAGE_SIZE]
+    view = df.iloc[page_ids].reset_index(drop=True)
+    view.insert(0, "Apply", [r not in excluded for r in page_ids.tolist()])
+    view.insert(1, "Row", page_ids + 1)
+    view.insert(2, "Status", [STATUS_NAMES[c] for c in codes[page_ids]])
+    edited = st.data_editor(
+        view,
+        key=f"bulk_editor_{st.session_state.bulk_editor_gen}_{include_done}_{page}",
+        hide_index=True,
+        disabled=[c for c in view.columns if c != "Apply"],
+        use_container_width=True
+    )
+    for r, keep in zip(page_ids.tolist(), edited["Apply"].tolist()):
+        if keep:
+            excluded.discard(r)
+        else:
+            excluded.add(r)
+    selected = ids[~np.isin(ids, np.fromiter(excluded, dtype=np.int64, count=len(excluded)))]
+    st.caption(f"{len(selected)} of {len(ids)} matching row(s) selected")
+
+    with st.form("bulk_apply"):
+        cats = st.multiselect("Categories", bank["Category"] + st.session_state.saved_user_categories)
+        q = {}
+        col_d, col_p, col_s, col_pg, col_t = st.columns(5)
+        q["Dominance"] = col_d.selectbox("Dominance", bank["Dominance"], index=None)
+        q["Prominence"] = col_p.multiselect("Prominence", bank["Prominence"])
+        q["Spokesperson"] = col_s.selectbox("Spokesperson", bank["Spokesperson"], index=None)
+        q["Page"] = col_pg.number_input("Page", min_value=0, step=1, value=0)
+        q["Tonality"] = col_t.selectbox("Tonality", bank["Tonality"], index=None)
+        name = st.text_input("Spokesperson Name with Designation")
+        q["Spokesperson Name with Designation"] = name if q["Spokesperson"] else None
+        if st.form_submit_button(f"Apply to {len(selected)} row(s) ✅", use_container_width=True):
+            missing = [f for f in ("Dominance", "Tonality") if q[f] is None]
+            if not cats:
+                st.warning("Please select at least one category.")
+            elif missing:
+                st.warning(f"Please select values for the following mandatory fields: {', '.join(missing)}.")
+            elif not len(selected):
+                st.warning("No rows are selected.")
+            else:
+                # One vectorised write per category, then every row is filed as qualified or partial
+                with qs.step(f"Bulk qualification of {len(selected)} row(s)"):
+                    for c in cats:
+                        qs.qualify_rows(selected, c, q)
+                    filed = qs.submit_rows(selected)
+                remember_rows(selected)
+                if st.session_state.team_mode:
+                    sync_queue(done=selected.tolist())
+                st.session_state.bulk_notice = (
+                    f"Qualified {len(selected)} row(s): {int((filed == STATUS_CODES['qualified']).sum())} "
+                    f"complete, {int((filed == STATUS_CODES['partial']).sum())} partial."
+                )
+                st.session_state.bulk_excluded = set()
+                st.session_state.bulk_editor_gen += 1
+                safe_rerun()
+
+if st.session_state.file_uploaded and st.session_state.bulk_mode:
+    bulk_panel()
+
+# ---------- search / jump to row ---------------------------------------------
+def jump_to_hit():
+    if st.session_state.search_jump is not None:
+        go_to_row(st.session_state.search_jump)
+        st.session_state.search_jump = None
+
+if st.session_state.file_uploaded and not st.session_state.bulk_mode and st.session_state.preview_bucket is None:
+    with prof.phase("search"):
+        qs = held()["qsession"]
+        query = st.text_input(
+            "🔎 Search articles",
+            key="search_query",
+            placeholder="Words from the headline, text or publication (prefixes match too)"
+        ).strip()
+        st.session_state.search_hits = search_index(qs.digest, qs.df).search(query) if query else None
+        hits = st.session_state.search_hits
+        if hits is not None:
+            pending_hits = hits[qs.status.codes[hits] == PENDING]
+            st.caption(f"{len(hits)} matching row(s), {len(pending_hits)} still pending")
+            col_jump, col_only = st.columns([3, 1])
+            with col_jump:
+                headlines = qs.df["Headline"] if "Headline" in qs.df.columns else None
+                st.selectbox(
+                    "Jump to",
+                    pending_hits[:SEARCH_JUMP_LIMIT].tolist(),
+                    index=None,
+                    format_func=lambda r: f"Row {r+1}" + (f": {str(headlines.iat[r])[:80]}" if headlines is not None else ""),
+                    key="search_jump",
+                    placeholder="Pick a matching row",
+                    on_change=jump_to_hit
+                )
+            with col_only:
+                st.toggle("Only matching rows", key="search_only",
+                          help="Save & Next, To Be Decided and Delete move on to the next matching row.")
+            if st.session_state.search_only and not len(pending_hits):
+                st.info("No pending rows match this search; showing all pending rows.")
 
 # ---------- preview current row ---------------------------------------------
-if st.session_state.file_uploaded and (
-    (st.session_state.preview_bucket is None and not st.session_state.df_work.empty) or
-    (st.session_state.preview_bucket and not st.session_state[st.session_state.preview_bucket].empty)
-):
+if st.session_state.file_uploaded and not st.session_state.bulk_mode and rows_left(st.session_state.preview_bucket):
+    qs = held()["qsession"]
+    current_bucket = st.session_state.preview_bucket
+    # i is always the stable row id in df_work; buckets are views over the row statuses
     if st.session_state.preview_bucket is None:
-        i = st.session_state.row_ptr
-        source_df = st.session_state.df_work
+        i = qs.status.seek(st.session_state.row_ptr)
+        hit = search_next(st.session_state.row_ptr, inclusive=True)
+        if hit is not None and hit != i:
+            go_to_row(hit)
+            i = hit
+        st.session_state.row_ptr = i
+        bucket_pos = None
         total_rows = st.session_state.total
         is_bucket = False
     else:
-        i = st.session_state.bucket_row_ptr
-        source_df = st.session_state[st.session_state.preview_bucket]
-        total_rows = len(st.session_state[st.session_state.preview_bucket])
+        bucket_ids = qs.bucket_rows(st.session_state.preview_bucket)
+        total_rows = len(bucket_ids)
+        bucket_pos = min(st.session_state.bucket_row_ptr, total_rows - 1)
+        st.session_state.bucket_row_ptr = bucket_pos
+        i = int(bucket_ids[bucket_pos])
         is_bucket = True
 
-    # Ensure row is a pandas Series
-    row = source_df.iloc[i]
+    # Fetch this row's article and the next few rows' in the background while it is being read
+    if "URL" in qs.df.columns:
+        with prof.phase("prefetch"):
+            if is_bucket:
+                upcoming = bucket_ids[bucket_pos + 1:bucket_pos + 1 + PREFETCH_AHEAD].tolist()
+            else:
+                upcoming, r = [], i
+                while len(upcoming) < PREFETCH_AHEAD:
+                    r = qs.next_row(r)
+                    if r is None or r == i or r in upcoming:
+                        break
+                    upcoming.append(r)
+            urls = qs.df["URL"].iloc[[i, *upcoming]]
+            get_prefetcher().prefetch(urls[urls.notna()].astype(str).tolist())
+
+    with prof.phase("row_preview"):
+        # Ensure row is a pandas Series
+        row = qs.df.iloc[i]
+
+        st.header("Row-by-Row Preview")
+        if is_bucket:
+            st.markdown(f"### Row {bucket_pos+1} / {total_rows}")
+        else:
+            st.markdown(f"### Row {i+1} / {total_rows}")
+            st.caption(f"{qs.pending} of {total_rows} rows still pending")
+
+        st.dataframe(pd.DataFrame(row).T, hide_index=True, use_container_width=True)
+
+        if "URL" in row and pd.notna(row["URL"]):
+            st.markdown(f"[**Open Article ↗**]({row['URL']})")
+            article_preview(i, str(row["URL"]))
 
-    st.header("Row-by-Row Preview")
-    st.markdown(f"### Row {i+1} / {total_rows}")
+    # ---------- syndicated copies -------------------------------------------
+    def pending_copies(row_id: int) -> list:
+        clusters = held().get("clusters")
+        if clusters is None or clusters.size(row_id) == 1:
+            return []
+        return [int(m) for m in clusters.members(row_id) if qs.status.status(m) == PENDING]
 
-    st.dataframe(pd.DataFrame(row).T, hide_index=True, use_container_width=True)
+    def fan_out_targets(row_id: int) -> list:
+        # Pending copies of row_id, minus the ones the annotator split off to qualify separately
+        excluded = set(st.session_state.get(f"fanout_exclude_{row_id}", []))
+        return [m for m in pending_copies(row_id) if m not in excluded]
 
-    if "URL" in row and pd.notna(row["URL"]):
-        st.markdown(f"[**Open Article ↗**]({row['URL']})")
+    copies = [] if is_bucket else pending_copies(i)
+    if copies:
+        with st.expander(f"🔁 {len(copies)} near-duplicate row(s) will get the same qualification"):
+            cols = [c for c in ("Publication", "Date", "Headline", "URL") if c in qs.df.columns]
+            st.dataframe(
+                qs.df.iloc[copies][cols].set_axis([f"Row {m+1}" for m in copies]),
+                use_container_width=True
+            )
+            st.multiselect(
+                "Qualify these rows separately",
+                copies,
+                format_func=lambda m: f"Row {m+1}",
+                key=f"fanout_exclude_{i}"
+            )
 
     # Navigation buttons for bucket preview
     if is_bucket:
         col_nav1, col_nav2 = st.columns(2)
         with col_nav1:
-            if st.button("Previous ⬅️", key=f"prev_{i}_{st.session_state.preview_bucket}", disabled=(i == 0)):
-                st.session_state.bucket_row_ptr = max(0, i - 1)
+            if st.button("Previous ⬅️", key=f"prev_{i}_{st.session_state.preview_bucket}", disabled=(bucket_pos == 0)):
+                st.session_state.bucket_row_ptr = max(0, bucket_pos - 1)
                 st.session_state.no_more_records_message = None
                 safe_rerun()
         with col_nav2:
-            if st.button("Next ➡️", key=f"next_{i}_{st.session_state.preview_bucket}", disabled=(i >= total_rows - 1)):
-                st.session_state.bucket_row_ptr = min(total_rows - 1, i + 1)
+            if st.button("Next ➡️", key=f"next_{i}_{st.session_state.preview_bucket}", disabled=(bucket_pos >= total_rows - 1)):
+                st.session_state.bucket_row_ptr = min(total_rows - 1, bucket_pos + 1)
                 st.session_state.no_more_records_message = None
                 safe_rerun()
 
-    # ---------- save_and_advance function ------------------------------------
-    def save_and_advance(advance_to_next_row: bool):
-        # Save qualifications for the current category
-        if st.session_state.current_category_index < len(st.session_state.category_selection_order):
-            current_category = st.session_state.category_selection_order[st.session_state.current_category_index]
-            qual = st.session_state.qualifications_by_category.get(i, {}).get(current_category, {})
-            if qual:
-                # Ensure Prominence is a list
-                if "Prominence" in qual and (qual["Prominence"] is None or not isinstance(qual["Prominence"], list)):
-                    qual["Prominence"] = []
-                # Convert Prominence list to a string for storage
-                qual_copy = qual.copy()
-                qual_copy["Prominence"] = ", ".join(qual["Prominence"]) if qual["Prominence"] else None
-                # Use the actual row (pandas Series)
-                ann = row.to_frame().T.assign(**qual_copy)
-                # Check if Dominance, Prominence, Page, or Tonality are None or empty
-                is_partial = (
-                    pd.isna(ann["Dominance"]).iloc[0] or
-                    (not qual["Prominence"]) or  # Prominence is an empty list
-                    pd.isna(ann["Tonality"]).iloc[0]
-                    # Page is valid if 0 or greater, so we don't check it for partial
-                )
-                bucket = "partial" if is_partial else "qualified"
-                st.session_state[bucket] = pd.concat(
-                    [st.session_state[bucket], ann], ignore_index=True
-                )
-                if current_category not in st.session_state.qualified_categories_by_row.get(i, []):
-                    st.session_state.qualified_categories_by_row.setdefault(i, []).append(current_category)
+    # Keyword-rule suggestions for the whole file, computed once per upload and rule bank version
+    with prof.phase("rule_suggestions"):
+        suggestions = suggest_upload(qs.digest, rules.version, qs.df)
+        offered = bank["Category"] + st.session_state.saved_user_categories
+        suggested = [c for c in suggestions.categories(i) if c in offered]
 
-        # Update state
-        if advance_to_next_row:
-            if is_bucket:
-                current_bucket = st.session_state.preview_bucket
-                total_rows_before_drop = len(st.session_state[current_bucket])
-                st.session_state[current_bucket].drop(index=i, inplace=True)
-                st.session_state[current_bucket].reset_index(drop=True, inplace=True)
-                total_rows_new = len(st.session_state[current_bucket])
-                if total_rows_new == 0:
-                    st.session_state.preview_bucket = None
-                    st.session_state.bucket_row_ptr = 0
-                    st.session_state.no_more_records_message = f"No more records in the selected preview bucket ('{current_bucket}')."
-                else:
-                    st.session_state.bucket_row_ptr = min(i + 1, total_rows_new - 1) if total_rows_new > 0 else 0
-                    st.session_state.no_more_records_message = None
+    # ---------- move_row function --------------------------------------------
+    @prof.timed("bucket_bookkeeping")
+    def move_row(code: int):
+        # Re-file the current row under `code` and point at the next one; df_work is never touched
+        nxt = qs.move(i, code)
+        if is_bucket:
+            remember_rows([i])
+            total_rows_new = rows_left(current_bucket)
+            if total_rows_new == 0:
+                st.session_state.preview_bucket = None
+                st.session_state.bucket_row_ptr = 0
+                st.session_state.no_more_records_message = f"No more records in the selected preview bucket ('{current_bucket}')."
             else:
-                st.session_state.df_work.drop(index=i, inplace=True)
-                st.session_state.df_work.reset_index(drop=True, inplace=True)
-                st.session_state.total = len(st.session_state.df_work)
+                # A row that leaves the bucket hands its slot to the one after it
+                stays = code == STATUS_CODES[current_bucket]
+                st.session_state.bucket_row_ptr = min(bucket_pos + stays, total_rows_new - 1)
                 st.session_state.no_more_records_message = None
+        else:
+            # Syndicated copies still pending get the same qualification, unless split off;
+            # parking or deleting the row leaves them pending
+            targets = fan_out_targets(i) if code not in (TBD, DELETED) else []
+            if targets:
+                qs.fan_out(i, targets)
+                nxt = qs.next_row(i)
+            remember_rows([i, *targets])
+            if st.session_state.team_mode:
+                sync_queue(done=[i, *targets])
+                nxt = qs.next_row(i)
+            hit = search_next(i)
+            if hit is not None:
+                nxt = hit
+            st.session_state.row_ptr = 0 if nxt is None else nxt
+            st.session_state.no_more_records_message = None
 
-        if (not is_bucket and st.session_state.df_work.empty) or (is_bucket and st.session_state[st.session_state.preview_bucket].empty):
+    # ---------- save_and_advance function ------------------------------------
+    @prof.timed("save_and_advance")
+    def save_and_advance(advance_to_next_row: bool, qual: dict | None = None):
+        with qs.step(f"Save & Next on row {i+1}" if advance_to_next_row else f"Qualification of row {i+1}"):
+            # Save the qualification drafted for the current category, if any
+            if qual and st.session_state.current_category_index < len(st.session_state.category_selection_order):
+                current_category = st.session_state.category_selection_order[st.session_state.current_category_index]
+                qs.qualify(i, current_category, qual)
+
+            # Update state
+            if advance_to_next_row:
+                move_row(qs.row_code(i))
+
+        if rows_left(current_bucket) == 0:
             st.session_state.row_ptr = 0
             st.session_state.bucket_row_ptr = 0
-            st.session_state.file_uploaded = False if not is_bucket else st.session_state.file_uploaded
             st.session_state.selected_categories = []
             st.session_state.category_selection_order = []
-            st.session_state.qualifications_by_category = {}
-            st.session_state.qualified_categories_by_row = {}
             st.session_state.show_caution_message = False
             st.session_state.confirm_categories = False
             st.session_state.current_category_index = 0
@@ -246,12 +957,10 @@ if st.session_state.file_uploaded and (
                     # Already updated bucket_row_ptr
                     pass
                 else:
-                    st.session_state.row_ptr = min(i + 1, len(st.session_state.df_work) - 1) if len(st.session_state.df_work) > 0 else 0
-                    qualified_categories = st.session_state.qualified_categories_by_row.get(st.session_state.row_ptr, [])
+                    # row_ptr already points at the next pending row
+                    qualified_categories = qs.categories(st.session_state.row_ptr)
                     st.session_state.selected_categories = qualified_categories.copy()
                     st.session_state.category_selection_order = qualified_categories.copy()
-                    st.session_state.qualifications_by_category[st.session_state.row_ptr] = {}
-                    st.session_state.qualified_categories_by_row[st.session_state.row_ptr] = qualified_categories
                     st.session_state.show_caution_message = False
                     st.session_state.confirm_categories = False
                     st.session_state.current_category_index = 0
@@ -265,222 +974,335 @@ if st.session_state.file_uploaded and (
 
     # ---------- save_category_changes function --------------------------------
     def save_category_changes(category: str, q: dict):
-        if "Prominence" not in q or q["Prominence"] is None:
-            q["Prominence"] = []
-        st.session_state.qualifications_by_category.setdefault(i, {})[category] = q
-        qual = q.copy()
-        qual["Prominence"] = ", ".join(qual["Prominence"]) if qual["Prominence"] else None
-        ann = row.to_frame().T.assign(**qual)
-        is_partial = (
-            pd.isna(ann["Dominance"]).iloc[0] or
-            (not q["Prominence"]) or
-            pd.isna(ann["Tonality"]).iloc[0]
-        )
-        bucket = "partial" if is_partial else "qualified"
-        for b in ["qualified", "partial"]:
-            if not st.session_state[b].empty:
-                st.session_state[b] = st.session_state[b][
-                    ~((st.session_state[b]["Category"] == category) & (st.session_state[b].index == i))
-                ]
-        st.session_state[bucket] = pd.concat(
-            [st.session_state[bucket], ann], ignore_index=True
-        )
-        if is_bucket:
-            current_bucket = st.session_state.preview_bucket
-            total_rows_before_drop = len(st.session_state[current_bucket])
-            st.session_state[current_bucket].drop(index=i, inplace=True)
-            st.session_state[current_bucket].reset_index(drop=True, inplace=True)
-            total_rows_new = len(st.session_state[current_bucket])
-            if total_rows_new == 0:
-                st.session_state.preview_bucket = None
-                st.session_state.bucket_row_ptr = 0
-                st.session_state.no_more_records_message = f"No more records in the selected preview bucket ('{current_bucket}')."
+        with qs.step(f"Edit of row {i+1}"):
+            qs.qualify(i, category, q)
+            if is_bucket:
+                move_row(qs.row_code(i))
+        safe_rerun()
+
+    # ---------- category grid (fragment) -------------------------------------
+    @fragment
+    @prof.timed("category_grid")
+    def category_grid():
+        # Ticking categories only reruns this panel; a change the rest of the page depends on
+        # (TBD/Delete buttons, the category being qualified) reruns the whole script
+        # Initialize selected_categories and category_selection_order
+        qualified_categories = qs.categories(i)
+        if not st.session_state.confirm_categories:
+            # Pre-tick the rule suggestions once per row, and only on rows nobody has qualified yet
+            if st.session_state.suggested_row != i:
+                st.session_state.suggested_row = i
+                if suggested and not qualified_categories and not st.session_state.selected_categories:
+                    st.session_state.selected_categories = suggested.copy()
+                    st.session_state.category_selection_order = suggested.copy()
+            if not st.session_state.selected_categories:
+                st.session_state.selected_categories = qualified_categories.copy()
+            if not st.session_state.category_selection_order:
+                st.session_state.category_selection_order = qualified_categories.copy()
+        before = (bool(st.session_state.selected_categories), list(st.session_state.category_selection_order))
+
+
+        # Single-column layout: Select Categories and Qualify Categories stacked vertically
+        st.markdown("#### Select Categories")
+        if qualified_categories:
+            st.info(
+                f"**Note**: The following categories have already been qualified for this row: "
+                f"{', '.join(qualified_categories)}."
+            )
+        else:
+            st.info("**Note**: No categories have been qualified for this row yet.")
+        if suggested:
+            st.caption(f"💡 Suggested by keyword rules: {', '.join(suggested)}")
+
+        # Display predefined categories in a 4-column grid
+        predefined_categories = []
+        previous_selected = st.session_state.selected_categories.copy()
+        categories = bank["Category"]
+        num_cols = 4
+        num_rows = (len(categories) + num_cols - 1) // num_cols  # Ceiling division
+
+        for row_idx in range(num_rows):
+            cols = st.columns(num_cols)
+            for col_idx, col in enumerate(cols):
+                cat_idx = row_idx * num_cols + col_idx
+                if cat_idx < len(categories):
+                    cat = categories[cat_idx]
+                    with col:
+                        default_value = (cat in previous_selected) or (cat in qualified_categories)
+                        selected = st.checkbox(cat, key=f"cat_{cat}_{i}", value=default_value, label_visibility="visible")
+                        if selected and cat not in st.session_state.selected_categories:
+                            st.session_state.selected_categories.append(cat)
+                            if cat not in st.session_state.category_selection_order:
+                                st.session_state.category_selection_order.append(cat)
+                            if st.session_state.show_caution_message:
+                                st.session_state.show_caution_message = False
+                                safe_rerun()
+                        elif not selected and cat in st.session_state.selected_categories:
+                            st.session_state.selected_categories.remove(cat)
+                            if cat in st.session_state.category_selection_order:
+                                st.session_state.category_selection_order.remove(cat)
+                        if selected:
+                            predefined_categories.append(cat)
+                    # Place "Add custom category" and "Select saved custom categories" in the same row as "Work Environment"
+                    if cat_idx == len(categories) - 1:  # When rendering "Work Environment"
+                        with cols[1]:  # Second column in the same row
+                            new_category = st.text_input(
+                                "Add custom category",
+                                key=f"add_category_{i}",
+                                label_visibility="collapsed",
+                                placeholder="Type custom category and press Enter"
+                            )
+                        with cols[2]:  # Third column in the same row
+                            st.markdown("**Select saved custom categories:**")
+                            previous_saved_selected = [cat for cat in st.session_state.selected_categories if cat in st.session_state.saved_user_categories]
+                            default_saved_selected = list(
+                                set(previous_saved_selected + [cat for cat in qualified_categories if cat in st.session_state.saved_user_categories])
+                            )
+                            saved_selected_categories = st.multiselect(
+                                "",
+                                st.session_state.saved_user_categories,
+                                default=default_saved_selected,
+                                key=f"saved_categories_multiselect_{i}",
+                                label_visibility="collapsed"
+                            )
+
+        # Handle logic for adding and removing categories
+        if new_category and new_category not in st.session_state.saved_user_categories:
+            st.session_state.saved_user_categories = options.add_custom(new_category)
+
+        added_categories = [cat for cat in saved_selected_categories if cat not in previous_saved_selected]
+        removed_categories = [cat for cat in previous_saved_selected if cat not in saved_selected_categories]
+        for cat in removed_categories:
+            if cat in st.session_state.selected_categories:
+                st.session_state.selected_categories.remove(cat)
+            if cat in st.session_state.category_selection_order:
+                st.session_state.category_selection_order.remove(cat)
+        for cat in added_categories:
+            if cat not in st.session_state.selected_categories:
+                st.session_state.selected_categories.append(cat)
+            if cat not in st.session_state.category_selection_order:
+                st.session_state.category_selection_order.append(cat)
+            if st.session_state.show_caution_message:
+                st.session_state.show_caution_message = False
+                safe_rerun()
+
+        categories = predefined_categories + saved_selected_categories
+        if new_category and new_category not in categories:
+            categories.append(new_category)
+            if new_category not in st.session_state.selected_categories:
+                st.session_state.selected_categories.append(new_category)
+            if new_category not in st.session_state.category_selection_order:
+                st.session_state.category_selection_order.append(new_category)
+            if st.session_state.show_caution_message:
+                st.session_state.show_caution_message = False
+                safe_rerun()
+
+        st.session_state.selected_categories = categories
+
+        # Confirm Categories button (immediately below the row)
+        if st.button("Confirm Categories ✅", key=f"confirm_categories_{i}", use_container_width=True):
+            if not st.session_state.selected_categories:
+                st.warning("Please select at least one category before confirming.")
             else:
-                st.session_state.bucket_row_ptr = min(i + 1, total_rows_new - 1) if total_rows_new > 0 else 0
+                st.session_state.confirm_categories = True
+                unqualified_categories = [cat for cat in st.session_state.category_selection_order if cat not in qualified_categories]
+                st.session_state.current_category_index = (
+                    st.session_state.category_selection_order.index(unqualified_categories[0])
+                    if unqualified_categories else 0
+                )
+                st.session_state.show_caution_message = False
                 st.session_state.no_more_records_message = None
-        safe_rerun()
+                safe_rerun()
 
-    # Initialize qualifications and qualified categories for this row
-    if i not in st.session_state.qualifications_by_category:
-        st.session_state.qualifications_by_category[i] = {}
-    if i not in st.session_state.qualified_categories_by_row:
-        st.session_state.qualified_categories_by_row[i] = []
-
-    # Initialize selected_categories and category_selection_order
-    qualified_categories = st.session_state.qualified_categories_by_row.get(i, [])
-    if not st.session_state.confirm_categories:
-        if not st.session_state.selected_categories:
-            st.session_state.selected_categories = qualified_categories.copy()
-        if not st.session_state.category_selection_order:
-            st.session_state.category_selection_order = qualified_categories.copy()
-
-    # Single-column layout: Select Categories and Qualify Categories stacked vertically
-    st.markdown("#### Select Categories")
-    if qualified_categories:
-        st.info(
-            f"**Note**: The following categories have already been qualified for this row: "
-            f"{', '.join(qualified_categories)}."
-        )
-    else:
-        st.info("**Note**: No categories have been qualified for this row yet.")
-
-    # Display predefined categories in a 4-column grid
-    predefined_categories = []
-    previous_selected = st.session_state.selected_categories.copy()
-    categories = bank["Category"]
-    num_cols = 4
-    num_rows = (len(categories) + num_cols - 1) // num_cols  # Ceiling division
-
-    for row_idx in range(num_rows):
-        cols = st.columns(num_cols)
-        for col_idx, col in enumerate(cols):
-            cat_idx = row_idx * num_cols + col_idx
-            if cat_idx < len(categories):
-                cat = categories[cat_idx]
-                with col:
-                    default_value = (cat in previous_selected) or (cat in qualified_categories)
-                    selected = st.checkbox(cat, key=f"cat_{cat}_{i}", value=default_value, label_visibility="visible")
-                    if selected and cat not in st.session_state.selected_categories:
-                        st.session_state.selected_categories.append(cat)
-                        if cat not in st.session_state.category_selection_order:
-                            st.session_state.category_selection_order.append(cat)
-                        if st.session_state.show_caution_message:
-                            st.session_state.show_caution_message = False
-                            safe_rerun()
-                    elif not selected and cat in st.session_state.selected_categories:
-                        st.session_state.selected_categories.remove(cat)
-                        if cat in st.session_state.category_selection_order:
-                            st.session_state.category_selection_order.remove(cat)
-                    if selected:
-                        predefined_categories.append(cat)
-                # Place "Add custom category" and "Select saved custom categories" in the same row as "Work Environment"
-                if cat_idx == len(categories) - 1:  # When rendering "Work Environment"
-                    with cols[1]:  # Second column in the same row
-                        new_category = st.text_input(
-                            "Add custom category",
-                            key=f"add_category_{i}",
-                            label_visibility="collapsed",
-                            placeholder="Type custom category and press Enter"
-                        )
-                    with cols[2]:  # Third column in the same row
-                        st.markdown("**Select saved custom categories:**")
-                        previous_saved_selected = [cat for cat in st.session_state.selected_categories if cat in st.session_state.saved_user_categories]
-                        default_saved_selected = list(
-                            set(previous_saved_selected + [cat for cat in qualified_categories if cat in st.session_state.saved_user_categories])
-                        )
-                        saved_selected_categories = st.multiselect(
-                            "",
-                            st.session_state.saved_user_categories,
-                            default=default_saved_selected,
-                            key=f"saved_categories_multiselect_{i}",
-                            label_visibility="collapsed"
-                        )
-
-    # Handle logic for adding and removing categories
-    if new_category and new_category not in st.session_state.saved_user_categories:
-        st.session_state.saved_user_categories.append(new_category)
-        bank["SavedUserCategories"] = st.session_state.saved_user_categories
-        save_bank(bank)
-
-    added_categories = [cat for cat in saved_selected_categories if cat not in previous_saved_selected]
-    removed_categories = [cat for cat in previous_saved_selected if cat not in saved_selected_categories]
-    for cat in removed_categories:
-        if cat in st.session_state.selected_categories:
-            st.session_state.selected_categories.remove(cat)
-        if cat in st.session_state.category_selection_order:
-            st.session_state.category_selection_order.remove(cat)
-    for cat in added_categories:
-        if cat not in st.session_state.selected_categories:
-            st.session_state.selected_categories.append(cat)
-        if cat not in st.session_state.category_selection_order:
-            st.session_state.category_selection_order.append(cat)
-        if st.session_state.show_caution_message:
-            st.session_state.show_caution_message = False
+        after = (bool(st.session_state.selected_categories), list(st.session_state.category_selection_order))
+        if before[0] != after[0] or (st.session_state.confirm_categories and before[1] != after[1]):
             safe_rerun()
 
-    categories = predefined_categories + saved_selected_categories
-    if new_category and new_category not in categories:
-        categories.append(new_category)
-        if new_category not in st.session_state.selected_categories:
-            st.session_state.selected_categories.append(new_category)
-        if new_category not in st.session_state.category_selection_order:
-            st.session_state.category_selection_order.append(new_category)
-        if st.session_state.show_caution_message:
-            st.session_state.show_caution_message = False
-            safe_rerun()
+    category_grid()
+
+    st.divider()
 
-    st.session_state.selected_categories = categories
+    # ---------- qualify panel (fragment) --------------------------------------
+    @fragment
+    @prof.timed("qualify_panel")
+    def qualify_panel():
+        # Field changes rerun only this panel; the draft is kept in session state for Save & Next
+        current_category = st.session_state.category_selection_order[st.session_state.current_category_index]
+        total_categories = len(st.session_state.category_selection_order)
+        current_category_num = st.session_state.current_category_index + 1
+        st.markdown(f"#### Qualify for '{current_category}' Category ({current_category_num}/{total_categories})")
 
-    # Confirm Categories button (immediately below the row)
-    if st.button("Confirm Categories ✅", key=f"confirm_categories_{i}", use_container_width=True):
-        if not st.session_state.selected_categories:
-            st.warning("Please select at least one category before confirming.")
-        else:
-            st.session_state.confirm_categories = True
-            unqualified_categories = [cat for cat in st.session_state.category_selection_order if cat not in qualified_categories]
-            st.session_state.current_category_index = (
-                st.session_state.category_selection_order.index(unqualified_categories[0])
-                if unqualified_categories else 0
+        current_qualifications = qs.get(i, current_category) or {}
+        q = {}
+        q["Category"] = current_category
+
+        # Arrange fields in a single row
+        col_d, col_p, col_s, col_pg, col_t = st.columns([1, 1, 1, 1, 1])
+
+        with col_d:
+            st.markdown("**Dominance**")
+            default_dominance = current_qualifications.get("Dominance")
+            q["Dominance"] = st.radio(
+                "",
+                bank["Dominance"],
+                index=bank["Dominance"].index(default_dominance) if default_dominance in bank["Dominance"] else None,
+                key=f"sel_dominance_{i}_{st.session_state.current_category_index}",
+                label_visibility="collapsed"
             )
-            st.session_state.show_caution_message = False
-            st.session_state.no_more_records_message = None
-            safe_rerun()
 
-    st.divider()
+        with col_p:
+            st.markdown("**Prominence**")
+            default_prominence = current_qualifications.get("Prominence", [])
+            if default_prominence is None:
+                default_prominence = []
+            prominence_selections = []
+            for option in bank["Prominence"]:
+                selected = option in default_prominence
+                if st.checkbox(
+                    option,
+                    value=selected,
+                    key=f"prominence_{option}_{i}_{current_category}",
+                    label_visibility="visible"
+                ):
+                    prominence_selections.append(option)
+            q["Prominence"] = prominence_selections
 
-    # Qualify for the Selected Category section
-    if st.session_state.confirm_categories and st.session_state.selected_categories and st.session_state.category_selection_order:
-        if st.session_state.current_category_index < len(st.session_state.category_selection_order):
-            current_category = st.session_state.category_selection_order[st.session_state.current_category_index]
-            total_categories = len(st.session_state.category_selection_order)
-            current_category_num = st.session_state.current_category_index + 1
-            st.markdown(f"#### Qualify for '{current_category}' Category ({current_category_num}/{total_categories})")
+        with col_s:
+            st.markdown("**Spokesperson**")
+            default_spokesperson = (
+                current_qualifications.get("Spokesperson") if current_qualifications else suggestions.spokesperson(i)
+            )
+            q["Spokesperson"] = st.radio(
+                "",
+                bank["Spokesperson"],
+                index=bank["Spokesperson"].index(default_spokesperson) if default_spokesperson in bank["Spokesperson"] else None,
+                key=f"sel_spokesperson_{i}_{st.session_state.current_category_index}",
+                label_visibility="collapsed"
+            )
+
+        with col_pg:
+            st.markdown("**Page**")
+            default_page = current_qualifications.get("Page", 0)
+            default_page = 0 if default_page is None else default_page
+            q["Page"] = st.number_input(
+                "",
+                min_value=0,
+                step=1,
+                value=default_page,
+                key=f"page_{i}_{current_category}",
+                label_visibility="collapsed"
+            )
+
+        with col_t:
+            st.markdown("**Tonality**")
+            default_tonality = (
+                current_qualifications.get("Tonality") if current_qualifications else suggestions.tonality(i)
+            )
+            q["Tonality"] = st.radio(
+                "",
+                bank["Tonality"],
+                index=bank["Tonality"].index(default_tonality) if default_tonality in bank["Tonality"] else None,
+                key=f"sel_tonality_{i}_{st.session_state.current_category_index}",
+                label_visibility="collapsed"
+            )
+
+        # Spokesperson Name with Designation (below if Spokesperson is selected)
+        if q["Spokesperson"]:
+            st.markdown("**Spokesperson Name with Designation**")
+            default_spokesperson_name = current_qualifications.get("Spokesperson Name with Designation", "")
+            q["Spokesperson Name with Designation"] = st.text_input(
+                "",
+                value=default_spokesperson_name,
+                key=f"spokesperson_name_{i}_{current_category}",
+                label_visibility="collapsed"
+            )
+        else:
+            q["Spokesperson Name with Designation"] = None
+
+        # Change: Conditionally show "Save & Qualify Further" or "Save & Review" button
+        # Check if this is the last category to qualify
+        is_last_category = (st.session_state.current_category_index + 1) == len(st.session_state.category_selection_order)
+        if is_last_category:
+            if st.button("Save & Review 📋", key=f"save_review_{i}"):
+                missing_fields = []
+                if q["Dominance"] is None:
+                    missing_fields.append("Dominance")
+                if q["Tonality"] is None:
+                    missing_fields.append("Tonality")
+                if missing_fields:
+                    st.warning(f"Please select values for the following mandatory fields: {', '.join(missing_fields)}.")
+                else:
+                    # Save and move to review (show_caution_message is set once past the last category)
+                    save_and_advance(False, q)
+        else:
+            if st.button("Save & Qualify Further 💾", key=f"save_qualify_{i}"):
+                missing_fields = []
+                if q["Dominance"] is None:
+                    missing_fields.append("Dominance")
+                if q["Tonality"] is None:
+                    missing_fields.append("Tonality")
+                if missing_fields:
+                    st.warning(f"Please select values for the following mandatory fields: {', '.join(missing_fields)}.")
+                else:
+                    save_and_advance(False, q)
 
-            current_qualifications = st.session_state.qualifications_by_category.get(i, {}).get(current_category, {})
+        st.session_state.draft_qualification = q
+
+    # ---------- review panel (fragment) ---------------------------------------
+    @fragment
+    @prof.timed("review_panel")
+    def review_panel():
+        st.markdown("#### Review Qualified Categories")
+        review_category = st.selectbox(
+            "Select a category to review qualifications",
+            options=st.session_state.category_selection_order,
+            key=f"review_category_{i}"
+        )
+        if review_category:
+            current_qualifications = qs.get(i, review_category) or {}
             q = {}
-            q["Category"] = current_category
+            q["Category"] = review_category
 
-            # Arrange fields in a single row
             col_d, col_p, col_s, col_pg, col_t = st.columns([1, 1, 1, 1, 1])
 
             with col_d:
                 st.markdown("**Dominance**")
                 default_dominance = current_qualifications.get("Dominance")
-                q["Dominance"] = st.radio(
+                q["Dominance"] = st.selectbox(
                     "",
-                    bank["Dominance"],
-                    index=bank["Dominance"].index(default_dominance) if default_dominance in bank["Dominance"] else None,
-                    key=f"sel_dominance_{i}_{st.session_state.current_category_index}",
+                    ["— select —"] + bank["Dominance"],
+                    index=0 if default_dominance is None else bank["Dominance"].index(default_dominance) + 1,
+                    key=f"review_dominance_{review_category}_{i}",
                     label_visibility="collapsed"
                 )
+                if q["Dominance"] == "— select —":
+                    q["Dominance"] = None
 
             with col_p:
                 st.markdown("**Prominence**")
                 default_prominence = current_qualifications.get("Prominence", [])
                 if default_prominence is None:
                     default_prominence = []
-                prominence_selections = []
-                for option in bank["Prominence"]:
-                    selected = option in default_prominence
-                    if st.checkbox(
-                        option,
-                        value=selected,
-                        key=f"prominence_{option}_{i}_{current_category}",
-                        label_visibility="visible"
-                    ):
-                        prominence_selections.append(option)
-                q["Prominence"] = prominence_selections
+                q["Prominence"] = st.multiselect(
+                    "",
+                    bank["Prominence"],
+                    default=default_prominence,
+                    key=f"review_prominence_{i}_{review_category}",
+                    label_visibility="collapsed"
+                )
 
             with col_s:
                 st.markdown("**Spokesperson**")
                 default_spokesperson = current_qualifications.get("Spokesperson")
-                q["Spokesperson"] = st.radio(
+                q["Spokesperson"] = st.selectbox(
                     "",
-                    bank["Spokesperson"],
-                    index=bank["Spokesperson"].index(default_spokesperson) if default_spokesperson in bank["Spokesperson"] else None,
-                    key=f"sel_spokesperson_{i}_{st.session_state.current_category_index}",
+                    ["— select —"] + bank["Spokesperson"],
+                    index=0 if default_spokesperson is None else bank["Spokesperson"].index(default_spokesperson) + 1,
+                    key=f"review_spokesperson_{review_category}_{i}",
                     label_visibility="collapsed"
                 )
+                if q["Spokesperson"] == "— select —":
+                    q["Spokesperson"] = None
 
             with col_pg:
                 st.markdown("**Page**")
@@ -491,173 +1313,61 @@ if st.session_state.file_uploaded and (
                     min_value=0,
                     step=1,
                     value=default_page,
-                    key=f"page_{i}_{current_category}",
+                    key=f"review_page_{i}_{review_category}",
                     label_visibility="collapsed"
                 )
 
             with col_t:
                 st.markdown("**Tonality**")
                 default_tonality = current_qualifications.get("Tonality")
-                q["Tonality"] = st.radio(
+                q["Tonality"] = st.selectbox(
                     "",
-                    bank["Tonality"],
-                    index=bank["Tonality"].index(default_tonality) if default_tonality in bank["Tonality"] else None,
-                    key=f"sel_tonality_{i}_{st.session_state.current_category_index}",
+                    ["— select —"] + bank["Tonality"],
+                    index=0 if default_tonality is None else bank["Tonality"].index(default_tonality) + 1,
+                    key=f"review_tonality_{review_category}_{i}",
                     label_visibility="collapsed"
                 )
+                if q["Tonality"] == "— select —":
+                    q["Tonality"] = None
 
-            # Spokesperson Name with Designation (below if Spokesperson is selected)
             if q["Spokesperson"]:
                 st.markdown("**Spokesperson Name with Designation**")
                 default_spokesperson_name = current_qualifications.get("Spokesperson Name with Designation", "")
                 q["Spokesperson Name with Designation"] = st.text_input(
                     "",
                     value=default_spokesperson_name,
-                    key=f"spokesperson_name_{i}_{current_category}",
+                    key=f"review_spokesperson_name_{i}_{review_category}",
                     label_visibility="collapsed"
                 )
             else:
                 q["Spokesperson Name with Designation"] = None
 
-            # Change: Conditionally show "Save & Qualify Further" or "Save & Review" button
-            # Check if this is the last category to qualify
-            is_last_category = (st.session_state.current_category_index + 1) == len(st.session_state.category_selection_order)
-            if is_last_category:
-                if st.button("Save & Review 📋", key=f"save_review_{i}"):
-                    missing_fields = []
-                    if q["Dominance"] is None:
-                        missing_fields.append("Dominance")
-                    if q["Tonality"] is None:
-                        missing_fields.append("Tonality")
-                    if missing_fields:
-                        st.warning(f"Please select values for the following mandatory fields: {', '.join(missing_fields)}.")
-                    else:
-                        # Save and move to review by setting show_caution_message
-                        st.session_state.current_category_index += 1
-                        st.session_state.show_caution_message = True
-                        safe_rerun()
-            else:
-                if st.button("Save & Qualify Further 💾", key=f"save_qualify_{i}"):
-                    missing_fields = []
-                    if q["Dominance"] is None:
-                        missing_fields.append("Dominance")
-                    if q["Tonality"] is None:
-                        missing_fields.append("Tonality")
-                    if missing_fields:
-                        st.warning(f"Please select values for the following mandatory fields: {', '.join(missing_fields)}.")
-                    else:
-                        save_and_advance(False)
-
-            st.session_state.qualifications_by_category.setdefault(i, {})[current_category] = q
-        else:
-            st.markdown("#### Review Qualified Categories")
-            review_category = st.selectbox(
-                "Select a category to review qualifications",
-                options=st.session_state.category_selection_order,
-                key=f"review_category_{i}"
-            )
-            if review_category:
-                current_qualifications = st.session_state.qualifications_by_category.get(i, {}).get(review_category, {})
-                q = {}
-                q["Category"] = review_category
-
-                col_d, col_p, col_s, col_pg, col_t = st.columns([1, 1, 1, 1, 1])
-
-                with col_d:
-                    st.markdown("**Dominance**")
-                    default_dominance = current_qualifications.get("Dominance")
-                    q["Dominance"] = st.selectbox(
-                        "",
-                        ["— select —"] + bank["Dominance"],
-                        index=0 if default_dominance is None else bank["Dominance"].index(default_dominance) + 1,
-                        key=f"review_dominance_{review_category}_{i}",
-                        label_visibility="collapsed"
-                    )
-                    if q["Dominance"] == "— select —":
-                        q["Dominance"] = None
-
-                with col_p:
-                    st.markdown("**Prominence**")
-                    default_prominence = current_qualifications.get("Prominence", [])
-                    if default_prominence is None:
-                        default_prominence = []
-                    q["Prominence"] = st.multiselect(
-                        "",
-                        bank["Prominence"],
-                        default=default_prominence,
-                        key=f"review_prominence_{i}_{review_category}",
-                        label_visibility="collapsed"
-                    )
-
-                with col_s:
-                    st.markdown("**Spokesperson**")
-                    default_spokesperson = current_qualifications.get("Spokesperson")
-                    q["Spokesperson"] = st.selectbox(
-                        "",
-                        ["— select —"] + bank["Spokesperson"],
-                        index=0 if default_spokesperson is None else bank["Spokesperson"].index(default_spokesperson) + 1,
-                        key=f"review_spokesperson_{review_category}_{i}",
-                        label_visibility="collapsed"
-                    )
-                    if q["Spokesperson"] == "— select —":
-                        q["Spokesperson"] = None
-
-                with col_pg:
-                    st.markdown("**Page**")
-                    default_page = current_qualifications.get("Page", 0)
-                    default_page = 0 if default_page is None else default_page
-                    q["Page"] = st.number_input(
-                        "",
-                        min_value=0,
-                        step=1,
-                        value=default_page,
-                        key=f"review_page_{i}_{review_category}",
-                        label_visibility="collapsed"
-                    )
-
-                with col_t:
-                    st.markdown("**Tonality**")
-                    default_tonality = current_qualifications.get("Tonality")
-                    q["Tonality"] = st.selectbox(
-                        "",
-                        ["— select —"] + bank["Tonality"],
-                        index=0 if default_tonality is None else bank["Tonality"].index(default_tonality) + 1,
-                        key=f"review_tonality_{review_category}_{i}",
-                        label_visibility="collapsed"
-                    )
-                    if q["Tonality"] == "— select —":
-                        q["Tonality"] = None
-
-                if q["Spokesperson"]:
-                    st.markdown("**Spokesperson Name with Designation**")
-                    default_spokesperson_name = current_qualifications.get("Spokesperson Name with Designation", "")
-                    q["Spokesperson Name with Designation"] = st.text_input(
-                        "",
-                        value=default_spokesperson_name,
-                        key=f"review_spokesperson_name_{i}_{review_category}",
-                        label_visibility="collapsed"
-                    )
+            if st.button("Save Changes for this Category 💾", key=f"save_review_{i}_{review_category}"):
+                missing_fields = []
+                if q["Dominance"] is None:
+                    missing_fields.append("Dominance")
+                if q["Tonality"] is None:
+                    missing_fields.append("Tonality")
+                if missing_fields:
+                    st.warning(f"Please select values for the following mandatory fields: {', '.join(missing_fields)}.")
                 else:
-                    q["Spokesperson Name with Designation"] = None
-
-                if st.button("Save Changes for this Category 💾", key=f"save_review_{i}_{review_category}"):
-                    missing_fields = []
-                    if q["Dominance"] is None:
-                        missing_fields.append("Dominance")
-                    if q["Tonality"] is None:
-                        missing_fields.append("Tonality")
-                    if missing_fields:
-                        st.warning(f"Please select values for the following mandatory fields: {', '.join(missing_fields)}.")
-                    else:
-                        save_category_changes(review_category, q)
-            else:
-                st.info("All selected categories have been qualified. Please select a category to review or click 'Save & Next' to proceed.")
+                    save_category_changes(review_category, q)
+        else:
+            st.info("All selected categories have been qualified. Please select a category to review or click 'Save & Next' to proceed.")
+
+    # Qualify for the Selected Category section
+    st.session_state.draft_qualification = None
+    if st.session_state.confirm_categories and st.session_state.selected_categories and st.session_state.category_selection_order:
+        if st.session_state.current_category_index < len(st.session_state.category_selection_order):
+            qualify_panel()
+        else:
+            review_panel()
     else:
         st.info("Please select and confirm categories above to start qualifying.")
 
     if not st.session_state.selected_categories and st.session_state.show_caution_message:
         all_categories = bank["Category"] + st.session_state.saved_user_categories
-        qualified_categories = st.session_state.qualified_categories_by_row.get(i, [])
+        qualified_categories = qs.categories(i)
         non_qualified_categories = [cat for cat in all_categories if cat not in qualified_categories]
         if non_qualified_categories:
             st.warning(
@@ -668,62 +1378,32 @@ if st.session_state.file_uploaded and (
                 "All categories have been qualified for this row. Click on Save & Next to proceed ahead."
             )
 
-    if not st.session_state.selected_categories:
+    # Pre-ticked rule suggestions alone don't hide To Be Decided / Delete
+    untouched = not st.session_state.confirm_categories and st.session_state.selected_categories == suggested
+    if not st.session_state.selected_categories or untouched:
         c1, c2 = st.columns(2)
         to_be_decided = c1.button("To Be Decided ⏳", key=f"to_be_decided_{i}", use_container_width=True)
         delete = c2.button("Delete 🗑️", key=f"del_{i}", use_container_width=True)
 
-        def advance(delete_row: bool, bucket: str | None = None, payload=None):
-            if delete_row:
-                if is_bucket:
-                    current_bucket = st.session_state.preview_bucket
-                    total_rows_before_drop = len(st.session_state[current_bucket])
-                    st.session_state[current_bucket].drop(index=i, inplace=True)
-                    st.session_state[current_bucket].reset_index(drop=True, inplace=True)
-                    total_rows_new = len(st.session_state[current_bucket])
-                    if total_rows_new == 0:
-                        st.session_state.preview_bucket = None
-                        st.session_state.bucket_row_ptr = 0
-                        st.session_state.no_more_records_message = f"No more records in the selected preview bucket ('{current_bucket}')."
-                    else:
-                        st.session_state.bucket_row_ptr = min(i + 1, total_rows_new - 1) if total_rows_new > 0 else 0
-                        st.session_state.no_more_records_message = None
-                else:
-                    st.session_state.df_work.drop(index=i, inplace=True)
-                    st.session_state.df_work.reset_index(drop=True, inplace=True)
-                    st.session_state.total = len(st.session_state.df_work)
-                    if st.session_state.total == 0:
-                        st.session_state.row_ptr = 0
-                    else:
-                        st.session_state.row_ptr = min(i + 1, st.session_state.total - 1) if st.session_state.total > 0 else 0
-                    st.session_state.no_more_records_message = None
-
-            if bucket and payload is not None:
-                st.session_state[bucket] = pd.concat(
-                    [st.session_state[bucket], payload], ignore_index=True
-                )
+        @prof.timed("advance")
+        def advance(code: int):
+            with qs.step(f"{'To Be Decided' if code == TBD else 'Delete'} on row {i+1}"):
+                move_row(code)
 
-            if (not is_bucket and st.session_state.df_work.empty) or (is_bucket and st.session_state[st.session_state.preview_bucket].empty):
+            if rows_left(current_bucket) == 0:
                 st.session_state.row_ptr = 0
                 st.session_state.bucket_row_ptr = 0
-                st.session_state.file_uploaded = False if not is_bucket else st.session_state.file_uploaded
                 st.session_state.selected_categories = []
                 st.session_state.category_selection_order = []
-                st.session_state.qualifications_by_category = {}
-                st.session_state.qualified_categories_by_row = {}
                 st.session_state.show_caution_message = False
                 st.session_state.confirm_categories = False
                 st.session_state.current_category_index = 0
                 if is_bucket and st.session_state.no_more_records_message is None:
                     st.session_state.preview_bucket = None
             else:
-                new_i = st.session_state.bucket_row_ptr if is_bucket else st.session_state.row_ptr
-                if new_i not in st.session_state.qualifications_by_category:
-                    st.session_state.qualifications_by_category[new_i] = {}
-                if new_i not in st.session_state.qualified_categories_by_row:
-                    st.session_state.qualified_categories_by_row[new_i] = []
-                st.session_state.selected_categories = st.session_state.qualified_categories_by_row[new_i].copy()
-                st.session_state.category_selection_order = st.session_state.qualified_categories_by_row[new_i].copy()
+                new_i = int(qs.bucket_rows(current_bucket)[st.session_state.bucket_row_ptr]) if is_bucket else st.session_state.row_ptr
+                st.session_state.selected_categories = qs.categories(new_i)
+                st.session_state.category_selection_order = qs.categories(new_i)
                 st.session_state.show_caution_message = False
                 st.session_state.confirm_categories = False
                 st.session_state.current_category_index = 0
@@ -731,9 +1411,9 @@ if st.session_state.file_uploaded and (
             safe_rerun()
 
         if to_be_decided:
-            advance(True, "to_be_decided", row.to_frame().T)
+            advance(TBD)
         elif delete:
-            advance(True, "deleted", row.to_frame().T)
+            advance(DELETED)
 
 else:
     if not st.session_state.file_uploaded:
@@ -746,26 +1426,87 @@ else:
 
 # Save & Next button - Hide if on the last record in a preview bucket
 if (st.session_state.file_uploaded and
-    ((st.session_state.preview_bucket is None and not st.session_state.df_work.empty) or
-     (st.session_state.preview_bucket and not st.session_state[st.session_state.preview_bucket].empty)) and
+    not st.session_state.bulk_mode and
+    rows_left(st.session_state.preview_bucket) and
     st.session_state.confirm_categories and
-    not (is_bucket and i == total_rows - 1)):
-    st.button("Save & Next ➡️", key=f"save_next_{i}", use_container_width=True, on_click=lambda: save_and_advance(True))
+    not (is_bucket and bucket_pos == total_rows - 1)):
+    st.button("Save & Next ➡️", key=f"save_next_{i}", use_container_width=True, on_click=lambda: save_and_advance(True, st.session_state.draft_qualification))
 
 # Download Qualified Data button
-if not st.session_state.qualified.empty or not st.session_state.partial.empty:
-    buf = BytesIO()
-    with pd.ExcelWriter(buf, engine="xlsxwriter") as wr:
-        all_qualified = pd.concat(
-            [st.session_state.qualified, st.session_state.partial], ignore_index=True
+# Every bucket is exported (one sheet, or one file in a zip, per bucket). The export is
+# only built on request and cached against the annotation log's version and the format.
+@fragment
+@prof.timed("export_panel")
+def export_panel():
+    # Changing the format or scope reruns only this panel
+    qs = held()["qsession"]
+    export_format = st.selectbox(
+        "Export format",
+        EXPORT_FORMATS,
+        format_func=lambda f: EXPORT_FORMAT_LABELS.get(f, f),
+        key="export_format"
+    )
+    export_scope = "mine"
+    if st.session_state.team_mode:
+        export_scope = st.radio(
+            "Export scope",
+            ["mine", "team"],
+            format_func=lambda s: {"mine": "My work", "team": "Whole team (merged)"}[s],
+            horizontal=True,
+            key="export_scope"
         )
-        all_qualified.to_excel(wr, index=False, sheet_name="All Qualified Data")
-    buf.seek(0)
-    st.download_button(
-        "Download Qualified Data (Excel)",
-        buf.read(),
-        file_name="qualified_news_items.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        use_container_width=True
+    cache = held()["export_cache"]
+    fresh = (
+        cache is not None and cache["version"] == qs.version
+        and cache["format"] == export_format and cache["scope"] == export_scope
     )
+    # Team results change with everyone's work, so they can always be rebuilt
+    if not fresh or export_scope == "team":
+        if st.button("Refresh Team Export 🔄" if fresh else "Prepare Export 📦", key="prepare_export", use_container_width=True):
+            with st.spinner("Building export..."), prof.phase("export_build"):
+                source = qs
+                if export_scope == "team":
+                    # Merge every session's journal on this upload; the latest action per row wins
+                    events = get_journal().upload_events(qs.digest)
+                    source = QualificationSession.from_events(qs.df, events, digest=qs.digest)
+                data, file_name, mime = source.export(export_format)
+                held()["export_cache"] = {
+                    "version": qs.version,
+                    "format": export_format,
+                    "scope": export_scope,
+                    "data": data,
+                    "file_name": file_name,
+                    "mime": mime,
+                }
+            rerun_fragment()
+    if fresh:
+        st.download_button(
+            f"Download Qualified Data ({EXPORT_FORMAT_LABELS.get(export_format, export_format)})",
+            cache["data"],
+            file_name=cache["file_name"],
+            mime=cache["mime"],
+            use_container_width=True
+        )
+
+if any(bucket_count(b) for b in EXPORT_BUCKETS) or st.session_state.team_mode:
+    export_panel()
 
+# ---------- rerun profile (debug) --------------------------------------------
+if prof.enabled:
+    prof.session_id = st.session_state.session_id
+    state = {**st.session_state.to_dict(), **held()}
+    prof.end(state)
+    with st.sidebar.expander("🛠 Rerun profile"):
+        st.caption("Phase timings (ms) over the last reruns; fragment reruns and callbacks are listed on their own.")
+        st.dataframe(prof.summary().round(2), hide_index=True, use_container_width=True)
+        st.dataframe(prof.frame().head(10).round(2), hide_index=True, use_container_width=True)
+        if st.button("Measure memory now", key="profile_measure_memory"):
+            prof.measure_memory(state)
+        st.caption("session_state and held-object memory by key (MiB); objects shared between keys are counted under each.")
+        held_stats = get_store().stats()
+        st.caption(
+            f"Session store: {held_stats['live']} tab(s) in memory ({held_stats['live_mib']:.1f} MiB at last sweep), "
+            f"{held_stats['spilled']} spilled to disk; {held_stats['spills']} spills, {held_stats['reloads']} reloads."
+        )
+        memory = pd.Series(prof.memory, dtype="float64").sort_values(ascending=False).head(15) / 2**20
+        st.dataframe(memory.round(3).rename("MiB").to_frame(), use_container_width=True)
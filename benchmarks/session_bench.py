@@ -0,0 +1,339 @@
+"""End-to-end session benchmarks on synthetic news exports.
+
+    python -m benchmarks.session_bench                         # 1k / 10k / 100k rows, headless
+    python -m benchmarks.session_bench --rows 1000 --driver apptest --actions 100
+    python -m benchmarks.session_bench --json run.json --compare baseline.json
+
+A session uploads the export, works through rows with a realistic mix of
+single- and multi-category qualifications, partials, To Be Decided and
+deletes, previews the buckets now and then, resumes from the journal and
+exports every format. The headless driver goes through QualificationSession
+(the engine MAP.py calls); the apptest driver clicks through MAP.py itself
+with Streamlit's AppTest, so it also measures full script reruns.
+
+Each size runs in a fresh process, so peak RSS is per size; the headless
+driver also reports what the session holds (frame vs. the same frame as
+plain objects, annotation log, per-session state). ``--compare``
+exits non-zero when an action's p90 regressed past ``--tolerance``.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ROWS = [1_000, 10_000, 100_000]
+DEFAULT_ACTIONS = {"headless": 2_000, "apptest": 100}
+
+# action -> probability of picking it for the next row
+MIX = {"qualify": 0.55, "multi_category": 0.15, "partial": 0.10, "tbd": 0.10, "delete": 0.10}
+PREVIEW_EVERY = 50
+CATEGORIES = ["Innovation", "Market share", "Leadership", "Customer relation", "M&A",
+              "Business Growth", "Products & Services", "Vision", "Work Environment"]
+FULL = {"Dominance": "Primary", "Prominence": ["Headline"], "Spokesperson": "Quote", "Page": 3,
+        "Tonality": "Positive", "Spokesperson Name with Designation": "A. Person, CEO"}
+PARTIAL = {"Dominance": "Secondary", "Prominence": [], "Spokesperson": None, "Page": 0,
+           "Tonality": None, "Spokesperson Name with Designation": None}
+
+WORDS = np.array(
+    "market growth launch quarter revenue customer product platform digital partner acquisition "
+    "investment leader strategy global expansion brand innovation service industry report chief "
+    "executive analyst shares profit demand supply network retail consumer energy technology".split()
+)
+PUBLICATIONS = [f"Publication {k}" for k in range(120)]
+
+
+def synthetic_export(n: int, seed: int = 0) -> pd.DataFrame:
+    """A news-monitoring export with ``n`` articles, shaped like the real uploads."""
+    rng = np.random.default_rng(seed)
+    headline_words = rng.choice(WORDS, size=(n, 8))
+    text_words = rng.choice(WORDS, size=(n, 60))
+    return pd.DataFrame({
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        "Publication": rng.choice(PUBLICATIONS, n),
+        "Edition": rng.choice(["Mumbai", "Delhi", "Bengaluru", "Online"], n),
+        "Headline": [" ".join(w).capitalize() for w in headline_words],
+        "Text": [" ".join(w) for w in text_words],
+        "URL": [f"https://news.example.com/{k:07d}" for k in range(n)],
+        "Journalist": rng.choice([f"Reporter {k}" for k in range(300)], n),
+        "Page": rng.integers(1, 30, n),
+    })
+
+
+def session_plan(actions: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed + 1)
+    return list(rng.choice(list(MIX), size=actions, p=list(MIX.values())))
+
+
+class Timings:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def __call__(self, action: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[action].append(time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        out = {}
+        for action, xs in self.samples.items():
+            ms = np.array(xs) * 1000
+            out[action] = {
+                "n": len(ms),
+                "p50": float(np.percentile(ms, 50)),
+                "p90": float(np.percentile(ms, 90)),
+                "p99": float(np.percentile(ms, 99)),
+                "max": float(ms.max()),
+            }
+        return out
+
+
+def peak_rss_mib() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def session_memory(s) -> dict:
+    """MiB held by a session: the shared upload frame, the same frame with plain object
+    columns (the uncompacted layout), the annotation log, and everything but the frame."""
+    from map_engine import deep_sizeof
+
+    text = [c for c in s.df.columns if pd.api.types.is_string_dtype(s.df[c].dtype)
+            or isinstance(s.df[c].dtype, pd.CategoricalDtype)]
+    return {
+        "frame": deep_sizeof(s.df) / 2**20,
+        "frame_as_objects": deep_sizeof(s.df.astype({c: object for c in text})) / 2**20,
+        "annotations": deep_sizeof(s.log) / 2**20,
+        "session": deep_sizeof(s, {id(s.df)}) / 2**20,
+    }
+
+
+# ---------- drivers -----------------------------------------------------------
+def run_headless(data: bytes, plan: list, workdir: str, t: Timings):
+    from map_engine import EXPORT_BUCKETS, EXPORT_FORMATS, Journal, QualificationSession
+
+    journal = Journal(os.path.join(workdir, "journal.sqlite"))
+    with t("upload"):
+        s = QualificationSession.load(data, "bench.xlsx", journal=journal, cache_dir=workdir)
+    with t("upload_cached"):
+        QualificationSession.load(data, "bench.xlsx", cache_dir=workdir)
+
+    row = s.next_row()
+    for k, action in enumerate(plan):
+        if row is None:
+            break
+        with t(action):
+            if action == "qualify":
+                s.qualify(row, CATEGORIES[k % len(CATEGORIES)], FULL)
+            elif action == "multi_category":
+                for c in CATEGORIES[k % 3::3]:
+                    s.qualify(row, c, FULL)
+            elif action == "partial":
+                s.qualify(row, CATEGORIES[k % len(CATEGORIES)], PARTIAL)
+            if action in ("tbd", "delete"):
+                row = (s.tbd if action == "tbd" else s.delete)(row)
+            else:
+                s.submit(row)
+                row = s.next_row(row)
+        if k % PREVIEW_EVERY == PREVIEW_EVERY - 1:
+            with t("bucket_preview"):
+                for bucket in ("to_be_decided", "deleted"):
+                    ids = s.bucket_rows(bucket)
+                    if len(ids):
+                        s.df.iloc[int(ids[0])]
+                        s.log.frame(s.df, bucket)
+
+    with t("resume"):
+        QualificationSession.resume(s.df, s.digest, s.file_name, s.session_id, journal)
+    for fmt in EXPORT_FORMATS:
+        with t(f"export_{fmt}"):
+            s.export(fmt)
+    assert sum(s.entries(b) for b in EXPORT_BUCKETS), "session recorded nothing"
+    return session_memory(s)
+
+
+def run_apptest(data: bytes, plan: list, workdir: str, t: Timings):
+    from streamlit.testing.v1 import AppTest
+    from map_engine import EXPORT_FORMATS, XLSX_MIME
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)  # empty-label warnings on every rerun
+
+    def run(at, action):
+        with t(action):
+            at.run()
+        assert not at.exception, at.exception[0].message
+
+    at = AppTest.from_file(os.path.join(ROOT, "MAP.py"), default_timeout=600)
+    run(at, "first_load")
+    at.file_uploader[0].set_value(("bench.xlsx", data, XLSX_MIME))
+    run(at, "upload")
+
+    def qualify(i, cats, fields):
+        # Keyword rules may have pre-ticked other categories: untick those, tick ours
+        for c in list(at.session_state["selected_categories"]):
+            if c not in cats:
+                at.checkbox(key=f"cat_{c}_{i}").uncheck()
+                run(at, "rerun_category")
+        for c in cats:
+            if c not in at.session_state["selected_categories"]:
+                at.checkbox(key=f"cat_{c}_{i}").check()
+                run(at, "rerun_category")
+        cats = list(at.session_state["category_selection_order"])  # the order the form walks them in
+        at.button(key=f"confirm_categories_{i}").click()
+        run(at, "rerun_confirm")
+        for k, c in enumerate(cats):
+            if fields["Dominance"]:
+                at.radio(key=f"sel_dominance_{i}_{k}").set_value(fields["Dominance"])
+                run(at, "rerun_field")
+            if fields["Prominence"]:
+                at.checkbox(key=f"prominence_Headline_{i}_{c}").check()
+                run(at, "rerun_field")
+            if fields["Tonality"]:
+                at.radio(key=f"sel_tonality_{i}_{k}").set_value(fields["Tonality"])
+                run(at, "rerun_field")
+            last = k == len(cats) - 1
+            at.button(key=f"save_review_{i}" if last else f"save_qualify_{i}").click()
+            run(at, "save_and_advance")
+        at.button(key=f"save_next_{i}").click()
+        run(at, "save_and_advance")
+
+    for k, action in enumerate(plan):
+        if k >= at.session_state["total"]:  # every row filed
+            break
+        i = at.session_state["row_ptr"]
+        start = time.perf_counter()
+        if action == "qualify":
+            qualify(i, [CATEGORIES[k % len(CATEGORIES)]], FULL)
+        elif action == "multi_category":
+            qualify(i, CATEGORIES[k % 3::3][:2], FULL)
+        elif action == "partial":
+            qualify(i, [CATEGORIES[k % len(CATEGORIES)]], PARTIAL)
+        else:
+            at.button(key=f"to_be_decided_{i}" if action == "tbd" else f"del_{i}").click()
+            run(at, "advance")
+        t.samples[action].append(time.perf_counter() - start)
+        if k % PREVIEW_EVERY == PREVIEW_EVERY - 1:
+            selector = at.sidebar.radio(key="bucket_selector")
+            selector.set_value(selector.options[2])
+            run(at, "bucket_preview")
+            at.sidebar.radio(key="bucket_selector").set_value("None")
+            run(at, "bucket_preview")
+
+    for fmt in EXPORT_FORMATS:
+        at.selectbox(key="export_format").set_value(fmt)
+        run(at, "rerun_field")
+        at.button(key="prepare_export").click()
+        run(at, f"export_{fmt}")
+
+
+DRIVERS = {"headless": run_headless, "apptest": run_apptest}
+
+
+def run_size(rows: int, driver: str, actions: int, seed: int) -> dict:
+    """One benchmark run; meant to execute in its own process."""
+    from map_engine.export import to_xlsx
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="map-bench-") as workdir:
+        os.chdir(workdir)  # MAP.py keeps its options bank and caches in the working directory
+        try:
+            data = to_xlsx({"Sheet1": synthetic_export(rows, seed)})
+            plan = session_plan(actions, seed)
+            t = Timings()
+            start = time.perf_counter()
+            memory = DRIVERS[driver](data, plan, workdir, t)
+            total = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    return {
+        "rows": rows,
+        "driver": driver,
+        "actions": min(actions, rows),
+        "total_s": total,
+        "peak_rss_mib": peak_rss_mib(),
+        "memory_mib": memory or {},
+        "latency_ms": t.summary(),
+    }
+
+
+def _worker_init(cache_dir: str):
+    os.environ["MAP_CACHE_DIR"] = cache_dir
+    os.environ.setdefault("MAP_PREFETCH", "0")  # synthetic URLs; keep network timing out of the numbers
+    sys.path.insert(0, ROOT)
+
+
+def print_report(r: dict):
+    print(f"\nrows={r['rows']:,}  driver={r['driver']}  actions={r['actions']:,}  "
+          f"total={r['total_s']:.2f}s  peak_rss={r['peak_rss_mib']:.1f} MiB")
+    print(f"  {'action':<18}{'n':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for action, s in sorted(r["latency_ms"].items()):
+        print(f"  {action:<18}{s['n']:>7}{s['p50']:>10.2f}{s['p90']:>10.2f}{s['p99']:>10.2f}{s['max']:>10.2f}")
+    if r.get("memory_mib"):
+        print("  memory MiB: " + "  ".join(f"{k}={v:.2f}" for k, v in r["memory_mib"].items()))
+
+
+def regressions(results: list, baseline: list, tolerance: float) -> list:
+    """Actions whose p90 grew by more than ``tolerance`` (and 1 ms) over the baseline run."""
+    base = {(b["rows"], b["driver"]): b for b in baseline}
+    found = []
+    for r in results:
+        b = base.get((r["rows"], r["driver"]))
+        if b is None:
+            continue
+        for action, s in r["latency_ms"].items():
+            old = b["latency_ms"].get(action)
+            if old and s["p90"] > old["p90"] * tolerance and s["p90"] - old["p90"] > 1.0:
+                found.append(f"{r['driver']} {r['rows']:,} rows {action}: p90 {old['p90']:.2f} -> {s['p90']:.2f} ms")
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--driver", choices=sorted(DRIVERS), default="headless")
+    parser.add_argument("--actions", type=int, help="rows worked through per session "
+                        "(default: %s)" % ", ".join(f"{k} {v}" for k, v in DEFAULT_ACTIONS.items()))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="baseline results (--json output) to check against")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed p90 growth factor")
+    args = parser.parse_args(argv)
+    actions = args.actions or DEFAULT_ACTIONS[args.driver]
+
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory(prefix="map-bench-cache-") as cache_dir, \
+                ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_worker_init, initargs=(cache_dir,)) as pool:
+            result = pool.submit(run_size, rows, args.driver, actions, args.seed).result()
+        print_report(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
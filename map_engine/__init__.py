@@ -0,0 +1,28 @@
+from .status import (
+    PENDING, QUALIFIED, PARTIAL, TBD, DELETED, UNASSIGNED,
+    STATUS_NAMES, STATUS_CODES, RowStatus,
+)
+from .annotations import QUAL_FIELDS, AnnotationLog
+from .store import QualificationStore, is_partial, to_entry
+from .export import (
+    EXPORT_BUCKETS, EXPORT_FORMATS, XLSX_MIME, ZIP_MIME, export_buckets, to_xlsx, to_zip,
+)
+from .ingest import (
+    PARSE_WORKERS, SOURCE_FILE_COLUMN, SOURCE_SHEET_COLUMN, align_columns, batch_digest, batch_name,
+    compact_frame, file_digest, is_batch, is_cached, load_batch, load_upload, parse_pool, read_batch,
+    read_workbook, sheet_names,
+)
+from .journal import Journal, replay
+from .workqueue import LEASE_BATCH, WorkQueue
+from .session import QualificationSession, frame_digest
+from .profiling import PROFILE_ENV, PROFILE_FILE_ENV, MetricsSink, RerunProfiler, deep_sizeof
+from .options import OptionsBank, atomic_write_json, file_lock
+from .dedup import Clusters, normalise_url
+from .history import HistoryIndex, article_keys
+from .rules import DEFAULT_RULES, RULE_FIELDS, RuleBank, Suggestions
+from .search import SEARCH_COLUMNS, SearchIndex, query_terms
+from .spill import SessionStore
+from .prefetch import ContentCache, Page, Prefetcher, extract_text, fetch
+from .undo import Step, UndoStack
+from .reimport import import_export, read_export
+from .analytics import LiveTallies
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from .status import QUALIFIED, PARTIAL
+
+PUBLICATION_COLUMN = "Publication"
+NOT_SET = "(not set)"
+
+
+def _bump(counter: dict, key, n: int):
+    n += counter.get(key, 0)
+    if n:
+        counter[key] = n
+    else:
+        counter.pop(key, None)
+
+
+class LiveTallies:
+    """Share-of-voice counters over the live qualified/partial entries of an AnnotationLog.
+
+    The log calls ``added``/``removed`` on every append, bulk extend and
+    retire, so a qualify, edit or unqualify costs a handful of dict updates
+    (a bulk action one np.unique per counter). The counts always equal a
+    groupby over the Qualified and Partial export sheets, without building
+    them. Keys are the log's interned field codes (and a code per
+    publication); labels are looked up only when a table is asked for.
+    """
+
+    def __init__(self, log, publications=None):
+        self.log = log
+        if publications is None:
+            self._pub_codes, self._pub_labels = None, []
+        else:
+            codes, labels = pd.factorize(pd.Series(publications), use_na_sentinel=True)
+            self._pub_codes = codes.astype(np.int32)
+            self._pub_labels = list(labels)
+        self.category_tonality = {}   # (category, tonality) -> entries
+        self.dominance = {}           # dominance -> entries
+        self.spokesperson = {}        # spokesperson type -> entries
+        self.spokesperson_name = {}   # named spokesperson -> entries
+        self.publication_tonality = {}  # (publication, tonality) -> entries
+        self.version = 0
+        log.watchers.append(self)
+        self.added(log.positions("qualified", "partial"))
+
+    # ---------- updates (called by the log) -----------------------------------
+    def added(self, positions):
+        self._apply(positions, 1)
+
+    def removed(self, positions):
+        self._apply(positions, -1)
+
+    def _apply(self, positions, sign: int):
+        log, f = self.log, self.log.fields
+        if np.ndim(positions) == 0:
+            pos = int(positions)
+            if log.code[pos] not in (QUALIFIED, PARTIAL):
+                return
+            tonality = int(f["Tonality"].codes[pos])
+            _bump(self.category_tonality, (int(f["Category"].codes[pos]), tonality), sign)
+            _bump(self.dominance, int(f["Dominance"].codes[pos]), sign)
+            _bump(self.spokesperson, int(f["Spokesperson"].codes[pos]), sign)
+            _bump(self.spokesperson_name, int(f["Spokesperson Name with Designation"].codes[pos]), sign)
+            if self._pub_codes is not None:
+                _bump(self.publication_tonality, (int(self._pub_codes[log.row_id[pos]]), tonality), sign)
+            self.version += 1
+            return
+        positions = np.asarray(positions, dtype=np.int64)
+        positions = positions[np.isin(log.code[positions], (QUALIFIED, PARTIAL))]
+        if not len(positions):
+            return
+        tonality = f["Tonality"].codes[positions]
+        self._apply_many(self.category_tonality, np.column_stack([f["Category"].codes[positions], tonality]), sign)
+        self._apply_many(self.dominance, f["Dominance"].codes[positions], sign)
+        self._apply_many(self.spokesperson, f["Spokesperson"].codes[positions], sign)
+        self._apply_many(self.spokesperson_name, f["Spokesperson Name with Designation"].codes[positions], sign)
+        if self._pub_codes is not None:
+            pubs = self._pub_codes[log.row_id[positions]]
+            self._apply_many(self.publication_tonality, np.column_stack([pubs, tonality]), sign)
+        self.version += 1
+
+    @staticmethod
+    def _apply_many(counter: dict, keys: np.ndarray, sign: int):
+        distinct, n = np.unique(keys, axis=0, return_counts=True)
+        for key, k in zip(distinct.tolist(), n.tolist()):
+            _bump(counter, tuple(key) if keys.ndim > 1 else key, sign * k)
+
+    # ---------- tables --------------------------------------------------------
+    def _label(self, field: str, code: int):
+        value = self.log.fields[field].values[code]
+        return NOT_SET if value is None else value
+
+    def _publication(self, code: int):
+        return NOT_SET if code < 0 else self._pub_labels[code]
+
+    def _counts(self, counter: dict, field: str, name: str) -> pd.Series:
+        s = pd.Series({self._label(field, k): n for k, n in counter.items()}, name="Entries", dtype="int64")
+        return s.rename_axis(name).sort_values(ascending=False)
+
+    def _pivot(self, counter: dict, row_label, name: str) -> pd.DataFrame:
+        if not counter:
+            return pd.DataFrame(columns=pd.Index([], name="Tonality"), index=pd.Index([], name=name), dtype="int64")
+        table = pd.Series({(row_label(r), self._label("Tonality", t)): n for (r, t), n in counter.items()})
+        table = table.unstack(fill_value=0).astype("int64").rename_axis(index=name, columns="Tonality")
+        return table.loc[table.sum(axis=1).sort_values(ascending=False).index]
+
+    def by_category(self) -> pd.DataFrame:
+        """Entries per category (rows) and tonality (columns), largest category first."""
+        return self._pivot(self.category_tonality, lambda c: self._label("Category", c), "Category")
+
+    def by_publication(self) -> pd.DataFrame:
+        """Entries per publication and tonality, largest publication first."""
+        return self._pivot(self.publication_tonality, self._publication, PUBLICATION_COLUMN)
+
+    def dominance_counts(self) -> pd.Series:
+        return self._counts(self.dominance, "Dominance", "Dominance")
+
+    def spokesperson_counts(self) -> pd.Series:
+        return self._counts(self.spokesperson, "Spokesperson", "Spokesperson")
+
+    def spokesperson_names(self) -> pd.Series:
+        counts = self._counts(self.spokesperson_name, "Spokesperson Name with Designation", "Spokesperson")
+        return counts.drop(NOT_SET, errors="ignore")
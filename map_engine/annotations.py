@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+from .status import QUALIFIED, PARTIAL, TBD, DELETED, STATUS_CODES
+
+QUAL_FIELDS = ["Category", "Dominance", "Prominence", "Spokesperson", "Page", "Tonality",
+               "Spokesperson Name with Designation"]
+
+
+class _Column:
+    """Growable numpy column; appends are amortised O(1) by doubling capacity."""
+
+    def __init__(self, dtype, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._n = 0
+
+    def append(self, value):
+        if self._n == len(self._data):
+            grown = np.empty(2 * len(self._data), dtype=self._data.dtype)
+            grown[:self._n] = self._data
+            self._data = grown
+        self._data[self._n] = value
+        self._n += 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        need = self._n + len(values)
+        if need > len(self._data):
+            grown = np.empty(max(need, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._n] = self._data[:self._n]
+            self._data = grown
+        self._data[self._n:need] = values
+        self._n = need
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, pos):
+        return self._data[:self._n][pos]
+
+    def __setitem__(self, pos, value):
+        self._data[:self._n][pos] = value
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self._n]
+
+
+class _Interned:
+    """Growable column of repetitive values, stored as int32 codes into a table of distinct values.
+
+    Qualification fields take a handful of values from the options bank (plus
+    free-text spokesperson names that recur across rows), so each entry costs
+    four bytes instead of an object reference, and bulk writes share one code.
+    """
+
+    def __init__(self):
+        self.codes = _Column(np.int32)
+        self.values = [None]
+        self._index = {None: 0}
+
+    def _code(self, value) -> int:
+        if value is not None and not isinstance(value, str) and pd.isna(value):
+            value = None  # NaN, NaT and pd.NA are all one "missing"
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def append(self, value):
+        self.codes.append(self._code(value))
+
+    def extend(self, values):
+        # One table lookup per distinct value; the codes are mapped in one take
+        positions, distinct = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        table = np.array([self._code(v) for v in distinct] + [0], dtype=np.int32)
+        self.codes.extend(table[positions])  # -1 (missing) takes the trailing 0 (None)
+
+    def repeat(self, value, n: int):
+        self.codes.extend(np.full(n, self._code(value), dtype=np.int32))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, pos: int):
+        return self.values[self.codes[pos]]
+
+    def take(self, positions) -> np.ndarray:
+        """Values at ``positions`` as an object array (one lookup per distinct value)."""
+        table = np.empty(len(self.values), dtype=object)
+        table[:] = self.values
+        return table[self.codes[positions]]
+
+
+class AnnotationLog:
+    """Append-only, columnar record of every annotation in a session.
+
+    An entry holds the row id, the bucket (status code) it files the row under
+    and, for qualified/partial entries, the qualification fields (interned, see
+    _Interned). Article columns are never copied: bucket DataFrames are joined
+    against df_work only when a preview or export asks for them.
+    """
+
+    def __init__(self):
+        self.row_id = _Column(np.int64)
+        self.code = _Column(np.int8)
+        self.live = _Column(np.bool_)
+        self.fields = {f: _Interned() for f in QUAL_FIELDS}
+        self.counts = {QUALIFIED: 0, PARTIAL: 0, TBD: 0, DELETED: 0}
+        self.version = 0
+        self._marks = {}  # row id -> position of its live To Be Decided / Deleted entry
+        self.watchers = []  # told of every entry added and retired (LiveTallies)
+
+    def __len__(self):
+        return len(self.row_id)
+
+    def count(self, bucket: str) -> int:
+        return self.counts[STATUS_CODES[bucket]]
+
+    # ---------- writes --------------------------------------------------------
+    def append(self, row_id: int, code: int, fields: dict | None = None) -> int:
+        if code in (TBD, DELETED):
+            self.unmark(row_id)
+        pos = len(self)
+        self.row_id.append(row_id)
+        self.code.append(code)
+        self.live.append(True)
+        fields = fields or {}
+        for f, col in self.fields.items():
+            col.append(fields.get(f))
+        self.counts[code] += 1
+        if code in (TBD, DELETED):
+            self._marks[row_id] = pos
+        for w in self.watchers:
+            w.added(pos)
+        self.version += 1
+        return pos
+
+    def extend(self, row_ids, code, fields: dict | None = None) -> np.ndarray:
+        """Append one entry per row in a single vectorised write; returns their positions.
+
+        ``code`` and each field are either one value for every row (bulk
+        mode) or an array with one value per row (re-import).
+        """
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        n = len(row_ids)
+        codes = np.broadcast_to(np.asarray(code, dtype=np.int8), (n,))
+        marks = np.isin(codes, (TBD, DELETED))
+        if marks.any():
+            self.unmark_many(row_ids[marks])
+        start = len(self)
+        self.row_id.extend(row_ids)
+        self.code.extend(codes)
+        self.live.extend(np.ones(n, dtype=np.bool_))
+        fields = fields or {}
+        for f, col in self.fields.items():
+            value = fields.get(f)
+            if np.ndim(value):
+                col.extend(value)
+            else:
+                col.repeat(value, n)
+        for c, k in enumerate(np.bincount(codes, minlength=DELETED + 1)):
+            if k:
+                self.counts[c] += int(k)
+        positions = np.arange(start, len(self))
+        if marks.any():
+            self._marks.update(zip(row_ids[marks].tolist(), positions[marks].tolist()))
+        for w in self.watchers:
+            w.added(positions)
+        self.version += 1
+        return positions
+
+    def retire(self, pos: int):
+        if self.live[pos]:
+            self.live[pos] = False
+            self.counts[int(self.code[pos])] -= 1
+            for w in self.watchers:
+                w.removed(pos)
+            self.version += 1
+
+    def retire_many(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        positions = positions[self.live[positions]]
+        if not len(positions):
+            return
+        self.live[positions] = False
+        for code, n in enumerate(np.bincount(self.code[positions], minlength=DELETED + 1)):
+            if n:
+                self.counts[code] -= int(n)
+        for w in self.watchers:
+            w.removed(positions)
+        self.version += 1
+
+    def unmark(self, row_id: int):
+        # The row has left the To Be Decided / Deleted bucket
+        pos = self._marks.pop(row_id, None)
+        if pos is not None:
+            self.retire(pos)
+
+    def unmark_many(self, row_ids):
+        """``unmark`` for many rows in one retire."""
+        marks = self._marks
+        self.retire_many([marks.pop(r) for r in np.asarray(row_ids).tolist() if r in marks])
+
+    # ---------- lazy views ----------------------------------------------------
+    def positions(self, *buckets: str) -> np.ndarray:
+        """Live entry positions for ``buckets``, grouped in the order given."""
+        live, codes = self.live.values, self.code.values
+        return np.concatenate(
+            [np.flatnonzero(live & (codes == STATUS_CODES[b])) for b in buckets]
+        ) if buckets else np.empty(0, dtype=np.int64)
+
+    def frame(self, df_work: pd.DataFrame, *buckets: str) -> pd.DataFrame:
+        """Bucket rows as a DataFrame: source columns plus qualification fields.
+
+        Built on demand and not kept: a cached copy would hold the article
+        text of every bucket row for the rest of the session.
+        """
+        pos = self.positions(*buckets)
+        out = df_work.iloc[self.row_id[pos]].reset_index(drop=True)
+        if any(STATUS_CODES[b] in (QUALIFIED, PARTIAL) for b in buckets):
+            out = out.assign(**{f: col.take(pos) for f, col in self.fields.items()})
+        return out
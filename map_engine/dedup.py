@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+try:  # arrow string kernels tokenise much faster; pandas .str is the fallback
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+TEXT_COLUMNS = ("Headline", "Text")
+URL_COLUMN = "URL"
+NUM_PERM = 64
+BANDS = 16            # 16 bands x 4 rows: pairs at 0.7 Jaccard are candidates 99% of the time
+THRESHOLD = 0.7       # estimated Jaccard needed to join a cluster
+SHINGLE = 3           # word n-grams
+MIN_SHINGLES = 5      # shorter texts are only matched on URL
+WORD_SEPARATORS = r"(?:[^\w\s]|_)+"  # Python-regex twin of the arrow tokeniser's [^\p{L}\p{N}\s]+
+EMPTY = np.iinfo(np.uint32).max
+
+_M1 = np.uint64(0x9E3779B97F4A7C15)
+_M2 = np.uint64(0xC2B2AE3D27D4EB4F)
+
+
+def normalise_url(urls: pd.Series) -> pd.Series:
+    """Lower-cased URL without scheme, ``www.``, query/fragment or trailing slash."""
+    return (urls.astype("string").str.strip().str.lower()
+            .str.replace(r"^https?://(www\.)?", "", regex=True)
+            .str.replace(r"[?#].*$", "", regex=True)
+            .str.rstrip("/"))
+
+
+def joined_text(df: pd.DataFrame, columns) -> pd.Series:
+    """The given columns of every row joined by spaces, with missing cells as ""."""
+    # via the string dtype, so categorical columns (compact_frame) fill like any other
+    texts = None
+    for c in columns:
+        col = df[c].astype("string").fillna("")
+        texts = col if texts is None else texts + " " + col
+    return texts
+
+
+def vocabulary(texts: pd.Series) -> tuple:
+    """Distinct lower-cased words, plus every text's words as ids into them (flattened) and word counts.
+
+    Punctuation separates words, so "Acme's" gives "acme" and "s".
+    """
+    if pa is not None:
+        arr = pa.array(texts.fillna("").astype(str).to_numpy(dtype=object), type=pa.large_string())
+        arr = pc.replace_substring_regex(pc.utf8_lower(arr), r"[^\p{L}\p{N}\s]+", " ")
+        arr = pc.utf8_trim_whitespace(arr)
+        words = pc.utf8_split_whitespace(arr)
+        # an empty text still splits into one "" word; drop it
+        empty = pc.equal(arr, "").to_numpy(zero_copy_only=False)
+        lengths = np.where(empty, 0, pc.list_value_length(words).to_numpy(zero_copy_only=False))
+        flat = pc.list_flatten(words)
+        encoded = pc.dictionary_encode(pc.filter(flat, pc.not_equal(flat, "")))
+        return (encoded.dictionary.to_numpy(zero_copy_only=False),
+                encoded.indices.to_numpy(zero_copy_only=False).astype(np.int64), lengths)
+    words = texts.fillna("").astype(str).str.lower().str.replace(WORD_SEPARATORS, " ", regex=True).str.split()
+    lengths = words.str.len().to_numpy()
+    ids, vocab = pd.factorize(words.explode().dropna().to_numpy(dtype=object))
+    return np.asarray(vocab, dtype=object), ids.astype(np.int64), lengths
+
+
+def word_hashes(texts: pd.Series) -> tuple:
+    """Hash of every lower-cased word, flattened, plus the word count of each text."""
+    vocab, ids, lengths = vocabulary(texts)
+    # hash each distinct word once
+    return pd.util.hash_array(np.asarray(vocab, dtype=object))[ids], lengths
+
+
+def shingle_hashes(texts: pd.Series, k: int = SHINGLE) -> tuple:
+    """Word k-gram hashes for every text, as ``(hashes, doc ids)`` sorted by doc id."""
+    wh, lengths = word_hashes(texts)
+    doc = np.repeat(np.arange(len(texts)), lengths)
+    if len(wh) < k:
+        return np.array([], dtype=np.uint64), np.array([], dtype=np.int64)
+    with np.errstate(over="ignore"):
+        sh = wh[:len(wh) - k + 1].copy()
+        for j in range(1, k):
+            sh = (sh ^ wh[j:len(wh) - k + 1 + j]) * _M1
+        sh ^= sh >> np.uint64(29)
+    same_doc = doc[:len(doc) - k + 1] == doc[k - 1:]
+    return sh[same_doc], doc[:len(doc) - k + 1][same_doc]
+
+
+def minhash(hashes: np.ndarray, doc: np.ndarray, n_docs: int, num_perm: int = NUM_PERM) -> np.ndarray:
+    """``(n_docs, num_perm)`` one-permutation MinHash signatures.
+
+    Each shingle hash picks a bin from its low bits and competes on its high
+    bits, so one pass replaces ``num_perm`` hash functions. Bins no shingle
+    landed in hold EMPTY and are ignored by ``similarity``.
+    """
+    if num_perm & (num_perm - 1):
+        raise ValueError("num_perm must be a power of two")
+    sig = np.full(n_docs * num_perm, EMPTY, dtype=np.uint32)
+    bins = (hashes & np.uint64(num_perm - 1)).astype(np.int64)
+    np.minimum.at(sig, doc * num_perm + bins, (hashes >> np.uint64(32)).astype(np.uint32))
+    return sig.reshape(n_docs, num_perm)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard between signature rows, over bins filled in either."""
+    filled = (a != EMPTY) | (b != EMPTY)
+    return ((a == b) & filled).sum(axis=1) / np.maximum(filled.sum(axis=1), 1)
+
+
+def _candidate_pairs(sig: np.ndarray, eligible: np.ndarray, bands: int) -> tuple:
+    rows = sig.shape[1] // bands
+    ids = np.flatnonzero(eligible)
+    left, right = [], []
+    for band in range(bands):
+        block = sig[ids, band * rows:(band + 1) * rows]
+        filled = (block != EMPTY).any(axis=1)  # an all-empty band says nothing about similarity
+        band_ids, block = ids[filled], block[filled].astype(np.uint64)
+        if len(band_ids) < 2:
+            continue
+        with np.errstate(over="ignore"):
+            key = block[:, 0] * _M2
+            for j in range(1, rows):
+                key = (key ^ block[:, j]) * _M2
+        order = np.argsort(key, kind="stable")
+        skey = key[order]
+        run_start = np.r_[True, skey[1:] != skey[:-1]]
+        head = np.maximum.accumulate(np.where(run_start, np.arange(len(skey)), 0))
+        dup = ~run_start
+        left.append(band_ids[order[head[dup]]])
+        right.append(band_ids[order[dup]])
+    if not left:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    pairs = np.unique(np.stack([np.concatenate(left), np.concatenate(right)], axis=1), axis=0)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _components(n: int, p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Connected components as the smallest row id in each, by vectorised label propagation."""
+    labels = np.arange(n)
+    while len(p):
+        m = np.minimum(labels[p], labels[q])
+        if not ((labels[p] != m) | (labels[q] != m)).any():
+            break
+        np.minimum.at(labels, p, m)
+        np.minimum.at(labels, q, m)
+        labels = labels[labels]
+    while not np.array_equal(labels, labels[labels]):
+        labels = labels[labels]
+    return labels
+
+
+class Clusters:
+    """Groups of near-duplicate rows (syndicated copies), keyed by their smallest row id.
+
+    ``labels[r]`` is the representative of row r's cluster; singletons are
+    their own representative. Member lookups are O(cluster size).
+    """
+
+    def __init__(self, labels: np.ndarray):
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self._order = np.argsort(self.labels, kind="stable")
+        self._sorted = self.labels[self._order]
+        self.sizes = np.bincount(self.labels, minlength=len(self.labels))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, text_columns=TEXT_COLUMNS, url_column: str = URL_COLUMN,
+                   threshold: float = THRESHOLD, num_perm: int = NUM_PERM, bands: int = BANDS) -> "Clusters":
+        """Cluster by MinHash/LSH over the text columns plus exact (normalised) URL matches."""
+        n = len(df)
+        p, q = [np.array([], dtype=np.int64)], [np.array([], dtype=np.int64)]
+        cols = [c for c in text_columns if c in df.columns]
+        if cols and n:
+            hashes, doc = shingle_hashes(joined_text(df, cols))
+            sig = minhash(hashes, doc, n, num_perm)
+            eligible = np.bincount(doc, minlength=n) >= MIN_SHINGLES
+            left, right = _candidate_pairs(sig, eligible, bands)
+            similar = similarity(sig[left], sig[right]) >= threshold
+            p.append(left[similar])
+            q.append(right[similar])
+        if url_column in df.columns and n:
+            urls = normalise_url(df[url_column])
+            codes, _ = pd.factorize(urls)
+            has_url = (codes >= 0) & (urls != "").fillna(False).to_numpy()
+            first = pd.Series(np.arange(n)[has_url]).groupby(codes[has_url]).transform("min").to_numpy()
+            p.append(first)
+            q.append(np.arange(n)[has_url])
+        return cls(_components(n, np.concatenate(p), np.concatenate(q)))
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def n_clusters(self) -> int:
+        """Clusters with more than one row."""
+        return int((self.sizes > 1).sum())
+
+    @property
+    def n_duplicates(self) -> int:
+        """Rows that are copies of an earlier row (the work a fan-out saves)."""
+        return int(len(self.labels) - (self.sizes > 0).sum())
+
+    def size(self, row_id: int) -> int:
+        return int(self.sizes[self.labels[row_id]])
+
+    def members(self, row_id: int) -> np.ndarray:
+        """The other rows in ``row_id``'s cluster, in source order."""
+        label = self.labels[row_id]
+        lo, hi = np.searchsorted(self._sorted, [label, label + 1])
+        ids = self._order[lo:hi]
+        return ids[ids != row_id]
@@ -0,0 +1,147 @@
+import datetime
+import io
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+import xlsxwriter
+
+try:  # Parquet export is only offered when pyarrow is installed
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_MIME = "application/zip"
+STREAMING_ROWS = 10_000  # above this, worksheets are flushed row by row (constant_memory)
+CHUNK_ROWS = 5_000
+
+# Bucket -> sheet / file label, in export order
+EXPORT_BUCKETS = {
+    "qualified": "Qualified",
+    "partial": "Partial",
+    "to_be_decided": "To Be Decided",
+    "deleted": "Deleted",
+}
+
+
+def _cell(v):
+    if v is None or v is pd.NaT or v is pd.NA or (isinstance(v, float) and v != v):
+        return None
+    if isinstance(v, (str, bool, int, float, datetime.date)):
+        return v
+    return str(v)
+
+
+def iter_frames(frame: pd.DataFrame, chunk_rows: int = CHUNK_ROWS):
+    """Yield consecutive row slices of ``frame``, ``chunk_rows`` at a time."""
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def iter_chunks(frame: pd.DataFrame, chunk_rows: int = CHUNK_ROWS):
+    """Yield ``frame`` as lists of plain-Python row tuples, ``chunk_rows`` at a time."""
+    for chunk in iter_frames(frame, chunk_rows):
+        yield list(chunk.itertuples(index=False, name=None))
+
+
+def to_xlsx(sheets: dict, constant_memory: bool | None = None) -> bytes:
+    """Write ``{sheet name: DataFrame}`` to an xlsx workbook and return its bytes.
+
+    Rows are written strictly in order, so for large outputs xlsxwriter's
+    constant_memory mode can flush each row as soon as it is complete and peak
+    memory no longer grows with the number of cells.
+    """
+    if constant_memory is None:
+        constant_memory = sum(len(f) for f in sheets.values()) > STREAMING_ROWS
+    buf = BytesIO()
+    wb = xlsxwriter.Workbook(buf, {
+        "constant_memory": constant_memory,
+        "strings_to_formulas": False,
+        "remove_timezone": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    header = wb.add_format({"bold": True, "border": 1, "align": "center"})
+    for name, frame in sheets.items():
+        ws = wb.add_worksheet(name[:31])
+        ws.write_row(0, 0, [str(c) for c in frame.columns], header)
+        r = 1
+        for chunk in iter_chunks(frame):
+            for values in chunk:
+                ws.write_row(r, 0, [_cell(v) for v in values])
+                r += 1
+    wb.close()
+    return buf.getvalue()
+
+
+# ---------- flat-file formats -------------------------------------------------
+def _write_csv(frame: pd.DataFrame, out):
+    with io.TextIOWrapper(out, encoding="utf-8", newline="") as text:
+        for k, chunk in enumerate(iter_frames(frame)):
+            chunk.to_csv(text, index=False, header=(k == 0))
+        if frame.empty:
+            frame.to_csv(text, index=False)
+
+
+def _write_jsonl(frame: pd.DataFrame, out):
+    with io.TextIOWrapper(out, encoding="utf-8") as text:
+        for chunk in iter_frames(frame):
+            text.write(chunk.to_json(orient="records", lines=True, date_format="iso", force_ascii=False))
+
+
+def arrow_safe(frame: pd.DataFrame) -> pd.DataFrame:
+    """Stringify object columns that mix types (common in Excel exports) so Arrow can type them."""
+    mixed = [
+        c for c in frame.columns
+        if frame[c].dtype == object
+        and pd.api.types.infer_dtype(frame[c], skipna=True) in ("mixed", "mixed-integer")
+    ]
+    if not mixed:
+        return frame
+    return frame.assign(**{c: frame[c].map(lambda v: v if pd.isna(v) else str(v)) for c in mixed})
+
+
+def _write_parquet(frame: pd.DataFrame, out):
+    frame = arrow_safe(frame)
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in iter_frames(frame):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+# format -> (file extension, writer, zip compression)
+FLAT_FORMATS = {
+    "csv": ("csv", _write_csv, zipfile.ZIP_DEFLATED),
+    "jsonl": ("jsonl", _write_jsonl, zipfile.ZIP_DEFLATED),
+}
+if pq is not None:
+    FLAT_FORMATS["parquet"] = ("parquet", _write_parquet, zipfile.ZIP_STORED)
+
+EXPORT_FORMATS = ["xlsx", *FLAT_FORMATS]
+
+
+def to_zip(frames: dict, fmt: str) -> bytes:
+    """One ``<name>.<ext>`` file per frame, written chunk by chunk into a zip archive."""
+    ext, write, compression = FLAT_FORMATS[fmt]
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=compression) as zf:
+        for name, frame in frames.items():
+            with zf.open(f"{name}.{ext}", "w") as member:
+                write(frame, member)
+    return buf.getvalue()
+
+
+def export_buckets(frames: dict, fmt: str, stem: str = "qualified_news_items") -> tuple:
+    """Export ``{bucket: DataFrame}``; returns ``(data, file_name, mime)``.
+
+    xlsx puts each bucket on its own sheet; the flat formats write one file
+    per bucket into a zip.
+    """
+    named = {EXPORT_BUCKETS.get(b, b): f for b, f in frames.items()}
+    if fmt == "xlsx":
+        return to_xlsx(named), f"{stem}.xlsx", XLSX_MIME
+    if fmt not in FLAT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    files = {name.lower().replace(" ", "_"): f for name, f in named.items()}
+    return to_zip(files, fmt), f"{stem}_{fmt}.zip", ZIP_MIME
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from .dedup import TEXT_COLUMNS, URL_COLUMN, joined_text, normalise_url
+from .ingest import CACHE_DIR
+from .journal import connect
+from .status import PENDING, QUALIFIED, PARTIAL, DELETED, UNASSIGNED
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = os.path.join(CACHE_DIR, "history.sqlite")
+NO_CONTENT = 0  # content_key of rows with no headline/text
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url_key TEXT NOT NULL,
+    content_key INTEGER NOT NULL,
+    code INTEGER NOT NULL,
+    quals TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (url_key, content_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS articles_by_content ON articles (content_key);
+"""
+
+
+def article_keys(df: pd.DataFrame, text_columns=TEXT_COLUMNS, url_column: str = URL_COLUMN) -> pd.DataFrame:
+    """Per-row ``url_key`` (normalised URL, "" if none) and ``content_key`` (signed 64-bit text hash).
+
+    The content hash is taken over lower-cased, whitespace-collapsed headline
+    and text, so re-exports that only differ in spacing or case still match.
+    """
+    n = len(df)
+    if url_column in df.columns:
+        url_key = normalise_url(df[url_column]).fillna("").to_numpy(dtype=object)
+    else:
+        url_key = np.full(n, "", dtype=object)
+    cols = [c for c in text_columns if c in df.columns]
+    content_key = np.full(n, NO_CONTENT, dtype=np.int64)
+    if cols:
+        text = joined_text(df, cols).str.lower().str.split().str.join(" ")
+        has_text = (text != "").to_numpy()
+        content_key[has_text] = pd.util.hash_array(text[has_text].to_numpy(dtype=object)).view(np.int64)
+    return pd.DataFrame({"url_key": url_key, "content_key": content_key})
+
+
+class HistoryIndex:
+    """Qualifications from every earlier upload, keyed by normalised URL and content hash.
+
+    ``remember`` records a row's final status and categories as it is filed;
+    ``lookup`` joins a whole upload against the index in one query, so
+    overlapping daily exports don't get qualified from scratch again. A row
+    matches on its URL when it has one, otherwise (or additionally) on its
+    content hash; the most recently recorded match wins.
+    """
+
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(connect(path)) as conn:
+            conn.executescript(_SCHEMA)
+
+    def __len__(self):
+        with closing(connect(self.path)) as conn:
+            return conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def remember(self, keys: pd.DataFrame, session, row_ids):
+        """Record the current status and qualifications of ``row_ids``.
+
+        Rows back to pending (an undone action) are forgotten; rows leased to
+        other annotators are skipped.
+        """
+        now = time.time()
+        records, forget = [], []
+        for row_id in np.asarray(row_ids, dtype=np.int64).tolist():
+            url_key, content_key = keys["url_key"].iat[row_id], int(keys["content_key"].iat[row_id])
+            code = session.status.status(row_id)
+            if code == UNASSIGNED or (not url_key and content_key == NO_CONTENT):
+                continue
+            if code == PENDING:
+                forget.append((url_key, content_key))
+                continue
+            quals = {c: {f: v for f, v in session.get(row_id, c).items() if f != "Category"}
+                     for c in session.categories(row_id)}
+            records.append((url_key, content_key, code, json.dumps(quals, default=str), now))
+        if not records and not forget:
+            return
+        try:
+            with closing(connect(self.path)) as conn, conn:
+                conn.executemany("DELETE FROM articles WHERE url_key = ? AND content_key = ?", forget)
+                conn.executemany(
+                    "INSERT INTO articles VALUES (?, ?, ?, ?, ?) ON CONFLICT(url_key, content_key) DO UPDATE "
+                    "SET code = excluded.code, quals = excluded.quals, updated = excluded.updated",
+                    records,
+                )
+        except sqlite3.Error:
+            # The history is a convenience; never fail the click that filed the row
+            logger.exception("History write of %d rows failed", len(records) + len(forget))
+
+    def lookup(self, keys: pd.DataFrame) -> pd.DataFrame:
+        """Earlier result for each row of an upload: ``row_id, code, quals`` (only rows that match)."""
+        up = keys.assign(row_id=np.arange(len(keys)))
+        up = up[(up["url_key"] != "") | (up["content_key"] != NO_CONTENT)]
+        if up.empty:
+            return pd.DataFrame(columns=["row_id", "code", "quals"])
+        with closing(connect(self.path)) as conn:
+            conn.execute("CREATE TEMP TABLE upload (row_id INTEGER, url_key TEXT, content_key INTEGER)")
+            conn.executemany(
+                "INSERT INTO upload VALUES (?, ?, ?)",
+                zip(up["row_id"].tolist(), up["url_key"].tolist(), up["content_key"].tolist()),
+            )
+            found = pd.read_sql_query(
+                "SELECT u.row_id, a.code, a.quals, a.updated FROM upload u "
+                "JOIN articles a ON u.url_key != '' AND a.url_key = u.url_key "
+                "UNION ALL "
+                "SELECT u.row_id, a.code, a.quals, a.updated FROM upload u "
+                f"JOIN articles a ON u.content_key != {NO_CONTENT} AND a.content_key = u.content_key",
+                conn,
+            )
+        found = found.sort_values("updated", kind="stable").drop_duplicates("row_id", keep="last")
+        return found.sort_values("row_id")[["row_id", "code", "quals"]].reset_index(drop=True)
+
+    def apply(self, keys: pd.DataFrame, session) -> dict:
+        """Carry earlier results over to a fresh session; returns counts by outcome.
+
+        Rows qualified in full before are filed as qualified and rows deleted
+        before are deleted again. Rows left partial are prefilled with their
+        categories but stay pending; rows parked as To Be Decided are left alone.
+        Qualifications are written with one ``qualify_rows`` per distinct
+        (category, fields) pair; the deletes are one ``delete_rows``, undoable
+        as one step.
+        """
+        found = self.lookup(keys)
+        found = found[found["code"].isin([QUALIFIED, PARTIAL, DELETED])]
+        quals = found[found["code"] != DELETED]
+        items = pd.DataFrame(
+            [(r, c, json.dumps(f, sort_keys=True)) for r, q in zip(quals["row_id"], quals["quals"])
+             for c, f in json.loads(q).items()],
+            columns=["row_id", "category", "fields"],
+        )
+        for (category, fields), group in items.groupby(["category", "fields"], sort=False):
+            session.qualify_rows(group["row_id"].to_numpy(), category, json.loads(fields))
+        done = found.loc[found["code"] == QUALIFIED, "row_id"].to_numpy()
+        done = done[np.isin(done, items["row_id"].to_numpy())]
+        session.submit_rows(done)
+        deleted = found.loc[found["code"] == DELETED, "row_id"].to_numpy()
+        with session.step(f"Delete of {len(deleted)} row(s) deleted in earlier uploads"):
+            session.delete_rows(deleted)
+        return {"qualified": len(done), "deleted": len(deleted),
+                "prefilled": int(items["row_id"].nunique()) - len(done)}
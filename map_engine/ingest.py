@@ -0,0 +1,246 @@
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import islice
+from xml.etree import ElementTree
+
+import openpyxl
+import pandas as pd
+
+from .export import arrow_safe, pa, pq
+
+CACHE_DIR = os.environ.get("MAP_CACHE_DIR", ".map_cache")
+CHUNK_ROWS = 5_000
+CATEGORY_RATIO = 0.5  # text columns with at most this share of distinct values become categoricals
+ARROW_TEXT = pa is not None and os.environ.get("MAP_ARROW_TEXT", "1") != "0"
+PARSE_WORKERS = int(os.environ.get("MAP_PARSE_WORKERS", 0)) or os.cpu_count() or 1
+SOURCE_FILE_COLUMN = "Source File"    # batch uploads: which file and sheet each row came from
+SOURCE_SHEET_COLUMN = "Source Sheet"
+
+
+def _arrow_string_dtype():
+    # Arrow storage with NaN for missing cells, like the object columns it replaces
+    for args, kw in ((("pyarrow",), {"na_value": float("nan")}), (("pyarrow_numpy",), {})):
+        try:
+            return pd.StringDtype(*args, **kw)
+        except (TypeError, ValueError):
+            pass
+    return "string[pyarrow]"
+
+
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _column_names(header) -> list:
+    # Same naming as pd.read_excel: blank headers become "Unnamed: k", repeats get ".1", ".2", ...
+    names, seen = [], {}
+    for k, h in enumerate(header):
+        name = f"Unnamed: {k}" if h is None else str(h)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def read_xlsx_streaming(data: bytes, sheet: int | str = 0) -> pd.DataFrame:
+    """One sheet (the first by default) via openpyxl's read-only mode, ``CHUNK_ROWS`` rows at a time."""
+    wb = openpyxl.load_workbook(BytesIO(data), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        columns = _column_names(header)
+        width = len(columns)
+        chunks = []
+        while block := list(islice(rows, CHUNK_ROWS)):
+            block = [tuple(r[:width]) + (None,) * (width - len(r)) for r in block]
+            chunks.append(pd.DataFrame(block, columns=columns))
+    finally:
+        wb.close()
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(chunks, ignore_index=True)
+    # read-only sheets often report formatted-but-empty rows at the bottom
+    filled = df.notna().any(axis=1).to_numpy()
+    last = filled.nonzero()[0]
+    df = df.iloc[:last[-1] + 1 if len(last) else 0].reset_index(drop=True)
+    blank = [c for c in df.columns if df[c].dtype == object and df[c].isna().all()]
+    return df.astype({c: "float64" for c in blank}) if blank else df
+
+
+def read_workbook(data: bytes, file_name: str = "", sheet: int | str = 0) -> pd.DataFrame:
+    """Parse one sheet (the first by default) with the fastest reader available."""
+    if HAS_CALAMINE:
+        return pd.read_excel(BytesIO(data), sheet_name=sheet, engine="calamine")
+    if file_name.lower().endswith(".xls"):
+        return pd.read_excel(BytesIO(data), sheet_name=sheet)
+    return read_xlsx_streaming(data, sheet)
+
+
+def sheet_names(data: bytes, file_name: str = "") -> list:
+    """Names of a workbook's sheets, in order, without parsing their cells (or shared strings)."""
+    if not zipfile.is_zipfile(BytesIO(data)):
+        with pd.ExcelFile(BytesIO(data), engine="calamine" if HAS_CALAMINE else None) as xl:
+            return list(xl.sheet_names)
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        root = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+    return [el.get("name") for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "sheet"]
+
+
+# ---------- batches of files and sheets ---------------------------------------
+def is_batch(files) -> bool:
+    """Whether ``(file_name, data)`` pairs need batch loading: several files, or several sheets."""
+    return len(files) != 1 or len(sheet_names(files[0][1], files[0][0])) != 1
+
+
+def batch_digest(files) -> str:
+    """Content hash of a batch: its files' names and digests, independent of upload order."""
+    h = hashlib.sha256(b"batch")
+    for name, data in sorted(files, key=lambda f: f[0]):
+        h.update(f"{name}\0{file_digest(data)}\0".encode())
+    return h.hexdigest()
+
+
+def batch_name(files) -> str:
+    names = sorted(name for name, _ in files)
+    return names[0] if len(names) == 1 else f"{names[0]} + {len(names) - 1} more"
+
+
+def _read_sheet(task: tuple) -> pd.DataFrame:
+    # Runs in a worker process: one sheet, tagged with where its rows came from
+    file_name, data, sheet = task
+    df = read_workbook(data, file_name, sheet)
+    return df.assign(**{SOURCE_FILE_COLUMN: file_name, SOURCE_SHEET_COLUMN: sheet})
+
+
+def align_columns(frames: list) -> list:
+    """Rename columns that differ only in case or surrounding spaces to their first spelling."""
+    canonical = {}
+    for df in frames:
+        for c in df.columns:
+            canonical.setdefault(str(c).strip().lower(), str(c).strip())
+    return [df.rename(columns={c: canonical[str(c).strip().lower()] for c in df.columns}) for df in frames]
+
+
+def parse_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """Process pool for batch parsing. Worker processes are spawned, not forked, so a
+    multi-threaded server (Streamlit, the journal writer) is safe to call it from."""
+    return ProcessPoolExecutor(workers or PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def read_batch(files, pool: ProcessPoolExecutor | None = None) -> pd.DataFrame:
+    """Every sheet of every ``(file_name, data)`` workbook as one frame, parsed in parallel.
+
+    Each (file, sheet) is a task for ``pool`` (a temporary one if not
+    given), so the load scales with cores rather than with the number of
+    files. Columns are aligned by name (see align_columns), missing ones
+    are left empty, and every row is tagged with its source file and
+    sheet. Empty sheets are skipped. The frames are concatenated once, in
+    file-name then sheet order.
+    """
+    tasks = [(name, data, sheet) for name, data in sorted(files, key=lambda f: f[0])
+             for sheet in sheet_names(data, name)]
+    if len(tasks) <= 1 or (pool is None and PARSE_WORKERS <= 1):
+        frames = [_read_sheet(t) for t in tasks]
+    elif pool is None:
+        with parse_pool(min(PARSE_WORKERS, len(tasks))) as own:
+            frames = list(own.map(_read_sheet, tasks))
+    else:
+        frames = list(pool.map(_read_sheet, tasks))
+    frames = [df for df in frames if len(df)]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(align_columns(frames), ignore_index=True, sort=False)
+    tags = [SOURCE_FILE_COLUMN, SOURCE_SHEET_COLUMN]
+    return df[[c for c in df.columns if c not in tags] + tags]
+
+
+def compact_frame(df: pd.DataFrame, arrow_text: bool = ARROW_TEXT) -> pd.DataFrame:
+    """``df`` with its text columns in compact dtypes; numbers, dates and mixed columns are untouched.
+
+    Repetitive columns (publication, edition, journalist) become categoricals:
+    one small code per row instead of a string each. The mostly unique ones
+    (headline, text, URL) become Arrow-backed strings held in one buffer,
+    unless ``arrow_text`` is off (MAP_ARROW_TEXT=0) or pyarrow is missing.
+    """
+    n = len(df)
+    dtypes = {}
+    for c in df.columns:
+        col = df[c]
+        if isinstance(col.dtype, pd.CategoricalDtype) or not pd.api.types.is_string_dtype(col.dtype):
+            continue
+        if pd.api.types.infer_dtype(col, skipna=True) != "string":
+            continue
+        if col.nunique() <= CATEGORY_RATIO * n:
+            dtypes[c] = "category"
+        elif arrow_text and col.dtype == object:
+            dtypes[c] = _arrow_string_dtype()
+    return df.astype(dtypes) if dtypes else df
+
+
+def cache_path(digest: str, cache_dir: str | None = CACHE_DIR) -> str | None:
+    return os.path.join(cache_dir, "uploads", f"{digest}.parquet") if cache_dir and pq else None
+
+
+def is_cached(digest: str, cache_dir: str | None = CACHE_DIR) -> bool:
+    path = cache_path(digest, cache_dir)
+    return bool(path) and os.path.exists(path)
+
+
+def load_upload(data: bytes | None, file_name: str = "", digest: str | None = None,
+                cache_dir: str | None = CACHE_DIR) -> pd.DataFrame:
+    """Parsed upload with a RangeIndex, served from the on-disk Parquet cache when possible.
+
+    The cache is keyed by the content hash, so the same export uploaded from
+    any session (or after a restart) is parsed only once. ``data`` may be None
+    to load a previously seen upload from the cache alone.
+    """
+    digest = digest or file_digest(data)
+    return _load_cached(digest, cache_dir, None if data is None else lambda: read_workbook(data, file_name))
+
+
+def load_batch(files, digest: str | None = None, cache_dir: str | None = CACHE_DIR,
+               pool: ProcessPoolExecutor | None = None) -> pd.DataFrame:
+    """``read_batch`` of ``(file_name, data)`` pairs, cached like load_upload under ``batch_digest``.
+
+    ``files`` may be None to load a previously seen batch from the cache alone.
+    """
+    digest = digest or batch_digest(files)
+    return _load_cached(digest, cache_dir, None if files is None else lambda: read_batch(files, pool))
+
+
+def _load_cached(digest: str, cache_dir: str | None, parse) -> pd.DataFrame:
+    path = cache_path(digest, cache_dir)
+    if path and os.path.exists(path):
+        try:
+            return compact_frame(pd.read_parquet(path))
+        except Exception:
+            pass  # unreadable cache entry: parse again and overwrite it
+    if parse is None:
+        raise FileNotFoundError(f"Upload {digest[:12]} is no longer cached; please upload the file again.")
+    df = compact_frame(parse().reset_index(drop=True))
+    if path:
+        # Only the cached copy has its mixed columns stringified for Arrow; this session keeps the cells as parsed
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            compact_frame(arrow_safe(df)).to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return df
@@ -0,0 +1,205 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from .annotations import AnnotationLog
+from .ingest import CACHE_DIR
+from .status import TBD, DELETED, RowStatus
+from .store import QualificationStore
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATH = os.path.join(CACHE_DIR, "journal.sqlite")
+BATCH_SIZE = 256
+FLUSH_SECONDS = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    upload_digest TEXT NOT NULL,
+    file_name TEXT,
+    n_rows INTEGER,
+    started REAL,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    code INTEGER,
+    category TEXT,
+    fields TEXT
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (session_id, id);
+CREATE INDEX IF NOT EXISTS sessions_by_upload ON sessions (upload_digest, updated);
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class Journal:
+    """Append-only SQLite (WAL) journal of every session's actions.
+
+    ``record`` only enqueues; a background thread writes events in batches,
+    so the click path never waits on disk. Events are keyed by session id,
+    and sessions by the content hash of their upload.
+
+    Event kinds: ``qualify`` (row_id, category, fields), ``unqualify``
+    (row_id, category) and ``move`` (row_id, status code).
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(connect(path)) as conn:
+            conn.executescript(_SCHEMA)
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="map-journal", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    # ---------- writes --------------------------------------------------------
+    def start_session(self, session_id: str, upload_digest: str, file_name: str, n_rows: int):
+        now = time.time()
+        self._queue.put(("session", (session_id, upload_digest, file_name, n_rows, now, now)))
+
+    def record(self, session_id: str, kind: str, row_id: int, code: int | None = None,
+               category: str | None = None, fields: dict | None = None):
+        payload = None if fields is None else json.dumps(fields, default=str)
+        self._queue.put(("event", (session_id, time.time(), kind, int(row_id), code, category, payload)))
+
+    def record_many(self, session_id: str, kind: str, row_ids, codes=None,
+                    category: str | None = None, fields: dict | None = None):
+        """One event per row, enqueued as a single item (bulk actions)."""
+        payload = None if fields is None else json.dumps(fields, default=str)
+        now = time.time()
+        codes = [None] * len(row_ids) if codes is None else [int(c) for c in codes]
+        self._queue.put(("events", [(session_id, now, kind, int(r), c, category, payload)
+                                    for r, c in zip(row_ids, codes)]))
+
+    def record_rows(self, session_id: str, kind: str, row_ids, categories, payloads):
+        """One event per row with its own category and JSON-encoded fields, enqueued as a single item."""
+        now = time.time()
+        self._queue.put(("events", [(session_id, now, kind, int(r), None, c, p)
+                                    for r, c, p in zip(row_ids, categories, payloads)]))
+
+    def flush(self):
+        """Block until everything recorded so far is on disk."""
+        self._queue.join()
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_SECONDS
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._write(conn, batch)
+            except sqlite3.Error:
+                logger.exception("Journal write of %d records failed", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, batch: list):
+        sessions = [p for kind, p in batch if kind == "session"]
+        # Kept in enqueue order: replay relies on event ids following the actions
+        events = [e for kind, p in batch if kind != "session" for e in ([p] if kind == "event" else p)]
+        with conn:
+            conn.executemany(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET updated = excluded.updated",
+                sessions,
+            )
+            conn.executemany(
+                "INSERT INTO events (session_id, ts, kind, row_id, code, category, fields) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                events,
+            )
+            latest = {e[0]: e[1] for e in events}  # events arrive in time order
+            conn.executemany(
+                "UPDATE sessions SET updated = ? WHERE session_id = ?",
+                [(ts, sid) for sid, ts in latest.items()],
+            )
+
+    # ---------- reads ---------------------------------------------------------
+    def sessions(self, upload_digest: str | None = None) -> pd.DataFrame:
+        """Sessions with at least one recorded action, most recent first."""
+        self.flush()
+        sql = (
+            "SELECT s.session_id, s.upload_digest, s.file_name, s.n_rows, s.started, s.updated, "
+            "COUNT(e.id) AS actions FROM sessions s JOIN events e ON e.session_id = s.session_id "
+        )
+        args = ()
+        if upload_digest:
+            sql += "WHERE s.upload_digest = ? "
+            args = (upload_digest,)
+        sql += "GROUP BY s.session_id ORDER BY s.updated DESC"
+        with closing(connect(self.path)) as conn:
+            return pd.read_sql_query(sql, conn, params=args)
+
+    def upload_events(self, upload_digest: str) -> pd.DataFrame:
+        """Every session's events on one upload, in global order (merged team results)."""
+        self.flush()
+        with closing(connect(self.path)) as conn:
+            return pd.read_sql_query(
+                "SELECT e.id, e.kind, e.row_id, e.code, e.category, e.fields FROM events e "
+                "JOIN sessions s ON s.session_id = e.session_id WHERE s.upload_digest = ? ORDER BY e.id",
+                conn, params=(upload_digest,),
+            )
+
+    def events(self, session_id: str) -> pd.DataFrame:
+        self.flush()
+        with closing(connect(self.path)) as conn:
+            return pd.read_sql_query(
+                "SELECT id, kind, row_id, code, category, fields FROM events "
+                "WHERE session_id = ? ORDER BY id",
+                conn, params=(session_id,),
+            )
+
+
+def replay(events: pd.DataFrame, n_rows: int) -> tuple:
+    """Rebuild ``(RowStatus, AnnotationLog, QualificationStore)`` from journal events.
+
+    Only the last event per row (status) and per (row, category)
+    (qualification) matters, so both are reduced with vectorised
+    drop_duplicates before anything is applied.
+    """
+    moves = events[events["kind"] == "move"].drop_duplicates("row_id", keep="last")
+    moves = moves[moves["row_id"] < n_rows]
+    codes = np.zeros(n_rows, dtype=np.int8)
+    codes[moves["row_id"].to_numpy()] = moves["code"].to_numpy()
+    rs = RowStatus.from_codes(codes)
+
+    log = AnnotationLog()
+    store = QualificationStore(log)
+    quals = events[events["kind"].isin(["qualify", "unqualify"])]
+    quals = quals.drop_duplicates(["row_id", "category"], keep="last")
+    quals = quals[(quals["kind"] == "qualify") & (quals["row_id"] < n_rows)]
+    for row_id, category, fields in zip(quals["row_id"], quals["category"], quals["fields"]):
+        store.upsert(int(row_id), category, json.loads(fields))
+    marks = moves[moves["code"].isin([TBD, DELETED])]
+    for row_id, code in zip(marks["row_id"], marks["code"]):
+        log.append(int(row_id), int(code))
+    return rs, log, store
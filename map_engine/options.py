@@ -0,0 +1,131 @@
+import copy
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+try:  # inter-process locking: fcntl on POSIX, msvcrt on Windows
+    import fcntl
+except ImportError:
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock on ``<path>.lock`` shared by every process using ``path``."""
+    with open(f"{path}.lock", "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_json(path: str, obj):
+    """Write ``obj`` to a temp file next to ``path`` and rename it over; readers never see a torn file."""
+    tmp = os.path.join(os.path.dirname(path) or ".", f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class OptionsBank:
+    """Process-wide cache of qual_options.json, shared by every session.
+
+    ``get`` serves the parsed bank from memory and costs one ``stat`` per
+    call; the file is only re-read when its mtime or size changes. Writes
+    hold an inter-process lock, re-read the file, merge, and land through a
+    temp file + rename, so custom categories saved by concurrent sessions
+    (or other server processes) are combined rather than overwritten.
+    The returned dict is shared: treat it as read-only.
+    """
+
+    def __init__(self, path: str, defaults: dict, first_run_flag: str | None = None):
+        self.path = path
+        self.defaults = defaults
+        self.first_run_flag = first_run_flag
+        self.error = None
+        self._lock = threading.Lock()
+        self._bank = None
+        self._stamp = None
+
+    def normalise(self, loaded: dict) -> dict:
+        # Missing or malformed keys fall back to the defaults; Category always comes from the defaults
+        bank = dict(loaded)
+        for key, default in self.defaults.items():
+            if key == "Category" or not isinstance(bank.get(key), list):
+                bank[key] = copy.deepcopy(default)
+        return bank
+
+    def get(self) -> dict:
+        stamp = _stamp(self.path)
+        if self._bank is not None and stamp == self._stamp:
+            return self._bank
+        with self._lock:
+            stamp = _stamp(self.path)
+            if self._bank is None or stamp != self._stamp:
+                self._load(stamp)
+        return self._bank
+
+    def _load(self, stamp):
+        if self.first_run_flag and not os.path.exists(self.first_run_flag):
+            with file_lock(self.path):
+                if not os.path.exists(self.first_run_flag):
+                    atomic_write_json(self.path, self.defaults)
+                    with open(self.first_run_flag, "w") as f:
+                        f.write("First run completed")
+            stamp = _stamp(self.path)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._bank = self.normalise(json.load(f))
+            self.error = None
+        except Exception as e:
+            self._bank = copy.deepcopy(self.defaults)
+            self.error = f"Error loading {self.path}: {e}. Using default options. Please fix the JSON file."
+        self._stamp = stamp
+
+    def add_custom(self, category: str) -> list:
+        """Save a custom category, merged with whatever other sessions saved meanwhile."""
+        with self._lock, file_lock(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    on_disk = json.load(f)
+            except (OSError, ValueError):
+                on_disk = dict(self._bank or self.defaults)  # missing or corrupt: rebuild from memory
+            saved = on_disk.get("SavedUserCategories")
+            saved = list(saved) if isinstance(saved, list) else []
+            if category not in saved:
+                saved.append(category)
+                on_disk["SavedUserCategories"] = saved
+                atomic_write_json(self.path, on_disk)
+            self._bank = self.normalise(on_disk)
+            self._stamp = _stamp(self.path)
+            self.error = None
+            return list(self._bank["SavedUserCategories"])
@@ -0,0 +1,368 @@
+import http.client
+import ipaddress
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import closing
+from html.parser import HTMLParser
+
+from .ingest import CACHE_DIR
+from .journal import connect
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENV = "MAP_PREFETCH"  # "0" turns background fetching off
+CONTENT_PATH = os.path.join(CACHE_DIR, "articles.sqlite")
+CACHE_MIB = float(os.environ.get("MAP_ARTICLE_CACHE_MIB", 256))
+WORKERS = 4
+MAX_QUEUED = 32             # URLs waiting for a worker; further prefetches are dropped, not queued
+TIMEOUT = 8                 # seconds per request
+MAX_BYTES = 2 * 2**20       # of HTML read per page
+MAX_TEXT = 20_000           # characters of extracted text kept per page
+ERROR_TTL = 10 * 60         # failed fetches are retried after this long
+OFFLINE_AFTER = 3           # consecutive network failures before backing off
+OFFLINE_BACKOFF = 60        # seconds without new fetches once offline
+USER_AGENT = "Mozilla/5.0 (compatible; MAP article preview)"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    title TEXT,
+    text TEXT,
+    error TEXT,
+    fetched REAL NOT NULL,
+    used REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pages_by_use ON pages (used);
+"""
+
+
+class Page:
+    """A fetched article: title and readable text, or the error that stopped the fetch."""
+
+    __slots__ = ("url", "title", "text", "error", "fetched")
+
+    def __init__(self, url: str, title: str = "", text: str = "", error: str | None = None,
+                 fetched: float | None = None):
+        self.url = url
+        self.title = title
+        self.text = text
+        self.error = error
+        self.fetched = time.time() if fetched is None else fetched
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _TextExtractor(HTMLParser):
+    # Paragraph text outside scripts, styles and page chrome; the <title> separately
+    SKIP = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "template"}
+    BLOCKS = {"p", "h1", "h2", "h3", "h4", "li", "blockquote", "pre", "br", "div", "article", "section"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title, self.blocks = [], [[]]
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in self.BLOCKS:
+            self.blocks.append([])
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in self.BLOCKS:
+            self.blocks.append([])
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title.append(data)
+        elif not self._skip:
+            self.blocks[-1].append(data)
+
+
+def extract_text(html: str) -> tuple:
+    """``(title, text)`` of an HTML page; text is one paragraph per line."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    paragraphs = (" ".join("".join(b).split()) for b in parser.blocks)
+    text = "\n".join(p for p in paragraphs if p)
+    return " ".join("".join(parser.title).split()), text[:MAX_TEXT]
+
+
+class NotPublic(OSError):
+    """The host resolves to a loopback, private, link-local or otherwise non-public address."""
+
+
+def _public_address(host: str, port: int) -> tuple:
+    # One public address of host, or NotPublic if any it resolves to is not public
+    # (a name mixing public and internal addresses is refused outright)
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    for family, _, _, _, addr in infos:
+        ip = ipaddress.ip_address(addr[0].split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise NotPublic(f"not a public address: {host}")
+    return infos[0][0], infos[0][4]
+
+
+def _guarded_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, **kw):
+    # Connect to the checked address itself, so a second DNS answer can't point elsewhere
+    family, addr = _public_address(*address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+            sock.settimeout(timeout)
+        if source_address:
+            sock.bind(source_address)
+        sock.connect(addr)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+class _GuardedHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._create_connection = _guarded_connection
+
+
+class _GuardedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._create_connection = _guarded_connection
+
+
+class _GuardedHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_GuardedHTTPConnection, req)
+
+
+class _GuardedHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_GuardedHTTPSConnection, req, context=self._context)
+
+
+class _HttpRedirects(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if not newurl.lower().startswith(("http://", "https://")):
+            raise urllib.error.HTTPError(newurl, code, "redirect to a non-http(s) URL", headers, fp)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+# Article URLs come from uploaded spreadsheets, so the server must not be steered into
+# its own network: every connection, redirects included, goes to a checked public
+# address, and proxies from the environment are bypassed (they would hide the target)
+_public_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), _GuardedHTTPHandler, _GuardedHTTPSHandler, _HttpRedirects,
+)
+
+
+def fetch(url: str, timeout: float = TIMEOUT, allow_private: bool = False) -> Page:
+    """Download ``url`` and extract its text; never raises (failures are in ``Page.error``).
+
+    Hosts that resolve to loopback, private, link-local or other
+    non-public addresses are refused, before and after redirects;
+    ``allow_private`` lifts that for tests against a local server.
+    """
+    if not url.lower().startswith(("http://", "https://")):
+        return Page(url, error="not an http(s) URL")
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, "Accept": "text/html,*/*;q=0.5"})
+    opener = urllib.request.build_opener(_HttpRedirects) if allow_private else _public_opener
+    try:
+        with opener.open(request, timeout=timeout) as resp:
+            ctype = resp.headers.get_content_type()
+            if ctype not in ("text/html", "application/xhtml+xml", "text/plain"):
+                return Page(url, error=f"not a web page ({ctype})")
+            body = resp.read(MAX_BYTES).decode(resp.headers.get_content_charset() or "utf-8", errors="replace")
+    except urllib.error.HTTPError as e:
+        return Page(url, error=f"HTTP {e.code}")
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        return Page(url, error=str(getattr(e, "reason", e)) or type(e).__name__)
+    if ctype == "text/plain":
+        return Page(url, text=body[:MAX_TEXT])
+    title, text = extract_text(body)
+    return Page(url, title=title, text=text)
+
+
+class ContentCache:
+    """On-disk LRU cache of fetched pages (SQLite), capped at ``max_mib`` of text.
+
+    Shared by every session in the process, and across restarts. Reads bump
+    an entry's last-use time; writes evict least recently used pages once
+    the stored text exceeds the cap. Dead links (HTTP errors, non-HTML) are
+    cached too, briefly (``ERROR_TTL``), so they are not refetched on every
+    rerun.
+    """
+
+    def __init__(self, path: str = CONTENT_PATH, max_mib: float = CACHE_MIB):
+        self.path = path
+        self.max_bytes = int(max_mib * 2**20)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(connect(path)) as conn:
+            conn.executescript(_SCHEMA)
+
+    def __len__(self):
+        with closing(connect(self.path)) as conn:
+            return conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def size(self) -> int:
+        with closing(connect(self.path)) as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, url: str) -> Page | None:
+        """The cached page, or None if never fetched (or its error has expired)."""
+        try:
+            with closing(connect(self.path)) as conn, conn:
+                row = conn.execute("SELECT title, text, error, fetched FROM pages WHERE url = ?", (url,)).fetchone()
+                if row is None:
+                    return None
+                title, text, error, fetched = row
+                if error is not None and time.time() - fetched > ERROR_TTL:
+                    return None
+                conn.execute("UPDATE pages SET used = ? WHERE url = ?", (time.time(), url))
+        except sqlite3.Error:
+            logger.exception("Reading the article cache failed")
+            return None
+        return Page(url, title or "", text or "", error, fetched)
+
+    def cached(self, urls) -> set:
+        """Which of ``urls`` have a usable entry (one query, no LRU bump)."""
+        urls = list(urls)
+        if not urls:
+            return set()
+        with closing(connect(self.path)) as conn:
+            rows = conn.execute(
+                f"SELECT url FROM pages WHERE url IN ({', '.join('?' * len(urls))}) "
+                "AND (error IS NULL OR fetched > ?)",
+                [*urls, time.time() - ERROR_TTL],
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def put(self, page: Page):
+        size = len(page.title.encode()) + len(page.text.encode()) + len(page.url)
+        try:
+            with closing(connect(self.path)) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (page.url, page.title, page.text, page.error, page.fetched, time.time(), size),
+                )
+                total = conn.execute("SELECT SUM(size) FROM pages").fetchone()[0]
+                if total > self.max_bytes:
+                    self._evict(conn, total - self.max_bytes)
+        except sqlite3.Error:
+            logger.exception("Writing the article cache failed")
+
+    @staticmethod
+    def _evict(conn, excess: int):
+        # Least recently used pages first, until their sizes cover the excess
+        doomed, freed = [], 0
+        for url, size in conn.execute("SELECT url, size FROM pages ORDER BY used"):
+            if freed >= excess:
+                break
+            doomed.append((url,))
+            freed += size
+        conn.executemany("DELETE FROM pages WHERE url = ?", doomed)
+
+
+class Prefetcher:
+    """Fetches upcoming rows' articles in a small thread pool, ahead of the analyst.
+
+    ``prefetch`` only queues work (never blocks a rerun): URLs already cached
+    or in flight are skipped, and at most ``MAX_QUEUED`` wait for a worker.
+    After ``OFFLINE_AFTER`` network failures in a row the prefetcher assumes
+    it is offline and stops fetching for ``OFFLINE_BACKOFF`` seconds; the
+    preview then just says so and the "Open Article" link still works.
+    """
+
+    def __init__(self, cache: ContentCache, workers: int = WORKERS, timeout: float = TIMEOUT,
+                 enabled: bool = os.environ.get(PREFETCH_ENV, "1") != "0", allow_private: bool = False):
+        self.cache = cache
+        self.timeout = timeout
+        self.enabled = enabled
+        self.allow_private = allow_private  # tests only: see fetch
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="map-prefetch")
+        self._inflight = {}  # url -> Future
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._offline_until = 0.0
+
+    @property
+    def offline(self) -> bool:
+        return time.time() < self._offline_until
+
+    def _fetch(self, url: str) -> Page:
+        try:
+            page = fetch(url, self.timeout, self.allow_private)
+            with self._lock:
+                # HTTP errors prove the network is up; only connection failures count
+                network_error = page.error is not None and not page.error.startswith(("HTTP", "not "))
+                self._failures = self._failures + 1 if network_error else 0
+                if self._failures >= OFFLINE_AFTER:
+                    self._offline_until = time.time() + OFFLINE_BACKOFF
+                    self._failures = 0
+            if not network_error:
+                self.cache.put(page)  # a failed connection says nothing about the link itself
+            return page
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+    def _submit(self, url: str):
+        # Caller holds the lock
+        future = self._inflight.get(url)
+        if future is None and len(self._inflight) < MAX_QUEUED:
+            future = self._inflight[url] = self._pool.submit(self._fetch, url)
+        return future
+
+    def prefetch(self, urls) -> int:
+        """Queue ``urls`` (in priority order) for fetching; returns how many were queued."""
+        if not self.enabled or self.offline:
+            return 0
+        urls = list(dict.fromkeys(u for u in urls if u))
+        with self._lock:
+            urls = [u for u in urls if u not in self._inflight]
+        cached = self.cache.cached(urls)
+        todo = [u for u in urls if u not in cached]
+        with self._lock:
+            return sum(self._submit(u) is not None for u in todo)
+
+    def get(self, url: str, wait: float = 0) -> Page | None:
+        """The page if it is cached; otherwise wait up to ``wait`` seconds for a fetch of it.
+
+        With ``wait`` it is fetched now if nobody was fetching it yet; None
+        means still loading.
+        """
+        page = self.cache.get(url)
+        if page is not None or not wait:
+            return page
+        with self._lock:
+            future = self._inflight.get(url) or self._submit(url)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=wait)
+        except FutureTimeout:
+            return None
+
+    def loading(self, url: str) -> bool:
+        with self._lock:
+            return url in self._inflight
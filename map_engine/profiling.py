@@ -0,0 +1,196 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+import pandas as pd
+
+PROFILE_ENV = "MAP_PROFILE"            # any non-empty value turns profiling on for every session
+PROFILE_FILE_ENV = "MAP_PROFILE_FILE"  # *.prom / *.txt: Prometheus text, anything else: JSONL
+HISTORY = 50
+MEMORY_EVERY = 20
+
+
+def deep_sizeof(obj, seen: set | None = None) -> int:
+    """Approximate bytes held by ``obj``, following containers and map_engine objects.
+
+    DataFrames are measured with ``memory_usage(deep=True)``; shared
+    process-wide resources (journal, work queue) are not counted.
+    """
+    from .journal import Journal
+    from .workqueue import WorkQueue
+
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, (Journal, WorkQueue)):
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes + (sum(sys.getsizeof(v) for v in obj.ravel()) if obj.dtype == object else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif type(obj).__module__.startswith(__package__) and hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+class MetricsSink:
+    """Process-wide file sink for rerun profiles, shared by every session.
+
+    JSONL gets one line per rerun. Prometheus text is rewritten atomically
+    after every rerun with running totals, for a node-exporter textfile
+    collector or a quick ``cat``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.prometheus = path.endswith((".prom", ".txt"))
+        self._lock = threading.Lock()
+        self._phases = {}   # phase -> [seconds total, count]
+        self._memory = {}   # (session, key) -> bytes
+
+    def write(self, record: dict):
+        with self._lock:
+            if not self.prometheus:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+                return
+            for phase, ms in record["phases"].items():
+                total = self._phases.setdefault(phase, [0.0, 0])
+                total[0] += ms / 1000
+                total[1] += 1
+            for key, nbytes in (record.get("memory") or {}).items():
+                self._memory[(record["session_id"], key)] = nbytes
+            self._write_prometheus()
+
+    def _write_prometheus(self):
+        lines = [
+            "# HELP map_rerun_phase_seconds Time spent in each phase of a Streamlit rerun.",
+            "# TYPE map_rerun_phase_seconds summary",
+        ]
+        for phase, (seconds, count) in sorted(self._phases.items()):
+            lines.append(f'map_rerun_phase_seconds_sum{{phase="{phase}"}} {seconds:.6f}')
+            lines.append(f'map_rerun_phase_seconds_count{{phase="{phase}"}} {count}')
+        lines += [
+            "# HELP map_session_state_bytes Approximate memory held per session_state key.",
+            "# TYPE map_session_state_bytes gauge",
+        ]
+        for (session, key), nbytes in sorted(self._memory.items()):
+            lines.append(f'map_session_state_bytes{{session="{session}",key="{key}"}} {nbytes}')
+        tmp = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+
+class RerunProfiler:
+    """Times the phases of each rerun and, every few reruns, session_state memory by key.
+
+    ``begin`` opens a rerun and ``end`` closes it; a rerun cut short by
+    ``st.rerun`` is closed by the next ``begin``. Phases timed outside a
+    rerun (widget callbacks, fragment reruns) are recorded on their own.
+    A disabled profiler costs one attribute check per phase.
+    """
+
+    def __init__(self, enabled: bool = True, sink: MetricsSink | None = None,
+                 history: int = HISTORY, memory_every: int = MEMORY_EVERY):
+        self.enabled = enabled
+        self.sink = sink
+        self.memory_every = memory_every
+        self.records = deque(maxlen=history)
+        self.memory = {}
+        self.session_id = None
+        self._current = None
+        self._reruns = 0
+
+    def begin(self, kind: str = "rerun"):
+        if not self.enabled:
+            return
+        if self._current is not None:
+            self.end(interrupted=True)
+        self._current = {"kind": kind, "start": time.perf_counter(), "phases": {}}
+
+    def end(self, state=None, interrupted: bool = False):
+        """Close the current rerun; ``state`` (session_state) is sized every ``memory_every`` reruns."""
+        current, self._current = self._current, None
+        if not self.enabled or current is None:
+            return
+        record = {
+            "ts": time.time(),
+            "session_id": self.session_id,
+            "kind": current["kind"],
+            "interrupted": interrupted,
+            "total_ms": (time.perf_counter() - current["start"]) * 1000,
+            "phases": current["phases"],
+        }
+        if current["kind"] == "rerun":
+            self._reruns += 1
+            if state is not None and (self._reruns % self.memory_every == 1 or not self.memory):
+                record["memory"] = self.measure_memory(state)
+        self.records.append(record)
+        if self.sink is not None:
+            self.sink.write(record)
+
+    def measure_memory(self, state) -> dict:
+        self.memory = {str(k): deep_sizeof(v) for k, v in dict(state).items()}
+        return self.memory
+
+    @contextmanager
+    def _timed(self, name: str):
+        standalone = self._current is None
+        if standalone:
+            self.begin(kind=name)
+        current = self._current
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            current["phases"][name] = current["phases"].get(name, 0.0) + ms
+            if standalone:
+                self.end()
+
+    def phase(self, name: str):
+        """Context manager timing ``name`` within the current rerun."""
+        return self._timed(name) if self.enabled else nullcontext()
+
+    def timed(self, name: str):
+        """Decorator form of ``phase``."""
+        def wrap(func):
+            @functools.wraps(func)
+            def inner(*args, **kw):
+                with self.phase(name):
+                    return func(*args, **kw)
+            return inner
+        return wrap
+
+    # ---------- reporting -----------------------------------------------------
+    def frame(self) -> pd.DataFrame:
+        """Recent reruns, newest first: kind, total and one column per phase (ms)."""
+        rows = [{"kind": r["kind"], "total": r["total_ms"], **r["phases"]} for r in reversed(self.records)]
+        return pd.DataFrame(rows)
+
+    def summary(self) -> pd.DataFrame:
+        """Per-phase count, mean, p90 and max (ms) over the recent history."""
+        samples = {}
+        for r in self.records:
+            for phase, ms in r["phases"].items():
+                samples.setdefault(phase, []).append(ms)
+        rows = [
+            {"phase": p, "n": len(xs), "mean": float(np.mean(xs)),
+             "p90": float(np.percentile(xs, 90)), "max": float(np.max(xs))}
+            for p, xs in samples.items()
+        ]
+        return pd.DataFrame(rows).sort_values("mean", ascending=False) if rows else pd.DataFrame(rows)
@@ -0,0 +1,108 @@
+import os
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from .annotations import QUAL_FIELDS
+from .export import EXPORT_BUCKETS
+from .history import NO_CONTENT, article_keys
+from .ingest import HAS_CALAMINE
+from .status import STATUS_CODES, PENDING, QUALIFIED, PARTIAL
+
+KEYS = ["url_key", "content_key", "nth"]
+
+# Sheet names of an xlsx export, and file stems inside a flat-format zip
+_BUCKET_NAMES = {**{label: b for b, label in EXPORT_BUCKETS.items()},
+                 **{label.lower().replace(" ", "_"): b for b, label in EXPORT_BUCKETS.items()}}
+_READERS = {
+    ".csv": pd.read_csv,
+    ".jsonl": lambda f: pd.read_json(f, lines=True),
+    ".parquet": pd.read_parquet,
+}
+
+
+def read_export(data: bytes, file_name: str = "") -> dict:
+    """``{bucket: DataFrame}`` from an earlier export: an xlsx workbook or a zip of csv/jsonl/parquet.
+
+    Sheets and files that are not export buckets are ignored.
+    """
+    if file_name.lower().endswith((".xlsx", ".xls")):
+        sheets = pd.read_excel(BytesIO(data), sheet_name=None, engine="calamine" if HAS_CALAMINE else None)
+        return {_BUCKET_NAMES[name]: df for name, df in sheets.items() if name in _BUCKET_NAMES}
+    frames = {}
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        for name in zf.namelist():
+            stem, ext = os.path.splitext(os.path.basename(name))
+            if stem in _BUCKET_NAMES and ext in _READERS:
+                with zf.open(name) as f:
+                    frames[_BUCKET_NAMES[stem]] = _READERS[ext](BytesIO(f.read()))
+    return frames
+
+
+def _ranked(keys: pd.DataFrame, by: list) -> pd.DataFrame:
+    # Exact copies share a key: the n-th copy in the export matches the n-th in the source
+    keys = keys[(keys["url_key"] != "") | (keys["content_key"] != NO_CONTENT)]
+    return keys.assign(nth=keys.groupby(by, dropna=False, sort=False).cumcount())
+
+
+def _entry_fields(frame: pd.DataFrame) -> pd.DataFrame:
+    # Exported values back to what the form saves: missing -> None, Page an int, Prominence "" -> None
+    out = pd.DataFrame(index=frame.index)
+    for f in QUAL_FIELDS:
+        col = frame[f] if f in frame.columns else pd.Series(None, index=frame.index, dtype=object)
+        if f == "Page":
+            col = pd.to_numeric(col, errors="coerce").round().astype("Int64")
+        out[f] = col.astype(object).where(col.notna() & (col.astype(object) != ""), None)
+    return out
+
+
+def import_export(session, frames: dict, source_keys: pd.DataFrame | None = None) -> dict:
+    """Restore an earlier export's buckets onto ``session``'s pending rows; returns counts.
+
+    Export rows are matched to source rows on (URL key, content hash,
+    occurrence) in one merge; matched pending rows are filed in one
+    ``import_rows`` call, with their categories and fields. Everything
+    unmatched stays pending, and rows already filed in this session are
+    left as they are. ``source_keys`` (article_keys of session.df)
+    can be passed in when the caller has them cached.
+    """
+    if source_keys is None:
+        source_keys = article_keys(session.df)
+    src = _ranked(source_keys.assign(row_id=np.arange(len(source_keys))), ["url_key", "content_key"])
+
+    parts = [frame.assign(_code=STATUS_CODES[b]) for b, frame in frames.items() if len(frame)]
+    counts = {"matched": 0, **{b: 0 for b in EXPORT_BUCKETS}, "unmatched": 0, "already_filed": 0}
+    if not parts:
+        return counts
+    exp = pd.concat(parts, ignore_index=True)
+    filed = exp["_code"].isin([QUALIFIED, PARTIAL])
+    # One export row per qualified category: rank copies per category, so all of a
+    # row's categories land on the same source row
+    category = exp["Category"].where(filed) if "Category" in exp.columns else pd.Series(None, index=exp.index)
+    keys = article_keys(exp).assign(_code=exp["_code"].to_numpy(), category=category.to_numpy(), pos=exp.index)
+    keys = _ranked(keys, ["url_key", "content_key", "category"])
+    m = keys.merge(src[[*KEYS, "row_id"]], on=KEYS, sort=False)
+    counts["unmatched"] = len(exp) - len(m)
+
+    # A source row is only filed if still pending. Its qualified and partial entries are
+    # one set (a row with one incomplete category is exported to both sheets), re-filed
+    # from all of them; a row without any takes its highest remaining bucket
+    pending = session.status.codes[m["row_id"].to_numpy()] == PENDING
+    counts["already_filed"] = m.loc[~pending, "row_id"].nunique()
+    m = m[pending]
+    is_filed = filed.to_numpy()[m["pos"].to_numpy()]
+    rank = m.assign(_code=np.where(is_filed, QUALIFIED, m["_code"].to_numpy()))
+    rows = rank.sort_values("_code", kind="stable").drop_duplicates("row_id")
+    entries = m[is_filed & m["category"].notna().to_numpy()]
+    entries = entries.drop_duplicates(["row_id", "category"])
+    fields = _entry_fields(exp.loc[entries["pos"].to_numpy(), [f for f in QUAL_FIELDS if f in exp.columns]])
+    fields.insert(0, "row_id", entries["row_id"].to_numpy())
+    fields["Category"] = entries["category"].to_numpy()
+
+    codes = session.import_rows(rows["row_id"].to_numpy(), rows["_code"].to_numpy(), fields.reset_index(drop=True))
+    counts["matched"] = len(rows)
+    for b in EXPORT_BUCKETS:
+        counts[b] = int((codes == STATUS_CODES[b]).sum())
+    return counts
@@ -0,0 +1,151 @@
+import os
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .dedup import TEXT_COLUMNS, joined_text, pa, pc
+from .options import OptionsBank, _stamp, atomic_write_json, file_lock
+
+RULE_FIELDS = ("Category", "Tonality", "Spokesperson")
+# Case-insensitive regular expressions per label, written to qual_rules.json on first run.
+# They are phrases rather than single words: "customers", "growth" or "strategy" turn
+# up in most business stories, and a suggestion on every row is no suggestion at all.
+DEFAULT_RULES = {
+    "Category": {
+        "Innovation": [r"\binnovat\w*", r"\bpatents?\b", r"\br&d\b", r"\bbreakthrough", r"\bcutting[- ]edge\b"],
+        "Market share": [r"\bmarket share\b", r"\bmarket leader\w*", r"\bshare of the market\b"],
+        "Leadership": [r"\b(appoints?|appointed|names|named) (a |its )?(new )?(ceo|chief \w+ officer|chairman|chairperson|"
+                       r"managing director|president)\b", r"\bsteps? down as\b", r"\bleadership (change|team|transition)\b"],
+        "Customer relation": [r"\bcustomer (service|experience|satisfaction|loyalty|relationships?)\b",
+                              r"\bclient (relationships?|relations|satisfaction)\b", r"\bnet promoter\b"],
+        "M&A": [r"\bacqui(re|res|red|sition)s?\b", r"\bmergers?\b", r"\btakeovers?\b", r"\bbuyouts?\b",
+                r"\b(majority|controlling|minority) stake\b"],
+        "Business Growth": [r"\b(revenues?|sales|profits?) (rose|grew|jumped|surged|doubled|increased)\b",
+                            r"\b(revenue|profit|sales) growth\b", r"\bquarterly results\b", r"\bexpansion plans?\b"],
+        "Products & Services": [r"\blaunch(es|ed)? (a |an |its )?new\b", r"\bunveil\w*",
+                                r"\bnew (product|service|range|model)s?\b"],
+        "Vision": [r"\bvision (for|statement)\b", r"\broadmap\b", r"\bstrategic (plan|priorities|roadmap|vision)\b",
+                   r"\blong[- ]term strategy\b", r"\b(five|ten|\d+)[- ]year plan\b"],
+        "Work Environment": [r"\bworkplace\b", r"\bhiring (spree|freeze)\b", r"\blayoffs?\b", r"\bjob cuts\b",
+                             r"\bemployee (benefits|wellbeing|well-being|engagement)\b", r"\bgreat place to work\b"],
+    },
+    "Tonality": {
+        "Positive": [r"\brecord (profit|revenue|sales|high|quarter|year)s?\b", r"\bwins? (an? )?(award|contract|order)s?\b",
+                     r"\bsurg(e|es|ed)\b", r"\bbeat(s)? (estimates|expectations)\b"],
+        "Negative": [r"\blosses\b", r"\bdecline[sd]?\b", r"\bfraud\b", r"\blawsuits?\b", r"\bprobe\b",
+                     r"\bpenalt(y|ies)\b", r"\blayoffs?\b", r"\bslump\w*"],
+    },
+    "Spokesperson": {
+        "Authored": [r"\bauthored by\b", r"\bguest column\b", r"\bop-ed\b"],
+        "Interview": [r"\binterview\w*", r"\bin conversation with\b", r"\bq&a\b"],
+        "Quote": [r"\b(spokes(man|woman|person)|ceo|chairman|chairperson|founder|managing director) (said|says|told)\b",
+                  r"\bsaid in a statement\b"],
+    },
+}
+
+
+def _label_pattern(patterns: list) -> str:
+    # One alternation per label; each user pattern stays its own non-capturing group
+    return "|".join(f"(?:{p})" for p in patterns)
+
+
+def _matches(texts: pd.Series, arrow_texts, pattern: str) -> np.ndarray:
+    if arrow_texts is not None:
+        try:
+            return pc.match_substring_regex(arrow_texts, pattern, ignore_case=True).to_numpy(zero_copy_only=False)
+        except pa.ArrowInvalid:
+            pass  # Python-only syntax (lookarounds, backreferences): fall back to re
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # capture groups in user patterns are harmless here
+        return texts.str.contains(pattern, case=False, regex=True).to_numpy(dtype=bool)
+
+
+class RuleBank(OptionsBank):
+    """Keyword/regex rules (qual_rules.json) that suggest a category, tonality and spokesperson.
+
+    The file maps each field to ``{label: [pattern, ...]}``; patterns are
+    case-insensitive regular expressions. Like the options bank it is shared
+    process-wide and re-read only when it changes on disk; every pattern is
+    validated once per version, and invalid ones are skipped and listed in
+    ``invalid``. A missing file is created from the defaults.
+    """
+
+    def __init__(self, path: str, defaults: dict):
+        super().__init__(path, defaults)
+        self.invalid = []
+        self.rules = {}
+        self.version = None
+
+    def normalise(self, loaded: dict) -> dict:
+        bank, invalid = {}, []
+        for field in RULE_FIELDS:
+            labels = loaded.get(field, self.defaults.get(field, {}))
+            bank[field] = {}
+            for label, patterns in (labels.items() if isinstance(labels, dict) else []):
+                ok = []
+                for p in patterns if isinstance(patterns, list) else []:
+                    try:
+                        re.compile(p)
+                        ok.append(p)
+                    except (re.error, TypeError):
+                        invalid.append(f"{field} / {label}: {p!r}")
+                if ok:
+                    bank[field][label] = ok
+        self.invalid = invalid
+        return bank
+
+    def _load(self, stamp):
+        if stamp is None:
+            with file_lock(self.path):
+                if not os.path.exists(self.path):
+                    atomic_write_json(self.path, self.defaults)
+            stamp = _stamp(self.path)
+        super()._load(stamp)
+        self.rules = {field: {label: _label_pattern(ps) for label, ps in labels.items()}
+                      for field, labels in self._bank.items()}
+        self.version = stamp
+
+    def suggest(self, df: pd.DataFrame, text_columns=TEXT_COLUMNS) -> "Suggestions":
+        """Evaluate every rule over the whole frame in one pass per label."""
+        self.get()
+        cols = [c for c in text_columns if c in df.columns]
+        texts = pd.Series("", index=df.index, dtype=object)
+        if cols:
+            texts = joined_text(df, cols).astype(str)
+        arrow_texts = pa.array(texts.to_numpy(dtype=object), type=pa.large_string()) if pa is not None else None
+        masks = {field: {label: _matches(texts, arrow_texts, pattern) for label, pattern in labels.items()}
+                 for field, labels in self.rules.items()}
+        return Suggestions(masks, len(df))
+
+
+class Suggestions:
+    """Rule hits for every row of an upload: ``masks[field][label]`` is a boolean array.
+
+    Categories suggest every matching label; tonality only when exactly one
+    label matches (mixed signals are left to the analyst); spokesperson the
+    first matching label in rule order.
+    """
+
+    def __init__(self, masks: dict, n: int):
+        self.masks = masks
+        self.n = n
+
+    def _hits(self, field: str, row_id: int) -> list:
+        return [label for label, mask in self.masks.get(field, {}).items() if mask[row_id]]
+
+    def categories(self, row_id: int) -> list:
+        return self._hits("Category", row_id)
+
+    def tonality(self, row_id: int) -> str | None:
+        hits = self._hits("Tonality", row_id)
+        return hits[0] if len(hits) == 1 else None
+
+    def spokesperson(self, row_id: int) -> str | None:
+        hits = self._hits("Spokesperson", row_id)
+        return hits[0] if hits else None
+
+    def counts(self, field: str) -> dict:
+        """Rows matched per label (for a summary of what the rules caught)."""
+        return {label: int(mask.sum()) for label, mask in self.masks.get(field, {}).items()}
@@ -0,0 +1,79 @@
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from .dedup import WORD_SEPARATORS, joined_text, vocabulary
+
+SEARCH_COLUMNS = ("Headline", "Text", "Publication")
+MIN_PREFIX = 2  # shorter query terms only match whole words
+
+_SEPARATORS = re.compile(WORD_SEPARATORS)
+
+
+def query_terms(query: str) -> list:
+    """Query split into words the same way the index splits the text."""
+    return _SEPARATORS.sub(" ", query.lower()).split()
+
+
+class SearchIndex:
+    """Inverted index from words to the rows of an immutable df_work that contain them.
+
+    Built once per upload in a few vectorised passes: the distinct words are
+    sorted into a vocabulary and the postings are stored CSR-style (one
+    sorted row-id array sliced per word), so a lookup never touches the
+    DataFrame. Every query term matches as a prefix ("acq" finds
+    "acquisition"); terms are ANDed. Row statuses are applied to the hits
+    at query time, so the index needs no upkeep as rows are filed.
+    """
+
+    def __init__(self, vocab: list, offsets: np.ndarray, postings: np.ndarray, n_rows: int):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.postings = postings
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns=SEARCH_COLUMNS) -> "SearchIndex":
+        cols = [c for c in columns if c in df.columns]
+        n = len(df)
+        if not cols or not n:
+            return cls([], np.zeros(1, dtype=np.int64), np.array([], dtype=np.int64), n)
+        vocab, ids, lengths = vocabulary(joined_text(df, cols))
+        order = np.argsort(np.asarray(vocab, dtype=str), kind="stable")
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        rows = np.repeat(np.arange(n, dtype=np.int64), lengths)
+        # One (word, row) pair per occurrence; sorting the combined key dedups and groups them
+        pairs = np.sort(rank[ids] * n + rows)
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+        words, postings = np.divmod(pairs, n)
+        offsets = np.searchsorted(words, np.arange(len(order) + 1))
+        return cls(np.asarray(vocab, dtype=object)[order].tolist(), offsets, postings, n)
+
+    def __len__(self):
+        return len(self.vocab)
+
+    def rows_with(self, term: str) -> np.ndarray:
+        """Rows containing a word that starts with ``term`` (or equals it, for short terms)."""
+        lo = bisect_left(self.vocab, term)
+        if len(term) >= MIN_PREFIX:
+            hi = bisect_left(self.vocab, term + "\U0010ffff")
+        else:
+            hi = lo + int(lo < len(self.vocab) and self.vocab[lo] == term)
+        if lo >= hi:
+            return np.array([], dtype=np.int64)
+        if hi - lo == 1:
+            return self.postings[self.offsets[lo]:self.offsets[hi]]
+        return np.unique(self.postings[self.offsets[lo]:self.offsets[hi]])
+
+    def search(self, query: str) -> np.ndarray:
+        """Sorted row ids matching every term of ``query``."""
+        hits = None
+        for term in sorted(set(query_terms(query)), key=len, reverse=True):
+            rows = self.rows_with(term)
+            hits = rows if hits is None else hits[np.isin(hits, rows, assume_unique=True)]
+            if not len(hits):
+                break
+        return np.array([], dtype=np.int64) if hits is None else hits
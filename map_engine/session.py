@@ -0,0 +1,350 @@
+import hashlib
+import os
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .analytics import PUBLICATION_COLUMN, LiveTallies
+from .annotations import AnnotationLog
+from .export import EXPORT_BUCKETS, export_buckets
+from .ingest import CACHE_DIR, file_digest, load_upload
+from .journal import Journal, replay
+from .status import STATUS_CODES, QUALIFIED, PARTIAL, TBD, DELETED, RowStatus
+from .store import QualificationStore
+from .undo import Step, UndoStack
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Content hash of an in-memory frame, for sessions not started from a file."""
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+class QualificationSession:
+    """One annotator's pass over an upload, independent of any UI.
+
+    Holds the row statuses, the annotation log and the qualification store
+    over an immutable df, and journals every action when a Journal is
+    attached. MAP.py drives it from widget callbacks; scripts can drive it
+    directly for bulk imports, migrations and load tests::
+
+        s = QualificationSession.load("export.xlsx")
+        s.qualify(0, "Innovation", {"Dominance": "Primary", "Prominence": ["Headline"],
+                                     "Tonality": "Positive"}, submit=True)
+        s.delete(1)
+        data, file_name, mime = s.export("csv")
+
+    Actions taken inside ``with s.step(label):`` form one undoable step;
+    ``undo``/``redo`` replay the changed rows' before/after states as ordinary
+    (journalled) actions.
+    """
+
+    def __init__(self, df: pd.DataFrame, digest: str | None = None, file_name: str = "",
+                 session_id: str | None = None, journal: Journal | None = None, *,
+                 status: RowStatus | None = None, log: AnnotationLog | None = None,
+                 store: QualificationStore | None = None):
+        self.df = df
+        self.digest = digest or frame_digest(df)
+        self.file_name = file_name
+        self.session_id = session_id or uuid.uuid4().hex
+        self.journal = journal
+        self.status = status if status is not None else RowStatus(len(df))
+        self.log = log if log is not None else AnnotationLog()
+        self.store = store if store is not None else QualificationStore(self.log)
+        self.tallies = LiveTallies(self.log, df[PUBLICATION_COLUMN] if PUBLICATION_COLUMN in df.columns else None)
+        self.history = UndoStack()
+        self._step = None  # row id -> state before the open step touched it
+        if journal is not None:
+            journal.start_session(self.session_id, self.digest, file_name, len(df))
+
+    @classmethod
+    def load(cls, source, file_name: str = "", journal: Journal | None = None,
+             cache_dir: str | None = CACHE_DIR) -> "QualificationSession":
+        """Start a session on a workbook given as bytes or a path."""
+        if isinstance(source, (str, os.PathLike)):
+            file_name = file_name or os.path.basename(source)
+            with open(source, "rb") as f:
+                source = f.read()
+        digest = file_digest(source)
+        return cls(load_upload(source, file_name, digest, cache_dir), digest, file_name, journal=journal)
+
+    @classmethod
+    def from_events(cls, df: pd.DataFrame, events: pd.DataFrame, **kw) -> "QualificationSession":
+        """Rebuild state from journal events (one session's, or a whole team's)."""
+        status, log, store = replay(events, len(df))
+        return cls(df, status=status, log=log, store=store, **kw)
+
+    @classmethod
+    def resume(cls, df: pd.DataFrame, digest: str, file_name: str, session_id: str,
+               journal: Journal) -> "QualificationSession":
+        """Pick a journalled session up where it left off and keep journalling to it."""
+        return cls.from_events(df, journal.events(session_id), digest=digest, file_name=file_name,
+                               session_id=session_id, journal=journal)
+
+    # ---------- queries -------------------------------------------------------
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def pending(self) -> int:
+        return self.status.pending
+
+    @property
+    def version(self) -> int:
+        """Bumped by every change to the annotations (export cache key)."""
+        return self.log.version
+
+    def rows(self, bucket: str | None = None) -> int:
+        """Rows still pending, or rows currently filed under ``bucket``."""
+        return self.pending if bucket is None else self.status.count(STATUS_CODES[bucket])
+
+    def entries(self, bucket: str) -> int:
+        """Live log entries in ``bucket`` (one per qualified category)."""
+        return self.log.count(bucket)
+
+    def bucket_rows(self, bucket: str):
+        return self.status.members(STATUS_CODES[bucket])
+
+    def next_row(self, after: int | None = None) -> int | None:
+        """First pending row, or the pending row after ``after``; None when done."""
+        return self.status.first_pending() if after is None else self.status.next_pending(after)
+
+    def categories(self, row_id: int) -> list:
+        return self.store.categories(row_id)
+
+    def get(self, row_id: int, category: str) -> dict | None:
+        return self.store.get(row_id, category)
+
+    def row_code(self, row_id: int) -> int:
+        return self.store.row_code(row_id)
+
+    def row_state(self, row_id: int) -> tuple:
+        """``(status code, ((category, fields), ...))``: everything undo needs to put a row back."""
+        return self.status.status(row_id), tuple((c, self.get(row_id, c)) for c in self.categories(row_id))
+
+    # ---------- actions -------------------------------------------------------
+    def _record(self, kind: str, row_id: int, **kw):
+        if self.journal is not None:
+            self.journal.record(self.session_id, kind, row_id, **kw)
+
+    def _record_many(self, kind: str, row_ids: np.ndarray, **kw):
+        if self.journal is not None and len(row_ids):
+            self.journal.record_many(self.session_id, kind, row_ids.tolist(), **kw)
+
+    def _touch(self, row_id: int):
+        if self._step is not None and row_id not in self._step:
+            self._step[row_id] = self.row_state(row_id)
+
+    def qualify(self, row_id: int, category: str, fields: dict, submit: bool = False) -> int:
+        """Save ``fields`` for (row_id, category); returns QUALIFIED or PARTIAL.
+
+        The row itself is only re-filed when ``submit`` is true (or on
+        ``submit(row_id)``), so several categories can be qualified first.
+        """
+        self._touch(row_id)
+        code = self.store.upsert(row_id, category, fields)
+        self._record("qualify", row_id, category=category, fields=fields)
+        if submit:
+            self.submit(row_id)
+        return code
+
+    def unqualify(self, row_id: int, category: str):
+        self._touch(row_id)
+        self.store.delete(row_id, category)
+        self._record("unqualify", row_id, category=category)
+
+    def submit(self, row_id: int) -> int:
+        """File the row as qualified or partial from its saved categories."""
+        code = self.row_code(row_id)
+        self.move(row_id, code)
+        return code
+
+    def move(self, row_id: int, code: int) -> int | None:
+        """File ``row_id`` under ``code``; returns the next pending row (None when done)."""
+        self._touch(row_id)
+        self.status.set(row_id, code)
+        self._record("move", row_id, code=code)
+        if code in (TBD, DELETED):
+            self.log.append(row_id, code)
+        else:
+            self.log.unmark(row_id)
+        return self.next_row(row_id)
+
+    def tbd(self, row_id: int) -> int | None:
+        return self.move(row_id, TBD)
+
+    def delete(self, row_id: int) -> int | None:
+        return self.move(row_id, DELETED)
+
+    def move_rows(self, row_ids, code: int):
+        """``move`` for many rows in one pass: one status rebuild, log write and journal batch."""
+        row_ids = np.unique(np.asarray(row_ids, dtype=np.int64))
+        for row_id in row_ids.tolist() if self._step is not None else ():
+            self._touch(row_id)
+        self.status.set_many(row_ids, code)
+        if code in (TBD, DELETED):
+            self.log.extend(row_ids, code)
+        else:
+            self.log.unmark_many(row_ids)
+        self._record_many("move", row_ids, codes=[code] * len(row_ids))
+
+    def delete_rows(self, row_ids):
+        self.move_rows(row_ids, DELETED)
+
+    def qualify_many(self, items, submit: bool = True) -> int:
+        """Apply ``(row_id, category, fields)`` triples, e.g. from a pre-qualified sheet.
+
+        Each touched row is filed once at the end; returns the number of rows.
+        """
+        touched = {}
+        for row_id, category, fields in items:
+            self.qualify(int(row_id), category, fields)
+            touched[int(row_id)] = None
+        if submit:
+            for row_id in touched:
+                self.submit(row_id)
+        return len(touched)
+
+    def qualify_rows(self, row_ids, category: str, fields: dict, submit: bool = False) -> int:
+        """Save the same ``fields`` for ``category`` on many rows at once (bulk mode).
+
+        Classified exactly like ``qualify``; returns QUALIFIED or PARTIAL.
+        """
+        row_ids = np.unique(np.asarray(row_ids, dtype=np.int64))
+        for row_id in row_ids.tolist() if self._step is not None else ():
+            self._touch(row_id)
+        code = self.store.upsert_many(row_ids, category, fields)
+        self._record_many("qualify", row_ids, category=category, fields=fields)
+        if submit:
+            self.submit_rows(row_ids)
+        return code
+
+    def submit_rows(self, row_ids) -> np.ndarray:
+        """``submit`` for many rows in one pass; returns the code each row was filed under."""
+        row_ids = np.unique(np.asarray(row_ids, dtype=np.int64))
+        for row_id in row_ids.tolist() if self._step is not None else ():
+            self._touch(row_id)
+        codes = self.store.row_codes(row_ids)
+        for code in (QUALIFIED, PARTIAL):
+            self.status.set_many(row_ids[codes == code], code)
+        self.log.unmark_many(row_ids)
+        self._record_many("move", row_ids, codes=codes)
+        return codes
+
+    def import_rows(self, row_ids, codes, entries: pd.DataFrame) -> np.ndarray:
+        """File rows from an earlier export in one vectorised pass; see reimport.import_export.
+
+        ``codes`` is each row's bucket in that export. ``entries`` holds
+        ``row_id``, ``Category`` and the qualification fields (Prominence
+        ", "-joined, as exported) of the qualified/partial rows, which are
+        then filed from their entries exactly as on submit. Returns the code
+        each row was filed under.
+        """
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        codes = np.asarray(codes, dtype=np.int8).copy()
+        for row_id in row_ids.tolist() if self._step is not None else ():
+            self._touch(row_id)
+        # Half-saved rows start over from the export
+        cleared_rows, cleared = self.store.delete_rows(row_ids)
+        if self.journal is not None and len(cleared):
+            self.journal.record_rows(self.session_id, "unqualify", cleared_rows.tolist(), cleared,
+                                     [None] * len(cleared))
+        fields = [f for f in entries.columns if f not in ("row_id", "Category")]
+        self.store.insert_many(entries["row_id"].to_numpy(), entries["Category"].tolist(),
+                               {f: entries[f].to_numpy(dtype=object) for f in fields})
+        if self.journal is not None and len(entries):
+            # qualify events carry Prominence as a list, like the ones the form records
+            q = entries[fields].assign(Prominence=entries["Prominence"].str.split(", "))
+            payloads = q.to_json(orient="records", lines=True).splitlines()
+            self.journal.record_rows(self.session_id, "qualify", entries["row_id"].tolist(),
+                                     entries["Category"].tolist(), payloads)
+        filed = np.isin(codes, (QUALIFIED, PARTIAL))
+        codes[filed] = self.store.row_codes(row_ids[filed])
+        for code in (QUALIFIED, PARTIAL, TBD, DELETED):
+            self.status.set_many(row_ids[codes == code], code)
+        marks = np.isin(codes, (TBD, DELETED))
+        self.log.extend(row_ids[marks], codes[marks])
+        self._record_many("move", row_ids, codes=codes)
+        return codes
+
+    def fan_out(self, row_id: int, members) -> int:
+        """Copy ``row_id``'s qualification and filing to ``members`` (its syndicated copies).
+
+        Members end up with exactly the representative's categories and the
+        same status; returns the number of rows updated. Only a qualification
+        is shared: a representative parked as To Be Decided or deleted leaves
+        its copies pending, to be judged on their own.
+        """
+        code = self.status.status(row_id)
+        if code not in (QUALIFIED, PARTIAL):
+            return 0
+        quals = {c: {f: v for f, v in self.get(row_id, c).items() if f != "Category"}
+                 for c in self.categories(row_id)}
+        n = 0
+        for m in members:
+            m = int(m)
+            if m == row_id:
+                continue
+            for c in self.categories(m):
+                if c not in quals:
+                    self.unqualify(m, c)
+            for c, fields in quals.items():
+                self.qualify(m, c, dict(fields))
+            self.move(m, code)
+            n += 1
+        return n
+
+    # ---------- undo / redo ---------------------------------------------------
+    @contextmanager
+    def step(self, label: str):
+        """Record the actions in the block as one undoable step (a nested step joins the outer one).
+
+        The step is kept even if the block raises (a Streamlit rerun does), so
+        whatever it changed can still be undone.
+        """
+        if self._step is not None:
+            yield
+            return
+        self._step = {}
+        try:
+            yield
+        finally:
+            before, self._step = self._step, None
+            deltas = [(r, b, self.row_state(r)) for r, b in before.items()]
+            deltas = [d for d in deltas if d[1] != d[2]]
+            if deltas:
+                self.history.push(Step(label, deltas))
+
+    def restore(self, row_id: int, state: tuple):
+        """Put ``row_id`` back into ``state`` (see row_state) with ordinary, journalled actions."""
+        code, quals = state
+        if tuple((c, self.get(row_id, c)) for c in self.categories(row_id)) != quals:
+            for c in self.categories(row_id):
+                self.unqualify(row_id, c)
+            for c, fields in quals:
+                self.qualify(row_id, c, fields)
+        if self.status.status(row_id) != code:
+            self.move(row_id, code)
+
+    def undo(self) -> Step | None:
+        """Revert the latest step; returns it (None if there was nothing to undo)."""
+        step = self.history.pop_undo()
+        for row_id, before, _ in reversed(step.deltas) if step else ():
+            self.restore(row_id, before)
+        return step
+
+    def redo(self) -> Step | None:
+        """Re-apply the latest undone step; returns it (None if there was nothing to redo)."""
+        step = self.history.pop_redo()
+        for row_id, _, after in step.deltas if step else ():
+            self.restore(row_id, after)
+        return step
+
+    # ---------- export --------------------------------------------------------
+    def frames(self, buckets=EXPORT_BUCKETS) -> dict:
+        return {b: self.log.frame(self.df, b) for b in buckets}
+
+    def export(self, fmt: str = "xlsx", stem: str = "qualified_news_items") -> tuple:
+        """Every bucket as ``(data, file_name, mime)``; see export_buckets."""
+        return export_buckets(self.frames(), fmt, stem)
@@ -0,0 +1,251 @@
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from .export import pq
+from .ingest import CACHE_DIR
+from .profiling import deep_sizeof
+
+logger = logging.getLogger(__name__)
+
+SPILL_DIR = os.path.join(CACHE_DIR, "spill")
+IDLE_SECONDS = float(os.environ.get("MAP_SPILL_IDLE_S", 30 * 60))
+BUDGET_MIB = float(os.environ.get("MAP_MEMORY_BUDGET_MIB", 2048))
+GRACE_SECONDS = 60          # entries used this recently are never spilled (their rerun may be in flight)
+SWEEP_EVERY = 30            # seconds between sweeps; sizing every entry is not free
+SPILL_TTL = 7 * 24 * 3600   # spilled entries nobody came back for are deleted
+
+
+class _Entry:
+    __slots__ = ("objects", "last_used", "size")
+
+    def __init__(self, objects: dict):
+        self.objects = objects
+        self.last_used = time.time()
+        self.size = 0
+
+
+class _Pickler(pickle.Pickler):
+    # DataFrames go to Parquet files beside the pickle (each once, however often it is
+    # referenced); process-wide resources are pickled by name and re-bound on load.
+    # Object columns stay in the pickle as they are: Parquet would have to stringify
+    # a mixed one, and the reloaded frame must equal the spilled one
+    def __init__(self, f, path: str, shared: dict):
+        super().__init__(f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.path = path
+        self.shared = {id(v): k for k, v in shared.items()}
+        self.frames = {}
+
+    def persistent_id(self, obj):
+        if id(obj) in self.shared:
+            return ("shared", self.shared[id(obj)])
+        if isinstance(obj, pd.DataFrame) and pq is not None:
+            pid = self.frames.get(id(obj))
+            if pid is None:
+                name = f"frame{len(self.frames)}.parquet"
+                inline = [c for c, dtype in obj.dtypes.items() if dtype == object]
+                try:
+                    obj.drop(columns=inline).to_parquet(os.path.join(self.path, name))
+                except Exception:
+                    return None  # not Arrow-typeable: pickled inline
+                objects = {c: obj[c].to_numpy() for c in inline}
+                pid = self.frames[id(obj)] = ("frame", name, objects, list(obj.columns))
+            return pid
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, f, path: str, shared):
+        super().__init__(f)
+        self.path = path
+        self.shared = shared  # name -> process-wide object
+        self.frames = {}
+
+    def persistent_load(self, pid):
+        if pid[0] == "shared":
+            return self.shared(pid[1])
+        _, name, objects, columns = pid
+        if name not in self.frames:
+            frame = pd.read_parquet(os.path.join(self.path, name))
+            for c, values in objects.items():
+                frame[c] = pd.Series(values, index=frame.index, dtype=object)
+            self.frames[name] = frame[columns] if objects else frame
+        return self.frames[name]
+
+
+class SessionStore:
+    """Process-wide home of each browser session's large objects, spilled to disk when idle.
+
+    st.session_state keeps only the key (the session id); ``get`` returns the
+    live objects, reloading them first if they were spilled. ``sweep`` spills
+    entries idle for ``idle_seconds``, then least recently used ones until
+    the live entries fit in ``budget_mib``. Sizes are measured most recent
+    first with one shared ``seen`` set, so a frame shared by several tabs
+    counts once, against the tab that used it last.
+
+    An entry spills to one pickle, with every DataFrame in it written once to
+    Parquet (object columns stay in the pickle, unconverted), so a frame
+    referenced from several objects is shared again after a reload.
+
+    Objects in ``shared`` (the journal, say) are process-wide and not the
+    session's to save: they are pickled by name and re-bound on load. So are
+    objects registered with ``share`` (an upload frame held by a cache), which
+    are not counted against the budget either; if one has been dropped by the
+    time its entry is reloaded, ``loader(name)`` gets it back.
+    """
+
+    def __init__(self, spill_dir: str = SPILL_DIR, budget_mib: float = BUDGET_MIB,
+                 idle_seconds: float = IDLE_SECONDS, grace_seconds: float = GRACE_SECONDS,
+                 shared: dict | None = None, loader=None):
+        self.spill_dir = spill_dir
+        self.shared = shared or {}
+        self.loader = loader
+        self._shared_frames = weakref.WeakValueDictionary()  # name -> object registered with share()
+        self.budget = budget_mib * 2**20
+        self.idle_seconds = idle_seconds
+        self.grace_seconds = grace_seconds
+        self._live = OrderedDict()  # key -> _Entry, least recently used first
+        self._spilled = set()  # keys this store spilled (older spill dirs are from before a restart)
+        self._lock = threading.RLock()
+        self._last_sweep = 0.0
+        self.spills = self.reloads = 0
+
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.spill_dir, key)
+
+    # ---------- queries -------------------------------------------------------
+    def __contains__(self, key) -> bool:
+        return key in self._live or (key is not None and os.path.isdir(self._dir(key)))
+
+    def active(self, key) -> bool:
+        """Whether a tab of this process holds ``key``, live or spilled."""
+        return key in self._live or key in self._spilled
+
+    def stats(self) -> dict:
+        with self._lock:
+            spilled = [n for n in os.listdir(self.spill_dir) if not n.startswith(".")] \
+                if os.path.isdir(self.spill_dir) else []
+            return {"live": len(self._live), "spilled": len(spilled),
+                    "live_mib": sum(e.size for e in self._live.values()) / 2**20,
+                    "spills": self.spills, "reloads": self.reloads}
+
+    def _shared(self, name):
+        if name in self.shared:
+            return self.shared[name]
+        obj = self._shared_frames.get(name)
+        return obj if obj is not None else self.loader(name)
+
+    # ---------- actions -------------------------------------------------------
+    def share(self, name, obj):
+        """Treat ``obj`` as process-wide: entries holding it spill its name, not its data."""
+        self._shared_frames[name] = obj
+
+    def put(self, key: str, **objects) -> dict:
+        """Hold ``objects`` under ``key``, replacing whatever was there; returns the live dict."""
+        with self._lock:
+            self.discard(key)
+            self._live[key] = _Entry(objects)
+            return objects
+
+    def get(self, key: str | None) -> dict | None:
+        """The live objects for ``key`` (reloaded from disk if spilled), or None if unknown.
+
+        The returned dict is the held one: assigning into it updates the entry.
+        """
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._live.get(key)
+            if entry is None:
+                objects = self._load(key)
+                if objects is None:
+                    return None
+                entry = self._live[key] = _Entry(objects)
+                self.reloads += 1
+            self._live.move_to_end(key)
+            entry.last_used = time.time()
+            return entry.objects
+
+    def discard(self, key: str | None):
+        with self._lock:
+            self._live.pop(key, None)
+            self._spilled.discard(key)
+            if key is not None:
+                shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    def sweep(self, force: bool = False) -> list:
+        """Spill idle entries, then LRU entries while over budget; returns the keys spilled."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < SWEEP_EVERY:
+                return []
+            self._last_sweep = now
+            seen = {id(v) for v in (*self.shared.values(), *self._shared_frames.values())}
+            for entry in reversed(self._live.values()):
+                entry.size = deep_sizeof(entry.objects, seen)
+            total = sum(e.size for e in self._live.values())
+            spilled = []
+            for key, entry in list(self._live.items()):
+                idle = now - entry.last_used
+                if idle < self.grace_seconds:
+                    break  # everything after this was used even more recently
+                if idle >= self.idle_seconds or total > self.budget:
+                    if self._spill(key, entry):
+                        total -= entry.size
+                        spilled.append(key)
+            self._purge(now)
+        if spilled:
+            logger.info("Spilled %d idle session(s) to %s", len(spilled), self.spill_dir)
+        return spilled
+
+    # ---------- disk ----------------------------------------------------------
+    def _spill(self, key: str, entry: _Entry) -> bool:
+        tmp = os.path.join(self.spill_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.makedirs(tmp)
+            with open(os.path.join(tmp, "objects.pkl"), "wb") as f:
+                _Pickler(f, tmp, {**self.shared, **self._shared_frames}).dump(entry.objects)
+            shutil.rmtree(self._dir(key), ignore_errors=True)
+            os.replace(tmp, self._dir(key))
+        except Exception:
+            # Keep the entry in memory rather than lose it
+            logger.exception("Spilling session %s failed", key)
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        del self._live[key]
+        self._spilled.add(key)
+        self.spills += 1
+        return True
+
+    def _load(self, key: str) -> dict | None:
+        path = self._dir(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            with open(os.path.join(path, "objects.pkl"), "rb") as f:
+                objects = _Unpickler(f, path, self._shared).load()
+        except Exception:
+            logger.exception("Reloading spilled session %s failed", key)
+            return None
+        shutil.rmtree(path, ignore_errors=True)
+        self._spilled.discard(key)
+        return objects
+
+    def _purge(self, now: float):
+        if not os.path.isdir(self.spill_dir):
+            return
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            try:
+                if now - os.path.getmtime(path) > SPILL_TTL:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
@@ -0,0 +1,150 @@
+import numpy as np
+
+# ---------- row status codes -------------------------------------------------
+PENDING, QUALIFIED, PARTIAL, TBD, DELETED, UNASSIGNED = range(6)
+STATUS_NAMES = ("pending", "qualified", "partial", "to_be_decided", "deleted", "unassigned")
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+
+class RowStatus:
+    """Per-row status array over an immutable df_work plus a "next pending" cursor.
+
+    Row ids are the positional index of df_work. Pending rows are threaded on a
+    doubly linked list (slot ``n`` is the sentinel), so taking a row out of the
+    queue and finding the one after it are O(1) regardless of file size.
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self.codes = np.zeros(n, dtype=np.int8)
+        self.counts = [0] * len(STATUS_NAMES)
+        self.counts[PENDING] = n
+        self._next = np.arange(1, n + 2, dtype=np.int64)
+        self._prev = np.arange(-1, n, dtype=np.int64)
+        self._next[n] = 0
+        self._prev[0] = n
+
+    @classmethod
+    def from_codes(cls, codes) -> "RowStatus":
+        """Rebuild from a status-code array in one vectorised pass (journal replay)."""
+        codes = np.asarray(codes, dtype=np.int8)
+        rs = cls(len(codes))
+        rs.codes[:] = codes
+        rs.counts = np.bincount(codes, minlength=len(STATUS_NAMES)).tolist()
+        chain = np.concatenate(([rs.n], np.flatnonzero(codes == PENDING), [rs.n]))
+        rs._next[chain[:-1]] = chain[1:]
+        rs._prev[chain[1:]] = chain[:-1]
+        return rs
+
+    # ---------- queries -------------------------------------------------------
+    def __len__(self):
+        return self.n
+
+    def status(self, row_id: int) -> int:
+        return int(self.codes[row_id])
+
+    def count(self, code: int) -> int:
+        return self.counts[code]
+
+    @property
+    def pending(self) -> int:
+        return self.counts[PENDING]
+
+    def members(self, code: int) -> np.ndarray:
+        """Row ids currently holding ``code``, in source order."""
+        return np.flatnonzero(self.codes == code)
+
+    def processed(self) -> np.ndarray:
+        """Row ids that have been qualified, parked or deleted."""
+        return np.flatnonzero((self.codes != PENDING) & (self.codes != UNASSIGNED))
+
+    def first_pending(self) -> int | None:
+        head = int(self._next[self.n])
+        return None if head == self.n else head
+
+    def next_pending(self, row_id: int) -> int | None:
+        """Pending row after ``row_id`` (wrapping round), or None when none are left.
+
+        Works whether or not ``row_id`` is itself still pending: a row just taken
+        off the list keeps its old links, which is the O(1) path. Its link is
+        still good if it leads to a pending row (or the sentinel) whose back link
+        lies before ``row_id``; anything else has gone stale and falls back to a
+        vectorised search.
+        """
+        if not self.pending:
+            return None
+        nxt = int(self._next[row_id])
+        if self.codes[row_id] != PENDING and not (
+            self._is_anchor(nxt) and (nxt == self.n or nxt > row_id)
+            and (self._prev[nxt] == self.n or self._prev[nxt] < row_id)
+        ):
+            ids = self.members(PENDING)
+            at = int(np.searchsorted(ids, row_id, side="right"))
+            nxt = int(ids[at]) if at < len(ids) else self.n
+        if nxt == self.n:
+            nxt = int(self._next[self.n])
+        return nxt
+
+    def seek(self, row_id: int) -> int | None:
+        """``row_id`` if it is pending, otherwise the next pending row."""
+        if 0 <= row_id < self.n and self.codes[row_id] == PENDING:
+            return row_id
+        if 0 <= row_id < self.n:
+            return self.next_pending(row_id)
+        return self.first_pending()
+
+    # ---------- updates -------------------------------------------------------
+    def set(self, row_id: int, code: int):
+        old = int(self.codes[row_id])
+        if old == code:
+            return
+        if old == PENDING:
+            self._unlink(row_id)
+        elif code == PENDING:
+            self._relink(row_id)
+        self.codes[row_id] = code
+        self.counts[old] -= 1
+        self.counts[code] += 1
+
+    def set_many(self, row_ids, code: int):
+        """File many rows under ``code`` in one vectorised pass (relinks the pending list)."""
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        if not len(row_ids):
+            return
+        codes = self.codes.copy()
+        codes[row_ids] = code
+        rebuilt = RowStatus.from_codes(codes)
+        self.codes, self.counts = rebuilt.codes, rebuilt.counts
+        self._next, self._prev = rebuilt._next, rebuilt._prev
+
+    def assign(self, row_ids):
+        """Queue rows leased to this session (UNASSIGNED -> PENDING) in one pass."""
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        self.set_many(row_ids[self.codes[row_ids] == UNASSIGNED], PENDING)
+
+    def unassign_pending(self) -> np.ndarray:
+        """Park every pending row as UNASSIGNED (rows are then handed out by a work queue)."""
+        pending = self.members(PENDING)
+        self.set_many(pending, UNASSIGNED)
+        return pending
+
+    def _unlink(self, row_id: int):
+        p, q = self._prev[row_id], self._next[row_id]
+        self._next[p] = q
+        self._prev[q] = p
+
+    def _relink(self, row_id: int):
+        # Rows put back in reverse order of removal still hold valid neighbours;
+        # anything else falls back to a vectorised search for the slot.
+        p, q = int(self._prev[row_id]), int(self._next[row_id])
+        if not (self._is_anchor(p) and self._is_anchor(q) and self._next[p] == q):
+            ids = self.members(PENDING)
+            at = int(np.searchsorted(ids, row_id))
+            p = int(ids[at - 1]) if at > 0 else self.n
+            q = int(ids[at]) if at < len(ids) else self.n
+        self._prev[row_id], self._next[row_id] = p, q
+        self._next[p] = row_id
+        self._prev[q] = row_id
+
+    def _is_anchor(self, slot: int) -> bool:
+        return slot == self.n or (0 <= slot < self.n and self.codes[slot] == PENDING)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from .annotations import AnnotationLog
+from .status import QUALIFIED, PARTIAL
+
+
+def is_partial(q: dict) -> bool:
+    # Page is valid if 0 or greater, so we don't check it for partial
+    return pd.isna(q.get("Dominance")) or not q.get("Prominence") or pd.isna(q.get("Tonality"))
+
+
+def partial_mask(fields: dict) -> np.ndarray:
+    """``is_partial`` over columns of log entries (Prominence flattened to a string)."""
+    prominence = np.asarray(fields.get("Prominence"), dtype=object)
+    return (pd.isna(np.asarray(fields.get("Dominance"), dtype=object)) | pd.isna(prominence)
+            | (prominence == "") | pd.isna(np.asarray(fields.get("Tonality"), dtype=object)))
+
+
+def to_entry(q: dict) -> dict:
+    """Qualification as stored in the log: Prominence flattened to a string."""
+    entry = dict(q)
+    prominence = entry.get("Prominence") or []
+    entry["Prominence"] = ", ".join(prominence) if prominence else None
+    return entry
+
+
+class QualificationStore:
+    """Current qualification for each (row id, category), indexed over an AnnotationLog.
+
+    Every key points at the log position of its live entry, so upsert, delete
+    and lookup are O(1). Re-qualifying a key appends a fresh entry and retires
+    the old one, which is how an entry moves between partial and qualified.
+    """
+
+    def __init__(self, log: AnnotationLog):
+        self.log = log
+        self._by_row = {}  # row id -> {category: log position}, in qualification order
+
+    def __contains__(self, key) -> bool:
+        row_id, category = key
+        return category in self._by_row.get(row_id, {})
+
+    def __len__(self):
+        return self.log.count("qualified") + self.log.count("partial")
+
+    def upsert(self, row_id: int, category: str, q: dict) -> int:
+        """Save ``q`` for (row_id, category); returns QUALIFIED or PARTIAL."""
+        code = PARTIAL if is_partial(q) else QUALIFIED
+        self.delete(row_id, category)
+        pos = self.log.append(row_id, code, to_entry({**q, "Category": category}))
+        self._by_row.setdefault(row_id, {})[category] = pos
+        return code
+
+    def upsert_many(self, row_ids, category: str, q: dict) -> int:
+        """Save the same ``q`` for ``category`` on every row in one vectorised log append."""
+        code = PARTIAL if is_partial(q) else QUALIFIED
+        row_ids = np.unique(np.asarray(row_ids, dtype=np.int64))
+        old = [pos for pos in (self._by_row.get(r, {}).get(category) for r in row_ids.tolist())
+               if pos is not None]
+        self.log.retire_many(old)
+        positions = self.log.extend(row_ids, code, to_entry({**q, "Category": category}))
+        for r, pos in zip(row_ids.tolist(), positions.tolist()):
+            self._by_row.setdefault(r, {})[category] = pos
+        return code
+
+    def insert_many(self, row_ids, categories, fields: dict) -> np.ndarray:
+        """Save (row_ids[i], categories[i]) pairs, each with its own fields, in one log append.
+
+        ``fields`` maps qualification fields to arrays aligned with
+        ``row_ids``, Prominence flattened as in the log. The pairs must be
+        new (re-import only fills pending rows). Returns each entry's code.
+        """
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        codes = np.where(partial_mask(fields), PARTIAL, QUALIFIED).astype(np.int8)
+        positions = self.log.extend(row_ids, codes, {**fields, "Category": categories})
+        for r, c, pos in zip(row_ids.tolist(), categories, positions.tolist()):
+            self._by_row.setdefault(r, {})[c] = pos
+        return codes
+
+    def delete(self, row_id: int, category: str):
+        cats = self._by_row.get(row_id)
+        pos = cats.pop(category, None) if cats else None
+        if pos is None:
+            return
+        self.log.retire(pos)
+        if not cats:
+            del self._by_row[row_id]
+
+    def delete_rows(self, row_ids) -> tuple:
+        """Delete every category saved on ``row_ids`` in one log retire.
+
+        Returns the deleted pairs as ``(row ids, categories)``, for journalling.
+        """
+        rows, categories, positions = [], [], []
+        for r in np.asarray(row_ids, dtype=np.int64).tolist():
+            cats = self._by_row.pop(r, None)
+            if cats:
+                rows += [r] * len(cats)
+                categories += cats
+                positions += cats.values()
+        self.log.retire_many(positions)
+        return np.asarray(rows, dtype=np.int64), categories
+
+    def get(self, row_id: int, category: str) -> dict | None:
+        pos = self._by_row.get(row_id, {}).get(category)
+        if pos is None:
+            return None
+        q = {f: col[pos] for f, col in self.log.fields.items()}
+        q["Prominence"] = q["Prominence"].split(", ") if q["Prominence"] else []
+        return q
+
+    def categories(self, row_id: int) -> list:
+        return list(self._by_row.get(row_id, {}))
+
+    def row_code(self, row_id: int) -> int:
+        """Row-level status: QUALIFIED only when every saved category is complete."""
+        cats = self._by_row.get(row_id)
+        if not cats:
+            return PARTIAL
+        codes = self.log.code.values
+        return PARTIAL if any(codes[pos] == PARTIAL for pos in cats.values()) else QUALIFIED
+
+    def row_codes(self, row_ids) -> np.ndarray:
+        """``row_code`` for many rows at once, from the live partial entries in the log."""
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        log = self.log
+        partial_rows = log.row_id.values[log.live.values & (log.code.values == PARTIAL)]
+        has_any = np.fromiter((r in self._by_row for r in row_ids.tolist()), dtype=bool, count=len(row_ids))
+        return np.where(np.isin(row_ids, partial_rows) | ~has_any, PARTIAL, QUALIFIED).astype(np.int8)
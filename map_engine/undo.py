@@ -0,0 +1,57 @@
+from collections import deque
+
+UNDO_LIMIT = 100  # steps kept on each stack
+
+
+class Step:
+    """One undoable user action: ``(row_id, before, after)`` for every row it changed.
+
+    A row state is ``(status code, ((category, fields), ...))``, so a step
+    costs a few small tuples per touched row whatever the size of the upload.
+    """
+
+    __slots__ = ("label", "deltas")
+
+    def __init__(self, label: str, deltas: list):
+        self.label = label
+        self.deltas = deltas
+
+    @property
+    def rows(self) -> list:
+        return [row_id for row_id, _, _ in self.deltas]
+
+    def __repr__(self):
+        return f"Step({self.label!r}, {len(self.deltas)} row(s))"
+
+
+class UndoStack:
+    """Bounded undo and redo stacks of Steps; recording a new step clears redo."""
+
+    def __init__(self, limit: int = UNDO_LIMIT):
+        self.undo = deque(maxlen=limit)
+        self.redo = deque(maxlen=limit)
+
+    def push(self, step: Step):
+        self.undo.append(step)
+        self.redo.clear()
+
+    def pop_undo(self) -> Step | None:
+        if not self.undo:
+            return None
+        step = self.undo.pop()
+        self.redo.append(step)
+        return step
+
+    def pop_redo(self) -> Step | None:
+        if not self.redo:
+            return None
+        step = self.redo.pop()
+        self.undo.append(step)
+        return step
+
+    def next_undo(self) -> str | None:
+        """Label of the step ``undo`` would revert, if any."""
+        return self.undo[-1].label if self.undo else None
+
+    def next_redo(self) -> str | None:
+        return self.redo[-1].label if self.redo else None
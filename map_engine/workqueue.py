@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from .ingest import CACHE_DIR
+from .journal import connect
+
+QUEUE_PATH = os.path.join(CACHE_DIR, "queue.sqlite")
+LEASE_BATCH = 20
+LEASE_SECONDS = 15 * 60
+
+OPEN, LEASED, DONE = range(3)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    digest TEXT PRIMARY KEY,
+    file_name TEXT,
+    n_rows INTEGER NOT NULL,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS work (
+    digest TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    state INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_until REAL,
+    PRIMARY KEY (digest, row_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS work_by_state ON work (digest, state, row_id);
+CREATE INDEX IF NOT EXISTS work_by_owner ON work (digest, owner, state);
+"""
+
+
+class WorkQueue:
+    """Shared queue that hands rows of one upload out to annotator sessions.
+
+    Rows are leased in batches for ``LEASE_SECONDS``; leases are renewed on
+    every sync, and any that lapse (closed tab, crashed browser) go back to
+    the open pool the next time anyone syncs. Each sync is one short
+    ``BEGIN IMMEDIATE`` transaction, so concurrent sessions never receive the
+    same row.
+    """
+
+    def __init__(self, path: str = QUEUE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(connect(path)) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _transaction(self) -> sqlite3.Connection:
+        conn = connect(self.path)
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def register(self, digest: str, file_name: str, n_rows: int):
+        """Make an upload available for sharing; a no-op if it already is."""
+        conn = self._transaction()
+        try:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO datasets VALUES (?, ?, ?, ?)",
+                (digest, file_name, n_rows, time.time()),
+            )
+            if cur.rowcount:
+                conn.executemany(
+                    "INSERT INTO work (digest, row_id) VALUES (?, ?)",
+                    ((digest, r) for r in range(n_rows)),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def sync(self, digest: str, owner: str, done=(), want: int = 0,
+             ttl: float = LEASE_SECONDS) -> tuple:
+        """Mark ``done`` rows finished, renew ``owner``'s leases and lease up to ``want`` more.
+
+        Returns ``(leased, lost)``: newly leased row ids, and ids in ``done``
+        that had been reassigned to someone else after this owner's lease lapsed.
+        """
+        now = time.time()
+        done = [int(r) for r in done]
+        conn = self._transaction()
+        try:
+            conn.execute(
+                "UPDATE work SET state = ?, owner = NULL, lease_until = NULL "
+                "WHERE digest = ? AND state = ? AND lease_until < ?",
+                (OPEN, digest, LEASED, now),
+            )
+            lost = []
+            for r in done:
+                cur = conn.execute(
+                    "UPDATE work SET state = ?, owner = ?, lease_until = NULL "
+                    "WHERE digest = ? AND row_id = ? AND (state = ? OR owner = ?)",
+                    (DONE, owner, digest, r, OPEN, owner),
+                )
+                if not cur.rowcount:
+                    lost.append(r)
+            conn.execute(
+                "UPDATE work SET lease_until = ? WHERE digest = ? AND owner = ? AND state = ?",
+                (now + ttl, digest, owner, LEASED),
+            )
+            leased = []
+            if want > 0:
+                leased = [r for (r,) in conn.execute(
+                    "SELECT row_id FROM work WHERE digest = ? AND state = ? ORDER BY row_id LIMIT ?",
+                    (digest, OPEN, want),
+                )]
+                conn.executemany(
+                    "UPDATE work SET state = ?, owner = ?, lease_until = ? WHERE digest = ? AND row_id = ?",
+                    ((LEASED, owner, now + ttl, digest, r) for r in leased),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return leased, lost
+
+    def release(self, digest: str, owner: str):
+        """Hand ``owner``'s unfinished rows back to the pool straight away."""
+        with closing(connect(self.path)) as conn, conn:
+            conn.execute(
+                "UPDATE work SET state = ?, owner = NULL, lease_until = NULL "
+                "WHERE digest = ? AND owner = ? AND state = ?",
+                (OPEN, digest, owner, LEASED),
+            )
+
+    def progress(self, digest: str) -> dict:
+        """Row counts per state, plus the number of annotators holding leases."""
+        with closing(connect(self.path)) as conn:
+            counts = dict(conn.execute(
+                "SELECT state, COUNT(*) FROM work WHERE digest = ? GROUP BY state", (digest,)
+            ).fetchall())
+            (annotators,) = conn.execute(
+                "SELECT COUNT(DISTINCT owner) FROM work WHERE digest = ? AND state = ? AND lease_until >= ?",
+                (digest, LEASED, time.time()),
+            ).fetchone()
+        return {
+            "open": counts.get(OPEN, 0),
+            "leased": counts.get(LEASED, 0),
+            "done": counts.get(DONE, 0),
+            "annotators": annotators,
+        }
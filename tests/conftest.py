@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# map_engine reads its cache location at import: keep every test run out of the working tree
+os.environ.setdefault("MAP_CACHE_DIR", tempfile.mkdtemp(prefix="map-test-cache-"))
+os.environ.setdefault("MAP_PREFETCH", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
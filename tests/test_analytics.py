@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from map_engine import DELETED, TBD, LiveTallies, QualificationSession
+from map_engine.analytics import NOT_SET, PUBLICATION_COLUMN
+from map_engine.reimport import import_export, read_export
+
+CATEGORIES = ["Innovation", "Vision", "M&A", "Leadership"]
+TONALITIES = ["Positive", "Neutral", "Negative", None]
+
+
+def _df(n=60):
+    return pd.DataFrame({"Headline": [f"Story {i}" for i in range(n)],
+                         "URL": [f"https://news.example/{i}" for i in range(n)],
+                         PUBLICATION_COLUMN: (["Daily", "Weekly", None] * n)[:n]})
+
+
+def _fields(rng):
+    return {"Dominance": rng.choice(["Primary", "Secondary", None]),
+            "Prominence": ["Headline"] if rng.random() < 0.8 else [],
+            "Spokesperson": rng.choice(["CEO", "CFO", None]),
+            "Page": int(rng.integers(0, 9)), "Tonality": rng.choice(TONALITIES),
+            "Spokesperson Name with Designation": rng.choice(["A. Person, CEO", "B. Person, CFO", None])}
+
+
+def _recount(s):
+    # The same tables from scratch: a groupby over the Qualified and Partial sheets
+    f = s.frames(("qualified", "partial"))
+    entries = pd.concat(f.values(), ignore_index=True).astype(object).fillna(NOT_SET)
+
+    def table(counts):
+        return {k: int(n) for k, n in counts.items() if n}
+
+    return {
+        "category": table(entries.groupby(["Category", "Tonality"]).size()),
+        "publication": table(entries.groupby([PUBLICATION_COLUMN, "Tonality"]).size()),
+        "dominance": table(entries["Dominance"].value_counts()),
+        "spokesperson": table(entries["Spokesperson"].value_counts()),
+        "names": table(entries["Spokesperson Name with Designation"].value_counts().drop(NOT_SET, errors="ignore")),
+    }
+
+
+def _tallied(t):
+    def pivot(frame):
+        return {k: int(n) for k, n in frame.stack().items() if n}
+
+    return {
+        "category": pivot(t.by_category()),
+        "publication": pivot(t.by_publication()),
+        "dominance": t.dominance_counts().to_dict(),
+        "spokesperson": t.spokesperson_counts().to_dict(),
+        "names": t.spokesperson_names().to_dict(),
+    }
+
+
+def test_tallies_match_a_full_recount_through_a_session():
+    rng = np.random.default_rng(7)
+    s = QualificationSession(_df())
+    for i in range(300):
+        row = int(rng.integers(0, len(s)))
+        action = rng.random()
+        if action < 0.5:
+            s.qualify(row, rng.choice(CATEGORIES), _fields(rng), submit=rng.random() < 0.7)
+        elif action < 0.6 and s.categories(row):
+            s.unqualify(row, s.categories(row)[0])
+        elif action < 0.7:
+            with s.step("Mark"):
+                s.move(row, TBD if rng.random() < 0.5 else DELETED)
+        elif action < 0.75:
+            rows = rng.choice(len(s), 8, replace=False)
+            with s.step("Bulk"):
+                s.qualify_rows(rows, rng.choice(CATEGORIES), _fields(rng), submit=True)
+        elif action < 0.85:
+            s.undo()
+        else:
+            s.redo()
+        if i % 25 == 0:
+            assert _tallied(s.tallies) == _recount(s)
+    assert _tallied(s.tallies) == _recount(s)
+    assert sum(_recount(s)["category"].values()) == s.entries("qualified") + s.entries("partial") > 0
+    # A tally started on a worked log counts the same
+    assert _tallied(LiveTallies(s.log, s.df[PUBLICATION_COLUMN])) == _recount(s)
+
+
+def test_tallies_follow_a_reimport():
+    rng = np.random.default_rng(3)
+    df = _df()
+    source = QualificationSession(df)
+    for row in range(40):
+        for c in rng.choice(CATEGORIES, int(rng.integers(1, 3)), replace=False):
+            source.qualify(row, c, _fields(rng))
+        source.submit(row)
+    data, name, _ = source.export("xlsx")
+
+    s = QualificationSession(df)
+    s.qualify(0, "Vision", _fields(rng))  # half-saved: replaced by the import
+    import_export(s, read_export(data, name))
+    assert _tallied(s.tallies) == _recount(s) == _recount(source)
+
+
+def test_empty_tables():
+    t = QualificationSession(_df(3)).tallies
+    assert t.by_category().empty and t.by_publication().empty
+    assert t.dominance_counts().empty and t.spokesperson_names().empty
@@ -0,0 +1,68 @@
+import logging
+import os
+
+import pandas as pd
+import pytest
+
+from map_engine import XLSX_MIME
+from map_engine.export import to_xlsx
+
+streamlit_testing = pytest.importorskip("streamlit.testing.v1")
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "MAP.py")
+
+
+def _run(at):
+    at.run()
+    assert not at.exception, at.exception[0].message
+    return at
+
+
+def _bucket_counts(at):
+    return at.sidebar.radio(key="bucket_selector").options[1:]
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the options bank lives in the working directory
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    return streamlit_testing.AppTest.from_file(APP, default_timeout=120)
+
+
+def _upload(at, n=3):
+    df = pd.DataFrame({"Headline": [f"Story {i}" for i in range(n)],
+                       "URL": [f"https://news.example/finish/{i}" for i in range(n)]})
+    _run(at)
+    at.file_uploader[0].set_value(("finish.xlsx", to_xlsx({"Sheet1": df}), XLSX_MIME))
+    return _run(at)
+
+
+def test_finishing_the_last_row_keeps_the_session(app):
+    at = _upload(app)
+    session_id = at.session_state["session_id"]
+    at.button(key="to_be_decided_0").click()
+    _run(at)
+    at.button(key="del_1").click()
+    _run(at)
+    at.button(key="to_be_decided_2").click()  # the last pending row
+    _run(at)
+    counts = _bucket_counts(at)
+    assert counts == ["Deleted Records 🗑️ (1)", "To Be Decided ⏳ (2)"]
+
+    _run(at)  # the uploader still holds the same file
+    _run(at)
+    assert at.session_state["session_id"] == session_id
+    assert _bucket_counts(at) == counts
+    assert at.session_state["file_uploaded"]
+
+
+def test_a_session_live_in_another_tab_is_not_offered_for_resume(app, tmp_path):
+    at = _upload(app)
+    at.button(key="to_be_decided_0").click()
+    _run(at)  # journalled, so the session is a resume candidate
+    session_id = at.session_state["session_id"]
+
+    other = _run(streamlit_testing.AppTest.from_file(APP, default_timeout=120))  # a second tab
+    offered = [c["session_id"] for c in other.session_state["resume_candidates"]]
+    assert session_id not in offered
+    assert not [b for b in other.button if b.key == f"resume_{session_id}"]
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from map_engine import DELETED, PENDING, QUALIFIED, PARTIAL, TBD, Clusters, QualificationSession
+
+COMPLETE = {"Dominance": "Primary", "Prominence": ["Headline"], "Spokesperson": "CEO",
+            "Page": 1, "Tonality": "Positive"}
+INCOMPLETE = {"Dominance": None, "Prominence": ["Headline"], "Tonality": "Neutral", "Page": 0}
+WIRE = "Acme Corp agreed to buy Widget Holdings for two billion dollars in cash, the companies said on Monday"
+
+
+def _df():
+    return pd.DataFrame({
+        "Headline": ["Acme buys Widget", "Acme buys Widget", "Local bakery wins award", "Acme to buy Widget",
+                     "Rain expected", "Something else entirely"],
+        "Text": [WIRE, WIRE + ".", "A small story about bread and pastry in town", WIRE, "Short", "Different words here"],
+        "URL": ["https://news.example/a?utm=1", "http://other.example/b", "https://news.example/c",
+                "https://www.news.example/a/", None, ""],
+    })
+
+
+@pytest.fixture
+def worked():
+    df = _df()
+    return QualificationSession(df), Clusters.from_frame(df)
+
+
+def test_syndicated_copies_cluster_together():
+    clusters = Clusters.from_frame(_df())
+    assert clusters.members(0).tolist() == [1, 3]   # same wire text, and row 3 shares row 0's URL
+    assert clusters.size(2) == 1 and clusters.members(2).tolist() == []
+    assert clusters.members(4).tolist() == [] and clusters.members(5).tolist() == []  # no URL is not a match
+    assert clusters.n_clusters == 1 and clusters.n_duplicates == 2
+
+
+def test_qualified_representative_fans_out(worked):
+    s, clusters = worked
+    s.qualify(3, "Vision", INCOMPLETE)       # a stale category on a copy is replaced
+    s.qualify(0, "M&A", COMPLETE, submit=True)
+    assert s.fan_out(0, clusters.members(0)) == 2
+    for m in (1, 3):
+        assert s.status.status(m) == QUALIFIED
+        assert s.categories(m) == ["M&A"] and s.get(m, "M&A") == s.get(0, "M&A")
+    assert s.status.status(2) == PENDING
+
+
+def test_partial_representative_fans_out_as_partial(worked):
+    s, clusters = worked
+    s.qualify(0, "M&A", INCOMPLETE, submit=True)
+    s.fan_out(0, clusters.members(0))
+    assert [s.status.status(m) for m in (0, 1, 3)] == [PARTIAL] * 3
+
+
+@pytest.mark.parametrize("code", [TBD, DELETED])
+def test_parked_or_deleted_representative_leaves_copies_pending(worked, code):
+    s, clusters = worked
+    s.qualify(1, "Vision", COMPLETE)         # work already saved on a copy is kept
+    s.move(0, code)
+    version = s.version
+    assert s.fan_out(0, clusters.members(0)) == 0
+    assert [s.status.status(m) for m in (1, 3)] == [PENDING, PENDING]
+    assert s.categories(1) == ["Vision"] and s.version == version
+    assert s.next_row(0) == 1
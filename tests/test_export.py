@@ -0,0 +1,113 @@
+import io
+
+import pandas as pd
+import pytest
+
+from map_engine import QUAL_FIELDS, QualificationSession, to_entry
+from map_engine.export import EXPORT_BUCKETS, export_buckets, to_xlsx
+
+COMPLETE = {"Dominance": "Primary", "Prominence": ["Headline", "Photo"], "Spokesperson": "CEO",
+            "Page": 3, "Tonality": "Positive", "Spokesperson Name with Designation": "A. Person, CEO"}
+INCOMPLETE = {"Dominance": None, "Prominence": ["Headline"], "Tonality": "Neutral", "Page": 0}
+
+
+def _df(n=12):
+    return pd.DataFrame({
+        "Headline": [f"Story {i}" for i in range(n)],
+        "Publication": ["Daily", "Weekly", None] * (n // 3),
+        "Date": pd.date_range("2024-01-01", periods=n),
+        "Reach": range(0, n * 1000, 1000),
+    })
+
+
+def _worked(df):
+    s = QualificationSession(df)
+    s.qualify(5, "Vision", COMPLETE)
+    s.qualify(5, "Innovation", COMPLETE, submit=True)
+    s.qualify(1, "M&A", INCOMPLETE, submit=True)
+    s.qualify(2, "M&A", INCOMPLETE)
+    s.qualify(2, "Vision", COMPLETE, submit=True)
+    s.qualify(7, "Vision", INCOMPLETE, submit=True)
+    s.qualify(7, "Vision", COMPLETE, submit=True)   # re-qualified: the first entry is retired
+    s.tbd(3)
+    s.delete(4)
+    s.tbd(9)
+    s.delete(9)
+    return s
+
+
+def _by_hand(s, bucket):
+    # The frame the app used to assemble: one dict per saved category, joined to the source row
+    rows = []
+    for r in s.bucket_rows(bucket) if bucket in ("to_be_decided", "deleted") else ():
+        rows.append(s.df.iloc[r].to_dict())
+    if bucket in ("qualified", "partial"):
+        for pos in s.log.positions(bucket):
+            r, c = int(s.log.row_id[pos]), s.log.fields["Category"][pos]
+            rows.append({**s.df.iloc[r].to_dict(), **{f: to_entry(s.get(r, c)).get(f) for f in QUAL_FIELDS}})
+    return pd.DataFrame(rows, columns=list(s.df.columns) + (QUAL_FIELDS if bucket in ("qualified", "partial") else []))
+
+
+def _sheets(data):
+    return pd.read_excel(io.BytesIO(data), sheet_name=None)
+
+
+@pytest.mark.parametrize("bucket", list(EXPORT_BUCKETS))
+def test_log_frame_matches_a_frame_built_row_by_row(bucket):
+    s = _worked(_df())
+    expected = _by_hand(s, bucket)
+    got = s.frames()[bucket]
+    assert len(got) == len(expected)
+    key = ["Headline", "Category"] if "Category" in got else ["Headline"]
+    pd.testing.assert_frame_equal(
+        got.sort_values(key).reset_index(drop=True).astype(object),
+        expected.sort_values(key).reset_index(drop=True).astype(object),
+    )
+
+
+@pytest.mark.parametrize("constant_memory", [False, True])
+def test_streamed_workbook_matches_pandas_to_excel(constant_memory):
+    s = _worked(_df())
+    frames = {EXPORT_BUCKETS[b]: f for b, f in s.frames().items()}
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="xlsxwriter") as wr:
+        for name, frame in frames.items():
+            frame.to_excel(wr, index=False, sheet_name=name)
+    old, new = _sheets(buf.getvalue()), _sheets(to_xlsx(frames, constant_memory=constant_memory))
+    assert list(new) == list(old) == ["Qualified", "Partial", "To Be Decided", "Deleted"]
+    for name in old:
+        pd.testing.assert_frame_equal(new[name], old[name])
+
+
+def test_every_change_bumps_the_version_the_export_is_cached_on():
+    s = _worked(_df())
+    cache = {"version": s.version, "sheets": _sheets(s.export("xlsx")[0])}
+    changes = [
+        lambda: s.qualify(0, "Vision", COMPLETE, submit=True),
+        lambda: s.qualify(0, "Vision", INCOMPLETE, submit=True),
+        lambda: s.unqualify(2, "M&A"),
+        lambda: s.tbd(5),
+        lambda: s.delete_rows([6, 8]),
+        lambda: s.move(3, 0),   # back to pending
+    ]
+    for change in changes:
+        change()
+        assert s.version != cache["version"]
+        sheets = _sheets(s.export("xlsx")[0])
+        assert any(not sheets[name].equals(cache["sheets"][name]) for name in sheets)  # a stale cache would be wrong
+        cache = {"version": s.version, "sheets": sheets}
+
+
+def test_reads_leave_the_version_alone():
+    s = _worked(_df())
+    v = s.version
+    s.frames()
+    s.export("csv")
+    s.unqualify(0, "Vision")     # nothing saved there
+    s.move(0, 0)                 # already pending
+    assert s.version == v
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        export_buckets({"qualified": _df()}, "xml")
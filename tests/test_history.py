@@ -0,0 +1,61 @@
+import pandas as pd
+
+from map_engine import DELETED, PARTIAL, PENDING, QUALIFIED, HistoryIndex, Journal, QualificationSession
+from map_engine.history import article_keys
+
+COMPLETE = {"Dominance": "Primary", "Prominence": ["Headline"], "Spokesperson": "CEO",
+            "Page": 1, "Tonality": "Positive", "Spokesperson Name with Designation": None}
+
+
+def _df(n=8):
+    return pd.DataFrame({"Headline": [f"Story {i}" for i in range(n)],
+                         "Text": [f"Body {i}" for i in range(n)],
+                         "URL": [f"https://news.example/{i}" for i in range(n)]})
+
+
+def _remembered(tmp_path, df):
+    history = HistoryIndex(str(tmp_path / "history.sqlite"))
+    s = QualificationSession(df)
+    s.qualify(0, "Vision", COMPLETE, submit=True)
+    s.qualify(1, "M&A", {**COMPLETE, "Tonality": None}, submit=True)
+    for row_id in (2, 3, 4):
+        s.delete(row_id)
+    history.remember(article_keys(df), s, range(5))
+    return history
+
+
+def test_apply_carries_earlier_results_over(tmp_path):
+    df = _df()
+    history = _remembered(tmp_path, df)
+    s = QualificationSession(df)
+    counts = history.apply(article_keys(df), s)
+    assert counts == {"qualified": 1, "deleted": 3, "prefilled": 1}
+    assert s.status.status(0) == QUALIFIED and s.categories(0) == ["Vision"]
+    assert s.status.status(1) == PENDING and s.row_code(1) == PARTIAL
+    assert [s.status.status(r) for r in (2, 3, 4)] == [DELETED] * 3
+    assert s.entries("deleted") == 3
+
+
+def test_apply_deletes_in_one_step_and_one_journal_batch(tmp_path, monkeypatch):
+    df = _df()
+    history = _remembered(tmp_path, df)
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    batches, record_many = [], journal.record_many
+
+    def spy(session_id, kind, row_ids, **kw):
+        batches.append((kind, list(row_ids), kw.get("codes")))
+        record_many(session_id, kind, row_ids, **kw)
+
+    monkeypatch.setattr(journal, "record_many", spy)
+    monkeypatch.setattr(journal, "record", lambda *a, **kw: batches.append(("single",)))
+    s = QualificationSession(df, journal=journal)
+    history.apply(article_keys(df), s)
+
+    assert ("move", [2, 3, 4], [DELETED] * 3) in batches
+    assert ("single",) not in batches
+    assert len(s.history.undo) == 1
+    step = s.undo()
+    assert step.label.startswith("Delete of 3 row(s)")
+    assert [s.status.status(r) for r in (2, 3, 4)] == [PENDING] * 3
+    assert s.entries("deleted") == 0
+    assert s.status.status(0) == QUALIFIED
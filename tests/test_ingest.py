@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+
+from map_engine import ingest
+from map_engine.export import to_xlsx
+from map_engine.ingest import (
+    SOURCE_FILE_COLUMN, SOURCE_SHEET_COLUMN, batch_digest, load_batch, parse_pool, read_batch, read_workbook,
+)
+
+
+def _sheet(tag, n, headline="Headline"):
+    return pd.DataFrame({
+        headline: [f"{tag} story {i}" for i in range(n)],
+        "Publication": ["Daily", "Weekly"] * (n // 2),
+        "Date": pd.date_range("2024-01-01", periods=n),
+        "Reach": [i * 10 for i in range(n)],
+    })
+
+
+def _files():
+    return [
+        ("b.xlsx", to_xlsx({"North": _sheet("bn", 40), "Empty": _sheet("x", 0), "South": _sheet("bs", 6)})),
+        ("a.xlsx", to_xlsx({"Only": _sheet("a", 10, headline=" headline ")})),  # spelt differently
+        ("c.xlsx", to_xlsx({"One": _sheet("c1", 4).assign(Extra="x"), "Two": _sheet("c2", 8)})),
+    ]
+
+
+def _sequential(files):
+    # One sheet at a time in this process, concatenated in file-name then sheet order;
+    # a.xlsx comes first, so its " headline " (stripped) names the column
+    frames = []
+    for name, data in sorted(files):
+        for sheet in ingest.sheet_names(data, name):
+            df = read_workbook(data, name, sheet)
+            if len(df):
+                df.columns = [c.strip().lower() if c.strip().lower() == "headline" else c for c in df.columns]
+                frames.append(df.assign(**{SOURCE_FILE_COLUMN: name, SOURCE_SHEET_COLUMN: sheet}))
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with parse_pool(2) as p:
+        yield p
+
+
+def test_spawn_pool_returns_the_sequential_frame(pool, monkeypatch):
+    files = _files()
+    pooled = read_batch(files, pool)
+    monkeypatch.setattr(ingest, "PARSE_WORKERS", 1)
+    pd.testing.assert_frame_equal(pooled, read_batch(files))
+    expected = _sequential(files)
+    pd.testing.assert_frame_equal(pooled, expected[[c for c in pooled.columns]])
+    assert pooled[SOURCE_SHEET_COLUMN].unique().tolist() == ["Only", "North", "South", "One", "Two"]
+    assert pooled["Extra"].notna().sum() == 4
+
+
+def test_temporary_pool_matches_a_shared_one(pool, monkeypatch):
+    files = _files()
+    monkeypatch.setattr(ingest, "PARSE_WORKERS", 2)
+    pd.testing.assert_frame_equal(read_batch(files), read_batch(files, pool))
+
+
+def test_batch_order_does_not_matter(pool):
+    files = _files()
+    pd.testing.assert_frame_equal(read_batch(files[::-1], pool), read_batch(files, pool))
+    assert batch_digest(files[::-1]) == batch_digest(files)
+
+
+def test_load_batch_caches_the_pooled_frame(pool, tmp_path):
+    files = _files()
+    digest = batch_digest(files)
+    first = load_batch(files, digest, cache_dir=str(tmp_path), pool=pool)
+    if ingest.pq is None:
+        pytest.skip("the Parquet cache needs pyarrow")
+    pd.testing.assert_frame_equal(load_batch(None, digest, cache_dir=str(tmp_path)), first)
+
+
+def test_single_sheet_batches_stay_in_process(monkeypatch):
+    monkeypatch.setattr(ingest, "parse_pool", lambda *a: pytest.fail("started a pool for one sheet"))
+    monkeypatch.setattr(ingest, "PARSE_WORKERS", 4)
+    df = read_batch([("a.xlsx", to_xlsx({"Only": _sheet("a", 4)}))])
+    assert len(df) == 4 and df[SOURCE_FILE_COLUMN].eq("a.xlsx").all()
+
+
+def test_mixed_cells_are_only_stringified_in_the_cache(tmp_path):
+    if ingest.pq is None:
+        pytest.skip("the Parquet cache needs pyarrow")
+    df = pd.DataFrame({"Headline": [f"Story {i}" for i in range(4)], "Page": [1, "A3", None, 12]})
+    data = to_xlsx({"Sheet1": df})
+    parsed = ingest.load_upload(data, "mixed.xlsx", cache_dir=str(tmp_path))
+    assert parsed["Page"].tolist()[:2] == [1, "A3"] and parsed["Page"].iloc[3] == 12
+    assert ingest.is_cached(ingest.file_digest(data), str(tmp_path))
+
+    cached = ingest.load_upload(None, digest=ingest.file_digest(data), cache_dir=str(tmp_path))
+    assert cached["Page"].tolist()[:2] == ["1", "A3"]  # Arrow needs one type per column
+    pd.testing.assert_series_equal(cached["Headline"], parsed["Headline"])
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from map_engine import DELETED, PENDING, TBD, Journal, QualificationSession, replay
+from map_engine.reimport import import_export, read_export
+
+COMPLETE = {"Dominance": "Primary", "Prominence": ["Headline", "Photo"], "Spokesperson": "CEO",
+            "Page": 2, "Tonality": "Positive", "Spokesperson Name with Designation": "A. Person, CEO"}
+INCOMPLETE = {"Dominance": None, "Prominence": ["Headline"], "Tonality": "Neutral", "Page": 0}
+
+
+def _df(n=40):
+    return pd.DataFrame({"Headline": [f"Story {i}" for i in range(n)],
+                         "Text": [f"Body {i}" for i in range(n)],
+                         "URL": [f"https://news.example/{i}" for i in range(n)],
+                         "Publication": ["Daily", "Weekly", "Monthly", "Daily"] * (n // 4)})
+
+
+def _states(s):
+    return [s.row_state(r) for r in range(len(s))]
+
+
+def _entries(s, bucket):
+    frame = s.frames((bucket,))[bucket]
+    keys = ["Headline", "Category"] if "Category" in frame.columns else ["Headline"]
+    return frame.sort_values(keys, ignore_index=True)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return Journal(str(tmp_path / "journal.sqlite"))
+
+
+def _work(s):
+    s.qualify(0, "Innovation", COMPLETE)
+    s.qualify(0, "Vision", INCOMPLETE, submit=True)
+    s.qualify(0, "Vision", COMPLETE, submit=True)       # re-qualified: partial -> qualified
+    s.qualify(1, "M&A", INCOMPLETE, submit=True)
+    s.unqualify(1, "M&A")
+    s.qualify(1, "Vision", COMPLETE, submit=True)
+    s.tbd(2)
+    s.delete(3)
+    s.tbd(3)                                            # moved between marks
+    s.qualify(4, "Vision", COMPLETE)                    # saved, never submitted
+    s.qualify_rows(np.arange(10, 20), "Leadership", COMPLETE, submit=True)
+    s.qualify_rows(np.arange(15, 25), "M&A", INCOMPLETE, submit=True)
+    s.move_rows(np.arange(25, 30), DELETED)
+    s.move_rows([25, 26], TBD)
+    with s.step("Edit of row 1"):
+        s.qualify(1, "Vision", {**COMPLETE, "Tonality": "Negative"}, submit=True)
+    s.undo()
+    s.redo()
+    with s.step("Delete on row 5"):
+        s.delete(5)
+    s.undo()
+
+
+def test_replay_rebuilds_the_session(journal):
+    df = _df()
+    s = QualificationSession(df, journal=journal)
+    _work(s)
+
+    resumed = QualificationSession.resume(df, s.digest, s.file_name, s.session_id, journal)
+    assert _states(resumed) == _states(s)
+    np.testing.assert_array_equal(resumed.status.codes, s.status.codes)
+    assert resumed.log.counts == s.log.counts
+    for b in ("qualified", "partial", "to_be_decided", "deleted"):
+        pd.testing.assert_frame_equal(_entries(resumed, b), _entries(s, b))
+    pd.testing.assert_frame_equal(resumed.tallies.by_category().sort_index(), s.tallies.by_category().sort_index())
+
+
+def test_replay_of_an_import_and_later_edits(journal):
+    df = _df()
+    source = QualificationSession(df)
+    _work(source)
+    data, name, _ = source.export("csv")
+
+    s = QualificationSession(df, journal=journal)
+    s.qualify(2, "Vision", COMPLETE)                    # half-saved before the import
+    import_export(s, read_export(data, name))
+    s.unqualify(0, "Innovation")
+    s.submit(0)
+    s.tbd(30)
+
+    resumed = QualificationSession.resume(df, s.digest, s.file_name, s.session_id, journal)
+    assert _states(resumed) == _states(s)
+    assert resumed.log.counts == s.log.counts
+
+
+def test_last_event_wins(journal):
+    df = _df(8)
+    s = QualificationSession(df, journal=journal)
+    s.qualify(0, "Vision", COMPLETE, submit=True)
+    s.qualify(0, "Vision", {**COMPLETE, "Tonality": "Negative"}, submit=True)
+    s.delete(1)
+    s.move(1, PENDING)
+    status, log, store = replay(journal.events(s.session_id), len(df))
+    assert store.get(0, "Vision")["Tonality"] == "Negative"
+    assert status.status(1) == PENDING
+    assert log.counts == s.log.counts
@@ -0,0 +1,116 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from map_engine import OptionsBank
+
+DEFAULTS = {
+    "Dominance": ["Primary", "Secondary"],
+    "Tonality": ["Positive", "Negative", "Neutral"],
+    "Category": ["Vision", "M&A"],
+    "SavedUserCategories": [],
+}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A separate server process adding its own categories to the same file
+ADD_FROM_PROCESS = """
+import sys
+from map_engine import OptionsBank
+bank = OptionsBank(sys.argv[1], {"Category": [], "SavedUserCategories": []})
+for k in range(int(sys.argv[3])):
+    bank.add_custom(f"{sys.argv[2]}-{k}")
+"""
+
+
+@pytest.fixture
+def path(tmp_path):
+    p = str(tmp_path / "qual_options.json")
+    with open(p, "w", encoding="utf-8") as f:
+        json.dump(DEFAULTS, f)
+    return p
+
+
+def _write(path, bank):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(bank, f)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))  # coarse clocks: make sure the stamp moves
+
+
+def test_concurrent_adds_from_threads_are_all_kept(path):
+    bank = OptionsBank(path, DEFAULTS)
+    start = threading.Barrier(8)
+
+    def add(k):
+        start.wait()
+        for j in range(10):
+            bank.add_custom(f"t{k}-{j}")
+
+    threads = [threading.Thread(target=add, args=(k,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    expected = {f"t{k}-{j}" for k in range(8) for j in range(10)}
+    with open(path, encoding="utf-8") as f:
+        assert set(json.load(f)["SavedUserCategories"]) == expected
+    assert set(bank.get()["SavedUserCategories"]) == expected
+
+
+def test_concurrent_adds_from_processes_are_merged(path):
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    procs = [subprocess.Popen([sys.executable, "-c", ADD_FROM_PROCESS, path, f"p{k}", "15"], env=env)
+             for k in range(4)]
+    bank = OptionsBank(path, DEFAULTS)
+    for j in range(15):
+        bank.add_custom(f"here-{j}")
+    assert [p.wait(timeout=60) for p in procs] == [0] * 4
+
+    expected = {f"p{k}-{j}" for k in range(4) for j in range(15)} | {f"here-{j}" for j in range(15)}
+    assert set(bank.get()["SavedUserCategories"]) == expected
+    with open(path, encoding="utf-8") as f:
+        on_disk = json.load(f)
+    assert len(on_disk["SavedUserCategories"]) == len(expected)  # merged, never duplicated
+    assert on_disk["Dominance"] == DEFAULTS["Dominance"]  # the rest of the file survives
+    assert not [n for n in os.listdir(os.path.dirname(path)) if n.endswith(".tmp")]
+
+
+def test_get_serves_from_memory_until_the_file_changes(path, monkeypatch):
+    bank = OptionsBank(path, DEFAULTS)
+    first = bank.get()
+    monkeypatch.setattr(bank, "_load", lambda stamp: pytest.fail("re-read an unchanged file"))
+    assert bank.get() is first
+    monkeypatch.undo()
+
+    _write(path, {**DEFAULTS, "Tonality": ["Mixed"], "SavedUserCategories": ["From elsewhere"]})
+    fresh = bank.get()
+    assert fresh is not first
+    assert fresh["Tonality"] == ["Mixed"] and fresh["SavedUserCategories"] == ["From elsewhere"]
+    assert bank.add_custom("Mine") == ["From elsewhere", "Mine"]
+
+
+def test_categories_and_malformed_keys_come_from_the_defaults(path):
+    _write(path, {"Category": ["Hacked"], "Dominance": "not a list", "Extra": [1]})
+    bank = OptionsBank(path, DEFAULTS).get()
+    assert bank["Category"] == DEFAULTS["Category"] and bank["Dominance"] == DEFAULTS["Dominance"]
+    assert bank["Extra"] == [1] and bank["SavedUserCategories"] == []
+
+
+def test_corrupt_file_falls_back_and_reports(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    bank = OptionsBank(path, DEFAULTS)
+    assert bank.get() == DEFAULTS and bank.error
+    assert bank.add_custom("Recovered") == ["Recovered"]  # rewritten from memory
+    assert bank.error is None and bank.get()["SavedUserCategories"] == ["Recovered"]
+
+
+def test_first_run_writes_the_defaults_once(tmp_path):
+    path, flag = str(tmp_path / "qual_options.json"), str(tmp_path / "first_run_flag.txt")
+    bank = OptionsBank(path, DEFAULTS, flag)
+    assert bank.get() == DEFAULTS and os.path.exists(flag)
+    bank.add_custom("Kept")
+    assert OptionsBank(path, DEFAULTS, flag).get()["SavedUserCategories"] == ["Kept"]
@@ -0,0 +1,121 @@
+import http.server
+import socket
+import threading
+
+import pytest
+
+from map_engine import prefetch
+from map_engine.prefetch import ContentCache, Prefetcher, fetch
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    redirect_to = None
+
+    def do_GET(self):
+        if self.path.startswith("/redirect"):
+            self.send_response(302)
+            self.send_header("Location", self.server.redirect_to)
+            self.end_headers()
+            return
+        body = (f"<html><head><title>Story {self.path}</title><script>x = 1</script></head>"
+                f"<body><nav>menu</nav><p>Acme &amp; co said hello.</p></body></html>").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.redirect_to = None
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def url(srv, path="/a"):
+    return f"http://127.0.0.1:{srv.server_address[1]}{path}"
+
+
+def test_loopback_is_refused_by_default(server):
+    page = fetch(url(server))
+    assert not page.ok and page.error.startswith("not a public address")
+
+
+def test_local_fetch_is_opt_in(server):
+    page = fetch(url(server), allow_private=True)
+    assert page.ok
+    assert page.title == "Story /a"
+    assert page.text == "Acme & co said hello."
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "10.1.2.3", "192.168.0.1", "169.254.169.254",
+                                     "100.64.0.1", "0.0.0.0", "::1", "fe80::1", "fd00::1", "::ffff:127.0.0.1"])
+def test_non_public_addresses_are_refused(monkeypatch, address):
+    family = socket.AF_INET6 if ":" in address else socket.AF_INET
+    monkeypatch.setattr(socket, "getaddrinfo",
+                        lambda host, port, **kw: [(family, socket.SOCK_STREAM, 6, "", (address, port))])
+    with pytest.raises(prefetch.NotPublic):
+        prefetch._public_address("metadata.example", 80)
+
+
+def test_a_name_mixing_public_and_private_addresses_is_refused(monkeypatch):
+    monkeypatch.setattr(socket, "getaddrinfo", lambda host, port, **kw: [
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", port)),
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("169.254.169.254", port)),
+    ])
+    with pytest.raises(prefetch.NotPublic):
+        prefetch._public_address("rebind.example", 80)
+
+
+def test_redirect_into_a_private_address_is_refused(monkeypatch, server):
+    # Treat the first server as public; its redirect points at a second local port
+    inner = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=inner.serve_forever, daemon=True).start()
+    public_port = server.server_address[1]
+    check = prefetch._public_address
+
+    def public_address(host, port):
+        if port == public_port:
+            return socket.AF_INET, ("127.0.0.1", port)
+        return check(host, port)
+
+    monkeypatch.setattr(prefetch, "_public_address", public_address)
+    try:
+        server.redirect_to = url(inner, "/secret")
+        assert fetch(url(server, "/plain")).ok
+        page = fetch(url(server, "/redirect"))
+        assert not page.ok and page.error.startswith("not a public address")
+    finally:
+        inner.shutdown()
+        inner.server_close()
+
+
+def test_redirect_to_another_scheme_is_refused(server):
+    server.redirect_to = "file:///etc/passwd"
+    page = fetch(url(server, "/redirect"), allow_private=True)
+    assert not page.ok and page.error.startswith("HTTP")
+
+
+def test_prefetcher_caches_refusals_without_going_offline(tmp_path, server):
+    pf = Prefetcher(ContentCache(str(tmp_path / "pages.sqlite")), workers=1)
+    for k in range(prefetch.OFFLINE_AFTER):
+        page = pf.get(url(server, f"/p{k}"), wait=5)
+        assert page is not None and page.error.startswith("not a public address")
+    assert not pf.offline
+    assert pf.cache.get(url(server, "/p0")).error.startswith("not a public address")
+
+
+def test_prefetcher_fetches_ahead_into_the_cache(tmp_path, server):
+    pf = Prefetcher(ContentCache(str(tmp_path / "pages.sqlite")), workers=2, enabled=True, allow_private=True)
+    urls = [url(server, f"/r{k}") for k in range(4)]
+    assert pf.prefetch(urls) == 4
+    pages = [pf.get(u, wait=5) for u in urls]
+    assert [p.title for p in pages] == [f"Story /r{k}" for k in range(4)]
+    assert pf.cache.cached(urls) == set(urls)
+    assert pf.prefetch(urls) == 0  # all cached now
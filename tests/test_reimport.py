@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+from map_engine import EXPORT_FORMATS, PARTIAL, PENDING, QUALIFIED, Journal, QualificationSession, TBD
+from map_engine.export import pq
+from map_engine.reimport import import_export, read_export
+
+COMPLETE = {"Dominance": "Primary", "Prominence": ["Headline", "Photo"], "Spokesperson": "CEO",
+            "Page": 3, "Tonality": "Positive", "Spokesperson Name with Designation": "A. Person, CEO"}
+INCOMPLETE = {"Dominance": None, "Prominence": ["Headline"], "Tonality": "Neutral", "Page": 0}
+FORMATS = [f for f in EXPORT_FORMATS if pq is not None or f not in ("parquet", "jsonl")]
+
+
+def _df(n=10):
+    return pd.DataFrame({
+        "Headline": [f"Story {i}" for i in range(n)],
+        "Text": [f"Body of story {i}." for i in range(n)],
+        "URL": [f"https://news.example/{i}?utm_source=feed" for i in range(n)],
+        "Publication": ["Daily", "Weekly"] * (n // 2),
+    })
+
+
+def _worked(df):
+    s = QualificationSession(df)
+    s.qualify(0, "Innovation", COMPLETE)
+    s.qualify(0, "Vision", COMPLETE, submit=True)        # qualified, two categories
+    s.qualify(1, "M&A", INCOMPLETE, submit=True)         # partial
+    s.qualify(2, "M&A", INCOMPLETE)
+    s.qualify(2, "Vision", COMPLETE, submit=True)        # mixed: one sheet each
+    s.tbd(3)
+    s.delete(4)
+    return s
+
+
+def _states(s):
+    # An export keeps no order across sheets, so a row's categories are compared as a set
+    return [(s.status.status(r), {c: s.get(r, c) for c in s.categories(r)}) for r in range(len(s))]
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_export_reimport_round_trip(fmt):
+    df = _df()
+    s = _worked(df)
+    data, name, _ = s.export(fmt)
+
+    s2 = QualificationSession(df)
+    counts = import_export(s2, read_export(data, name))
+    assert _states(s2) == _states(s)
+    assert counts["matched"] == 5 and counts["unmatched"] == 0
+    assert (counts["qualified"], counts["partial"], counts["to_be_decided"], counts["deleted"]) == (1, 2, 1, 1)
+    for b, frame in s.frames().items():
+        pd.testing.assert_frame_equal(s2.frames()[b], frame)
+
+
+def test_mixed_row_keeps_categories_from_both_sheets():
+    df = _df()
+    data, name, _ = _worked(df).export("xlsx")
+    frames = read_export(data, name)
+    assert frames["qualified"]["Headline"].eq("Story 2").sum() == 1
+    assert frames["partial"]["Headline"].eq("Story 2").sum() == 1
+
+    s2 = QualificationSession(df)
+    import_export(s2, frames)
+    assert s2.status.status(2) == PARTIAL
+    assert sorted(s2.categories(2)) == ["M&A", "Vision"]
+    assert s2.get(2, "Vision")["Tonality"] == "Positive"
+
+
+def test_reimport_leaves_filed_rows_alone():
+    df = _df()
+    data, name, _ = _worked(df).export("csv")
+    s2 = QualificationSession(df)
+    s2.tbd(0)
+    s2.qualify(1, "Vision", COMPLETE, submit=True)
+    counts = import_export(s2, read_export(data, name))
+    assert counts["already_filed"] == 2
+    assert s2.status.status(0) == TBD
+    assert s2.status.status(1) == QUALIFIED and s2.categories(1) == ["Vision"]
+    assert s2.status.status(2) == PARTIAL
+    assert s2.status.status(5) == PENDING
+
+
+def test_reimport_restarts_half_saved_rows_and_journals_it(tmp_path):
+    df = _df()
+    data, name, _ = _worked(df).export("csv")
+    journal = Journal(str(tmp_path / "journal.sqlite"))
+    s2 = QualificationSession(df, journal=journal)
+    s2.qualify(0, "Leadership", COMPLETE)   # saved but never submitted: still pending
+    s2.qualify(2, "Vision", INCOMPLETE)
+    import_export(s2, read_export(data, name))
+    assert sorted(s2.categories(0)) == ["Innovation", "Vision"]
+    assert s2.get(2, "Vision")["Tonality"] == "Positive"
+    assert s2.entries("qualified") + s2.entries("partial") == 5
+
+    replayed = QualificationSession.from_events(df, journal.events(s2.session_id))
+    assert _states(replayed) == _states(s2)
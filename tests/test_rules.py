@@ -0,0 +1,148 @@
+import json
+import os
+import re
+
+import pandas as pd
+import pytest
+
+from map_engine import DEFAULT_RULES, RuleBank
+from map_engine import rules as rules_module
+
+RULES = {
+    "Category": {
+        "M&A": [r"\bacqui(re|res|red|sition)\w*", r"\bmerger\w*"],
+        "Vision": [r"\broadmap\b"],
+        "Lookahead": [r"\bdeal(?! off)\b"],  # Python-only syntax: evaluated with re
+    },
+    "Tonality": {"Positive": [r"\brecord\b"], "Negative": [r"\bprobe\b"]},
+    "Spokesperson": {"Interview": [r"\binterview\w*"], "Quote": [r"\bsaid\b"]},
+}
+HEADLINES = [
+    "Acme acquires Widget Co",                # 0: M&A
+    "Merger talks; roadmap unveiled",         # 1: M&A and Vision
+    "Record quarter draws a regulator probe",  # 2: mixed tonality
+    "Quiet day at the office",                # 3: nothing
+    "Deal struck after interview, CEO said",  # 4: Lookahead, interview before said
+    "Deal off",                               # 5: excluded by the lookahead
+    "ACQUISITION news",                       # 6: case-insensitive
+    None,                                     # 7: missing headline, text still counts
+]
+TEXTS = [None, "", "", "Not an acquirer's story? 'acquirer' matches too", "", "", "", "Record year"]
+
+
+def _bank(tmp_path, rules=RULES):
+    path = str(tmp_path / "qual_rules.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rules, f)
+    return RuleBank(path, {})
+
+
+def _df():
+    return pd.DataFrame({"Headline": HEADLINES, "Text": TEXTS, "URL": [f"u{i}" for i in range(len(HEADLINES))]})
+
+
+def _naive(rules, df):
+    # What each label should flag: any of its patterns, searched with re in Headline + Text
+    texts = [" ".join("" if v is None else str(v) for v in pair) for pair in zip(df["Headline"], df["Text"])]
+    return {field: {label: [any(re.search(p, t, re.I) for p in ps) for t in texts] for label, ps in labels.items()}
+            for field, labels in rules.items()}
+
+
+@pytest.mark.parametrize("arrow", [True, False])
+def test_flagged_rows_match_a_pattern_by_pattern_scan(tmp_path, monkeypatch, arrow):
+    if not arrow:
+        monkeypatch.setattr(rules_module, "pa", None)
+    elif rules_module.pa is None:
+        pytest.skip("pyarrow is not installed")
+    s = _bank(tmp_path).suggest(_df())
+    got = {field: {label: mask.tolist() for label, mask in labels.items()} for field, labels in s.masks.items()}
+    assert got == _naive(RULES, _df())
+
+
+def test_suggestions_per_row(tmp_path):
+    s = _bank(tmp_path).suggest(_df())
+    assert [s.categories(r) for r in range(8)] == [
+        ["M&A"], ["M&A", "Vision"], [], ["M&A"], ["Lookahead"], [], ["M&A"], [],
+    ]
+    assert [s.tonality(r) for r in (0, 2, 7)] == [None, None, "Positive"]  # mixed signals: no suggestion
+    assert s.spokesperson(4) == "Interview" and s.spokesperson(0) is None  # first label in rule order
+    assert s.counts("Category") == {"M&A": 4, "Vision": 1, "Lookahead": 1}
+
+
+def test_text_columns_limit_what_is_searched(tmp_path):
+    s = _bank(tmp_path).suggest(_df(), text_columns=("Text",))
+    assert s.categories(0) == [] and s.categories(3) == ["M&A"]
+    assert _bank(tmp_path).suggest(_df()[["URL"]]).counts("Category") == {"M&A": 0, "Vision": 0, "Lookahead": 0}
+
+
+def test_invalid_patterns_are_skipped_and_listed(tmp_path):
+    bank = _bank(tmp_path, {"Category": {"Broken": ["(unclosed", r"\bfine\b"], "Gone": ["["]}})
+    s = bank.suggest(pd.DataFrame({"Headline": ["a fine day", "(unclosed"]}))
+    assert s.counts("Category") == {"Broken": 1}
+    assert bank.invalid == ["Category / Broken: '(unclosed'", "Category / Gone: '['"]
+
+
+def test_edited_file_is_picked_up(tmp_path):
+    bank = _bank(tmp_path)
+    before = bank.suggest(_df())
+    with open(bank.path, "w", encoding="utf-8") as f:
+        json.dump({"Category": {"Quiet": [r"\bquiet\b"]}}, f)
+    os.utime(bank.path, ns=(0, os.stat(bank.path).st_mtime_ns + 10**9))
+    after = bank.suggest(_df())
+    assert before.counts("Category")["M&A"] == 4
+    assert after.counts("Category") == {"Quiet": 1} and after.counts("Tonality") == {}
+
+
+def test_missing_file_is_created_from_the_defaults(tmp_path):
+    path = str(tmp_path / "qual_rules.json")
+    bank = RuleBank(path, {"Category": {"Vision": [r"\broadmap\b"]}})
+    assert bank.suggest(_df()).categories(1) == ["Vision"]
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"Category": {"Vision": [r"\broadmap\b"]}}
+
+
+# Everyday business coverage: most of it should draw no suggestion at all
+SAMPLE = [
+    ("Acme acquires Widget Co for $2bn", "The deal gives Acme a controlling stake, the company said.", "M&A"),
+    ("Northwind appoints new CEO", "The board named Jane Doe chief executive, effective May.", "Leadership"),
+    ("Contoso unveils its first electric van", "The new model goes on sale next year.", "Products & Services"),
+    ("Fabrikam revenue rose 12% in the third quarter", "Growth came from exports, said analysts.", "Business Growth"),
+    ("Tailspin lays out five-year plan", "The strategic plan targets new markets.", "Vision"),
+    ("Litware wins award for customer service", "Customers rated it highest in the region.", "Customer relation"),
+    ("Globex announces layoffs at two plants", "Employees were told on Friday.", "Work Environment"),
+    ("Initech files 40 patents on battery design", "Its R&D budget doubled.", "Innovation"),
+    ("Shares slip as markets wait on rate decision", "Investors said growth worries weighed on stocks.", None),
+    ("Acme sponsors city marathon", "Thousands of runners and customers took part, organisers said.", None),
+    ("Retailers brace for holiday season", "Customers are expected to spend cautiously, analysts say.", None),
+    ("Bank keeps rates on hold", "The central bank said growth remains modest.", None),
+    ("Airline adds routes to the coast", "The carrier said demand from customers was strong.", None),
+    ("CEO speaks at industry conference", "The chief executive said the strategy is working.", None),
+    ("Factory reopens after storm", "Employees returned to work on Monday.", None),
+    ("Startup raises seed round", "Its founder said clients include several banks.", None),
+    ("Telecom regulator opens consultation", "Consumers can respond until June.", None),
+    ("Quarterly dividend unchanged", "The company said its strategy had not changed.", None),
+    ("Energy prices fall for third week", "Households and businesses will see lower bills.", None),
+    ("Port traffic steady in March", "Officials said volumes were in line with last year.", None),
+    ("Tech firm opens office in Lisbon", "The company said it would hire locally over time.", None),
+    ("Grocer extends opening hours", "Customers asked for later shopping, the chain said.", None),
+    ("Carmaker recalls 10,000 vehicles", "A spokesperson said no injuries were reported.", None),
+    ("Insurer settles with regulator", "The firm said growth in claims slowed.", None),
+    ("Brewer changes bottle design", "Consumers will see the new label next month.", None),
+    ("Hotel group reports steady occupancy", "Its long-term outlook is unchanged, it said.", None),
+    ("Software maker updates privacy policy", "Clients were notified by email.", None),
+    ("Logistics firm moves headquarters", "Staff will relocate over the summer, the CEO said.", None),
+    ("Mining company resumes operations", "Output is expected to recover, the company said.", None),
+    ("Cinema chain reopens screens", "Audiences returned in numbers, managers said.", None),
+]
+
+
+def test_default_rules_flag_only_what_they_name(tmp_path):
+    df = pd.DataFrame({"Headline": [h for h, _, _ in SAMPLE], "Text": [t for _, t, _ in SAMPLE]})
+    s = RuleBank(str(tmp_path / "qual_rules.json"), DEFAULT_RULES).suggest(df)
+    for r, (_, _, label) in enumerate(SAMPLE):
+        if label:
+            assert label in s.categories(r), SAMPLE[r]
+    flagged = sum(bool(s.categories(r)) for r in range(len(df)))
+    assert flagged / len(df) <= 0.4  # the eight labelled stories plus at most a few strays
+    assert max(s.counts("Category").values()) / len(df) <= 0.1
+    assert s.counts("Spokesperson")["Quote"] / len(df) <= 0.2  # "said" alone is in nearly every story
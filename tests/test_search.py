@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from map_engine import SearchIndex
+from map_engine.ingest import compact_frame
+from map_engine.search import MIN_PREFIX, query_terms
+
+WORDS = ["acquisition", "acquires", "acme", "a", "ab", "Café", "cafe", "roadmap", "road", "Q&A", "e-mail",
+         "snake_case", "2024", "20", "ÉCLAIR", "co.", "x"]
+
+
+def _naive(df, query, columns=("Headline", "Text", "Publication")):
+    # The scan the index replaces: split every row's text and test each term against each word
+    terms = set(query_terms(query))
+    hits = []
+    for r in range(len(df)):
+        text = " ".join("" if pd.isna(df[c].iloc[r]) else str(df[c].iloc[r]) for c in columns if c in df.columns)
+        words = query_terms(text)
+        if terms and all(any(w.startswith(t) if len(t) >= MIN_PREFIX else w == t for w in words) for t in terms):
+            hits.append(r)
+    return hits
+
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+
+    def text():
+        return None if rng.random() < 0.1 else " ".join(rng.choice(WORDS, rng.integers(0, 6)))
+
+    return pd.DataFrame({
+        "Headline": [text() for _ in range(n)],
+        "Text": [text() for _ in range(n)],
+        "Publication": rng.choice(["Daily Post", "The Weekly", None], n),
+        "URL": [f"https://news.example/acme/{i}" for i in range(n)],  # not searched
+    })
+
+
+QUERIES = ["acq", "acquisition road", "a", "ab", "Caf", "café", "q&a", "e mail", "snake", "snake_case", "20",
+           "éclair", "weekly acme", "post", "co", "x", "acme acme", "", "   ", "zzz", "url", "news"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_agrees_with_a_substring_scan(seed):
+    df = _frame(300, seed)
+    index = SearchIndex.from_frame(df)
+    for q in QUERIES:
+        assert index.search(q).tolist() == _naive(df, q), q
+
+
+def test_categorical_columns_are_indexed_like_any_other():
+    df = _frame(200, 7)
+    compact = compact_frame(df)
+    index = SearchIndex.from_frame(compact)
+    for q in QUERIES:
+        assert index.search(q).tolist() == _naive(df, q), q
+
+
+def test_prefix_and_short_terms():
+    df = pd.DataFrame({"Headline": ["Acme acquires rival", "AB testing at a glance", "abc"]})
+    index = SearchIndex.from_frame(df)
+    assert index.search("acq").tolist() == [0]
+    assert index.search("ab").tolist() == [1, 2]        # prefix from MIN_PREFIX letters
+    assert index.search("a").tolist() == [1]            # shorter terms only match whole words
+    assert index.search("acme rival").tolist() == [0]   # terms are ANDed
+    assert index.search("acme glance").tolist() == []
+
+
+def test_empty_inputs():
+    assert SearchIndex.from_frame(pd.DataFrame({"Headline": []})).search("x").tolist() == []
+    index = SearchIndex.from_frame(pd.DataFrame({"URL": ["a"]}))  # nothing searchable
+    assert len(index) == 0 and index.search("a").tolist() == []
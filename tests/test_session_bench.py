@@ -0,0 +1,16 @@
+import json
+
+import pytest
+
+from benchmarks import session_bench
+
+
+@pytest.mark.parametrize("driver", ["headless", "apptest"])
+def test_driver_runs_on_a_small_export(driver, tmp_path):
+    out = tmp_path / "run.json"
+    assert session_bench.main(["--rows", "200", "--driver", driver, "--actions", "12", "--json", str(out)]) == 0
+    [result] = json.loads(out.read_text())
+    assert result["rows"] == 200 and result["driver"] == driver
+    worked = sum(result["latency_ms"].get(a, {"n": 0})["n"] for a in session_bench.MIX)
+    assert worked == 12
+    assert {f"export_{fmt}" for fmt in ("xlsx", "csv", "jsonl")} <= set(result["latency_ms"])
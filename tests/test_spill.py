@@ -0,0 +1,126 @@
+import gc
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from map_engine.ingest import compact_frame
+from map_engine.spill import SessionStore
+
+
+def _store(tmp_path, **kwargs):
+    return SessionStore(spill_dir=str(tmp_path), budget_mib=0, idle_seconds=0, grace_seconds=0, **kwargs)
+
+
+def _frame(n=12):
+    df = pd.DataFrame({
+        "Headline": [f"Story {i}" for i in range(n)],
+        "Publication": ["Daily", "Weekly", None] * (n // 3),
+        "Date": pd.date_range("2024-01-01", periods=n),
+        "Reach": np.arange(n) * 1000,
+        "Score": np.linspace(0, 1, n),
+        "Mixed": [1, "two", None, 3.5] * (n // 4),
+        "Page": pd.array([1, None] * (n // 2), dtype="Int64"),
+    })
+    return compact_frame(df)
+
+
+def test_spill_round_trip_keeps_mixed_columns(tmp_path):
+    store = _store(tmp_path)
+    df = _frame()
+    assert df["Mixed"].dtype == object
+    store.put("s", df_work=df, note="kept")
+    assert store.sweep(force=True) == ["s"]
+    assert store.stats()["spilled"] == 1
+
+    back = store.get("s")
+    assert store.reloads == 1
+    pd.testing.assert_frame_equal(back["df_work"], df)
+    assert back["df_work"]["Mixed"].tolist() == [1, "two", None, 3.5] * 3
+    assert back["note"] == "kept"
+
+
+def test_spill_shares_a_frame_referenced_twice(tmp_path):
+    store = _store(tmp_path)
+    df = _frame()
+    store.put("s", df_work=df, views={"all": df})
+    store.sweep(force=True)
+    back = store.get("s")
+    assert back["views"]["all"] is back["df_work"]
+    pd.testing.assert_frame_equal(back["df_work"], df)
+
+
+def test_spill_pickles_frames_parquet_cannot_hold(tmp_path):
+    store = _store(tmp_path)
+    df = pd.DataFrame({0: [1, 2], 1: ["a", 3]})  # non-string column names
+    store.put("s", df=df)
+    store.sweep(force=True)
+    pd.testing.assert_frame_equal(store.get("s")["df"], df)
+
+
+def test_shared_objects_are_rebound(tmp_path):
+    journal = object()
+    store = _store(tmp_path, shared={"journal": journal})
+    store.put("s", journal=journal, df=_frame())
+    store.sweep(force=True)
+    assert store.get("s")["journal"] is journal
+
+
+def test_shared_upload_frame_is_neither_sized_nor_written(tmp_path):
+    cached = _frame(480)
+    store = _store(tmp_path, loader=lambda name: pytest.fail(f"{name} is still cached"))
+    store.share(("upload", "digest", "news.xlsx"), cached)
+    store.put("s", df_work=cached, views={"all": cached})
+    store.sweep(force=True)
+    assert store.stats()["live"] == 0
+    assert not [n for n in os.listdir(tmp_path / "s") if n.endswith(".parquet")]
+
+    back = store.get("s")
+    assert back["df_work"] is cached and back["views"]["all"] is cached
+
+
+def test_shared_frame_counts_nothing_against_the_budget(tmp_path):
+    cached = _frame(4800)
+    store = SessionStore(spill_dir=str(tmp_path), budget_mib=0.05, idle_seconds=3600, grace_seconds=0)
+    store.share(("upload", "digest", "news.xlsx"), cached)
+    store.put("s", df_work=cached)
+    assert store.sweep(force=True) == []
+    assert store.stats()["live_mib"] < 0.05
+
+
+def test_dropped_shared_frame_is_reloaded_by_name(tmp_path):
+    loaded = []
+
+    def loader(name):
+        loaded.append(name)
+        return _frame()
+
+    store = _store(tmp_path, loader=loader)
+    name = ("upload", "digest", "news.xlsx")
+    cached = _frame()
+    store.share(name, cached)
+    store.put("s", df_work=cached)
+    store.sweep(force=True)
+    del cached  # the cache let go of it while the tab was spilled
+    gc.collect()
+    back = store.get("s")
+    assert loaded == [name]
+    pd.testing.assert_frame_equal(back["df_work"], _frame())
+
+
+def test_active_covers_live_and_spilled_entries(tmp_path):
+    store = _store(tmp_path)
+    store.put("s", df=_frame())
+    assert store.active("s")
+    store.sweep(force=True)
+    assert store.active("s") and "s" in store
+    store.get("s")
+    assert store.active("s")
+    store.discard("s")
+    assert not store.active("s")
+
+    orphan = _store(tmp_path)  # a restarted process finds the spill dir, but no tab holds it
+    store.put("t", df=_frame())
+    store.sweep(force=True)
+    assert "t" in orphan and not orphan.active("t")
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from map_engine.status import DELETED, PENDING, QUALIFIED, TBD, UNASSIGNED, RowStatus
+
+
+def _walk(rs):
+    # The pending list as linked, checked against its back links
+    out, slot = [], rs.n
+    while True:
+        nxt = int(rs._next[slot])
+        assert rs._prev[nxt] == slot
+        if nxt == rs.n:
+            return out
+        out.append(nxt)
+        slot = nxt
+
+
+def _expected_next(codes, row_id):
+    pending = np.flatnonzero(codes == PENDING)
+    if not len(pending):
+        return None
+    later = pending[pending > row_id]
+    return int(later[0] if len(later) else pending[0])
+
+
+def test_fresh_status_is_all_pending():
+    rs = RowStatus(4)
+    assert rs.pending == 4 and _walk(rs) == [0, 1, 2, 3]
+    assert rs.first_pending() == 0 and rs.next_pending(3) == 0
+
+
+def test_set_keeps_the_list_in_row_order():
+    rs = RowStatus(6)
+    for row_id, code in [(2, QUALIFIED), (0, TBD), (5, DELETED)]:
+        rs.set(row_id, code)
+    assert _walk(rs) == [1, 3, 4]
+    assert (rs.count(QUALIFIED), rs.count(TBD), rs.count(DELETED), rs.pending) == (1, 1, 1, 3)
+    rs.set(0, PENDING)
+    rs.set(5, PENDING)
+    assert _walk(rs) == [0, 1, 3, 4, 5]
+    rs.set(2, PENDING)
+    assert _walk(rs) == list(range(6)) and rs.pending == 6
+
+
+def test_next_pending_wraps_round_and_skips_filed_rows():
+    rs = RowStatus(5)
+    rs.set(1, QUALIFIED)
+    assert rs.next_pending(0) == 2
+    assert rs.next_pending(1) == 2  # from a row just filed
+    assert rs.next_pending(4) == 0  # wraps round
+    rs.set(0, DELETED)
+    rs.set(4, TBD)
+    assert rs.next_pending(3) == 2 and rs.next_pending(4) == 2
+    for row_id in (2, 3):
+        rs.set(row_id, QUALIFIED)
+    assert rs.next_pending(2) is None and rs.first_pending() is None
+
+
+def test_stale_link_to_the_sentinel():
+    rs = RowStatus(5)
+    rs.set(4, DELETED)
+    rs.set(3, DELETED)   # 3 keeps a link to the sentinel
+    rs.set(4, PENDING)   # put back out of order
+    assert rs.next_pending(3) == 4
+    assert rs.seek(3) == 4
+
+
+def test_stale_link_past_a_row_put_back():
+    rs = RowStatus(5)
+    rs.set(2, DELETED)
+    rs.set(1, DELETED)   # 1 now links past 2, to 3
+    rs.set(2, PENDING)
+    assert rs.next_pending(1) == 2
+    assert _walk(rs) == [0, 2, 3, 4]
+
+
+def test_set_many_and_queue_handover():
+    rs = RowStatus(6)
+    rs.set_many([1, 4], TBD)
+    assert _walk(rs) == [0, 2, 3, 5] and rs.count(TBD) == 2
+    assert rs.unassign_pending().tolist() == [0, 2, 3, 5]
+    assert rs.pending == 0 and rs.count(UNASSIGNED) == 4
+    rs.assign([3, 4, 5])  # 4 is filed, not unassigned: left alone
+    assert _walk(rs) == [3, 5] and rs.status(4) == TBD
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits_match_a_scan(seed):
+    rng = np.random.default_rng(seed)
+    rs = RowStatus(30)
+    for _ in range(400):
+        row_id = int(rng.integers(0, rs.n))
+        rs.set(row_id, int(rng.choice([PENDING, PENDING, QUALIFIED, TBD, DELETED])))
+        probe = int(rng.integers(0, rs.n))
+        assert rs.next_pending(probe) == _expected_next(rs.codes, probe)
+        assert _walk(rs) == np.flatnonzero(rs.codes == PENDING).tolist()
+    rebuilt = RowStatus.from_codes(rs.codes)
+    assert _walk(rebuilt) == _walk(rs) and rebuilt.counts == rs.counts
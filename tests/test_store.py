@@ -0,0 +1,95 @@
+import numpy as np
+
+from map_engine import PARTIAL, QUALIFIED, AnnotationLog, QualificationStore, is_partial, to_entry
+from map_engine.store import partial_mask
+
+COMPLETE = {"Dominance": "Primary", "Prominence": ["Headline", "Photo"], "Spokesperson": "CEO",
+            "Page": 0, "Tonality": "Positive", "Spokesperson Name with Designation": None}
+
+
+def _store():
+    log = AnnotationLog()
+    return log, QualificationStore(log)
+
+
+def _live(log):
+    return [(int(log.row_id[p]), log.fields["Category"][p]) for p in np.flatnonzero(log.live.values)]
+
+
+def test_upsert_appends_and_retires_the_old_entry():
+    log, store = _store()
+    assert store.upsert(3, "Vision", {**COMPLETE, "Tonality": None}) == PARTIAL
+    assert store.upsert(3, "M&A", COMPLETE) == QUALIFIED
+    assert store._by_row[3] == {"Vision": 0, "M&A": 1}
+    assert store.upsert(3, "Vision", COMPLETE) == QUALIFIED   # re-qualified: appended, old one retired
+    assert store._by_row[3] == {"M&A": 1, "Vision": 2}
+    assert len(log) == 3 and log.live.values.tolist() == [False, True, True]
+    assert log.counts[QUALIFIED] == 2 and log.counts[PARTIAL] == 0 and len(store) == 2
+
+
+def test_get_returns_what_was_saved():
+    _, store = _store()
+    store.upsert(0, "Vision", COMPLETE)
+    assert store.get(0, "Vision") == {**COMPLETE, "Category": "Vision"}
+    assert store.get(0, "M&A") is None and store.get(1, "Vision") is None
+    assert (0, "Vision") in store and (0, "M&A") not in store
+
+
+def test_delete_retires_and_drops_empty_rows():
+    log, store = _store()
+    store.upsert(0, "Vision", COMPLETE)
+    store.upsert(0, "M&A", COMPLETE)
+    store.delete(0, "Vision")
+    store.delete(0, "Vision")  # already gone: a no-op
+    assert store.categories(0) == ["M&A"] and _live(log) == [(0, "M&A")]
+    store.delete(0, "M&A")
+    assert 0 not in store._by_row and len(store) == 0
+
+
+def test_row_code_and_row_codes_agree():
+    _, store = _store()
+    store.upsert(0, "Vision", COMPLETE)
+    store.upsert(1, "Vision", COMPLETE)
+    store.upsert(1, "M&A", {**COMPLETE, "Prominence": []})
+    rows = [0, 1, 2]
+    assert [store.row_code(r) for r in rows] == [QUALIFIED, PARTIAL, PARTIAL]  # no categories: partial
+    assert store.row_codes(rows).tolist() == [QUALIFIED, PARTIAL, PARTIAL]
+    store.upsert(1, "M&A", COMPLETE)
+    assert store.row_codes(rows).tolist() == [QUALIFIED, QUALIFIED, PARTIAL]
+
+
+def test_upsert_many_maps_every_row_to_its_new_position():
+    log, store = _store()
+    store.upsert(5, "Vision", {**COMPLETE, "Dominance": None})
+    assert store.upsert_many([7, 5, 6, 7], "Vision", COMPLETE) == QUALIFIED
+    assert {r: store._by_row[r]["Vision"] for r in (5, 6, 7)} == {5: 1, 6: 2, 7: 3}
+    assert [int(log.row_id[p]) for p in (1, 2, 3)] == [5, 6, 7]
+    assert log.counts[PARTIAL] == 0 and log.counts[QUALIFIED] == 3
+
+
+def test_insert_many_classifies_each_entry():
+    log, store = _store()
+    fields = {"Dominance": np.array(["Primary", None], dtype=object),
+              "Prominence": np.array(["Headline", "Headline"], dtype=object),
+              "Tonality": np.array(["Positive", "Neutral"], dtype=object)}
+    codes = store.insert_many([4, 4], ["Vision", "M&A"], fields)
+    assert codes.tolist() == [QUALIFIED, PARTIAL]
+    assert store.get(4, "M&A")["Prominence"] == ["Headline"] and store.row_code(4) == PARTIAL
+
+
+def test_delete_rows_retires_every_category_at_once():
+    log, store = _store()
+    for r in (1, 2, 3):
+        store.upsert(r, "Vision", COMPLETE)
+    store.upsert(2, "M&A", COMPLETE)
+    rows, categories = store.delete_rows([2, 3, 9])
+    assert sorted(zip(rows.tolist(), categories)) == [(2, "M&A"), (2, "Vision"), (3, "Vision")]
+    assert _live(log) == [(1, "Vision")] and store.categories(2) == []
+
+
+def test_partial_rules_match_between_dicts_and_columns():
+    cases = [COMPLETE, {**COMPLETE, "Dominance": None}, {**COMPLETE, "Prominence": []},
+             {**COMPLETE, "Tonality": float("nan")}, {**COMPLETE, "Page": None}]
+    flat = [to_entry(q) for q in cases]
+    columns = {f: np.array([q.get(f) for q in flat], dtype=object) for f in ("Dominance", "Prominence", "Tonality")}
+    assert partial_mask(columns).tolist() == [is_partial(q) for q in cases] == [False, True, True, True, False]
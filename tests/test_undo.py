@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from map_engine import DELETED, PARTIAL, PENDING, QUALIFIED, TBD, QualificationSession, Step, UndoStack
+
+COMPLETE = {"Dominance": "Primary", "Prominence": ["Headline"], "Spokesperson": "CEO",
+            "Page": 1, "Tonality": "Positive", "Spokesperson Name with Designation": None}
+
+
+def _session(n=12):
+    return QualificationSession(pd.DataFrame({"Headline": [f"Story {i}" for i in range(n)]}))
+
+
+def _states(s):
+    return [s.row_state(r) for r in range(len(s))]
+
+
+def test_undo_redo_qualify():
+    s = _session()
+    before = _states(s)
+    with s.step("Save & Next on row 1"):
+        s.qualify(0, "Vision", COMPLETE)
+        s.qualify(0, "M&A", {**COMPLETE, "Tonality": None}, submit=True)
+    after = _states(s)
+    assert s.status.status(0) == PARTIAL
+
+    assert s.undo().label == "Save & Next on row 1"
+    assert _states(s) == before
+    assert s.entries("qualified") == s.entries("partial") == 0
+    assert s.next_row() == 0
+    assert s.redo().rows == [0]
+    assert _states(s) == after
+
+
+def test_undo_edit_restores_previous_fields():
+    s = _session()
+    s.qualify(0, "Vision", COMPLETE, submit=True)
+    with s.step("Edit of row 1"):
+        s.unqualify(0, "Vision")
+        s.qualify(0, "Innovation", {**COMPLETE, "Tonality": "Negative"}, submit=True)
+    s.undo()
+    assert s.categories(0) == ["Vision"] and s.get(0, "Vision")["Tonality"] == "Positive"
+    assert s.status.status(0) == QUALIFIED
+    s.redo()
+    assert s.categories(0) == ["Innovation"]
+
+
+def test_undo_redo_marks():
+    s = _session()
+    with s.step("To Be Decided on row 2"):
+        s.tbd(1)
+    with s.step("Delete on row 2"):
+        s.delete(1)
+    assert (s.entries("to_be_decided"), s.entries("deleted")) == (0, 1)
+    s.undo()
+    assert s.status.status(1) == TBD and (s.entries("to_be_decided"), s.entries("deleted")) == (1, 0)
+    s.undo()
+    assert s.status.status(1) == PENDING and s.entries("to_be_decided") == 0
+    s.redo()
+    s.redo()
+    assert s.status.status(1) == DELETED and s.entries("deleted") == 1
+
+
+def test_bulk_step_undoes_every_row():
+    s = _session()
+    rows = np.arange(3, 9)
+    with s.step("Bulk qualification of 6 row(s)"):
+        s.qualify_rows(rows, "Leadership", COMPLETE, submit=True)
+        s.move_rows([9, 10], DELETED)
+    assert sorted(s.history.undo[-1].rows) == [*rows.tolist(), 9, 10]
+    s.undo()
+    assert s.pending == len(s) and s.entries("qualified") == s.entries("deleted") == 0
+    s.redo()
+    assert s.rows("qualified") == 6 and s.rows("deleted") == 2
+
+
+def test_new_step_clears_redo_and_noop_steps_are_dropped():
+    s = _session()
+    with s.step("Delete on row 1"):
+        s.delete(0)
+    s.undo()
+    with s.step("Nothing"):
+        s.move(0, PENDING)
+    assert s.history.next_redo() == "Delete on row 1"
+    with s.step("To Be Decided on row 1"):
+        s.tbd(0)
+    assert s.history.next_redo() is None and s.undo().label == "To Be Decided on row 1"
+    assert s.undo() is None
+
+
+def test_nested_step_joins_the_outer_one():
+    s = _session()
+    with s.step("Outer"):
+        s.tbd(0)
+        with s.step("Inner"):
+            s.delete(1)
+    assert len(s.history.undo) == 1 and sorted(s.history.undo[-1].rows) == [0, 1]
+
+
+def test_stack_is_bounded():
+    stack = UndoStack(limit=2)
+    for label in "abc":
+        stack.push(Step(label, []))
+    assert [step.label for step in stack.undo] == ["b", "c"]
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from map_engine import WorkQueue
+
+DIGEST = "d" * 64
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = WorkQueue(str(tmp_path / "queue.sqlite"))
+    q.register(DIGEST, "news.xlsx", 100)
+    return q
+
+
+def test_register_is_idempotent(queue):
+    queue.register(DIGEST, "news.xlsx", 100)
+    assert queue.progress(DIGEST) == {"open": 100, "leased": 0, "done": 0, "annotators": 0}
+
+
+def test_leases_do_not_overlap_between_owners(queue):
+    owners = [f"owner{k}" for k in range(6)]
+    got = {o: [] for o in owners}
+    start = threading.Barrier(len(owners))
+
+    def work(owner):
+        start.wait()
+        while True:
+            leased, _ = queue.sync(DIGEST, owner, want=7)
+            if not leased:
+                return
+            got[owner] += leased
+
+    threads = [threading.Thread(target=work, args=(o,)) for o in owners]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    rows = [r for leased in got.values() for r in leased]
+    assert sorted(rows) == list(range(100))  # every row handed out exactly once
+    assert queue.progress(DIGEST)["annotators"] == sum(1 for leased in got.values() if leased)
+
+
+def test_done_rows_are_not_handed_out_again(queue):
+    leased, _ = queue.sync(DIGEST, "a", want=10)
+    assert leased == list(range(10))
+    assert queue.sync(DIGEST, "a", done=leased[:4]) == ([], [])
+    queue.release(DIGEST, "a")
+    assert queue.sync(DIGEST, "b", want=10)[0] == list(range(4, 14))
+    assert queue.progress(DIGEST)["done"] == 4
+
+
+def test_expired_lease_is_reassigned_and_the_stale_done_is_lost(queue):
+    stale, _ = queue.sync(DIGEST, "a", want=5, ttl=-1)  # lapses at once
+    leased, _ = queue.sync(DIGEST, "b", want=3)
+    assert leased == stale[:3]
+
+    leased, lost = queue.sync(DIGEST, "a", done=stale)
+    assert lost == stale[:3]  # now b's
+    assert leased == []
+    progress = queue.progress(DIGEST)
+    assert progress["done"] == 2 and progress["leased"] == 3
+
+    assert queue.sync(DIGEST, "b", done=stale[:3]) == ([], [])
+    assert queue.progress(DIGEST)["done"] == 5
+
+
+def test_sync_renews_leases(queue):
+    leased, _ = queue.sync(DIGEST, "a", want=5, ttl=-1)
+    queue.sync(DIGEST, "a", ttl=60)  # lapsed leases go back to the pool before renewal
+    assert queue.sync(DIGEST, "b", want=5)[0] == leased
+
+    leased, _ = queue.sync(DIGEST, "c", want=5)
+    queue.sync(DIGEST, "c", ttl=3600)
+    assert queue.sync(DIGEST, "d", want=5)[0] != leased
+
+
+def test_release_returns_rows_to_open(queue):
+    leased, _ = queue.sync(DIGEST, "a", want=10)
+    queue.sync(DIGEST, "a", done=leased[:2])
+    queue.release(DIGEST, "a")
+    assert queue.progress(DIGEST) == {"open": 98, "leased": 0, "done": 2, "annotators": 0}
+    assert queue.sync(DIGEST, "b", want=8)[0] == leased[2:]
+    queue.release(DIGEST, "nobody")  # owners without leases are a no-op
+    assert queue.progress(DIGEST)["leased"] == 8